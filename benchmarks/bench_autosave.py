@@ -0,0 +1,106 @@
+"""
+This file contains a benchmark of the autosave of the game "Gemini CLI Planet Adventure" against saving the whole
+saved game data after every action, comparing the time the input loop waits (with the player taking --think-time
+milliseconds to choose each action) and the number of bytes written per action.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+from bench_save_format import create_saved_game_data
+
+
+def take_action(game_data, rng):
+    # type: (SavedGameData, random.Random) -> None
+    # Taking one of the actions changing a few game objects which players take most often.
+    player: Player = game_data.player_data
+    action: int = rng.randint(0, 3)
+    if action == 0:
+        rng.choice([player.move_up, player.move_down, player.move_left, player.move_right])()
+    elif action == 1:
+        player.grant_exp(Magnitude(rng.randint(1, 9), rng.randint(2, 4)))
+    elif action == 2:
+        rng.choice(player.battle_team.get_legendary_creatures()).grant_exp(Magnitude(rng.randint(1, 9), 3))
+    else:
+        player.add_item_to_inventory(Ball(generate_random_name(rng), "A ball to catch a legendary creature.",
+                                          Magnitude(rng.randint(1, 9), 5), number("0.5")))
+
+
+def measure(game_data, save, wait, actions, think_time, seed):
+    # type: (SavedGameData, typing.Callable, typing.Callable, int, float, int) -> float
+    """
+    Taking 'actions' actions on 'game_data', calling 'save' after each of them and 'wait' once the player chose the
+    next action.
+    :return: the mean time taken by 'save' and 'wait' in milliseconds
+    """
+
+    rng: random.Random = random.Random(seed)
+    elapsed_time: float = 0  # initial value
+    for i in range(actions):
+        take_action(game_data, rng)
+        start_time: float = time.perf_counter()
+        save(game_data)
+        elapsed_time += time.perf_counter() - start_time
+        time.sleep(think_time / 1000)
+        start_time = time.perf_counter()
+        wait()
+        elapsed_time += time.perf_counter() - start_time
+    return elapsed_time / actions * 1000
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--creatures", type=int, default=20, help="number of legendary creatures the player has")
+    parser.add_argument("--ai-players", type=int, default=8, help="number of AI players in the city")
+    parser.add_argument("--items", type=int, default=20, help="number of runes the player has")
+    parser.add_argument("--level", type=int, default=10, help="level of the legendary creatures")
+    parser.add_argument("--actions", type=int, default=100)
+    parser.add_argument("--think-time", type=float, default=50, help="milliseconds taken to choose each action")
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    directory: str = tempfile.mkdtemp()
+    try:
+        file_name: str = os.path.join(directory, "PLAYER")
+        seed_random_streams(args.seed)
+        game_data: SavedGameData = create_saved_game_data(args.creatures, args.ai_players, args.items, args.level)
+        save_time: float = measure(game_data, lambda data: save_game_data(data, file_name), lambda: None,
+                                   args.actions, args.think_time, args.seed)
+        save_size: int = os.path.getsize(file_name)
+
+        # The journal is not compacted during the measurement, so that it holds the records of all the actions.
+        seed_random_streams(args.seed)
+        game_data = create_saved_game_data(args.creatures, args.ai_players, args.items, args.level)
+        autosave: AutosaveService = AutosaveService(file_name, compact_records=args.actions + 2,
+                                                    compact_interval=3600.0)
+        autosave.record(game_data)
+        autosave.wait()
+        autosave_time: float = measure(game_data, autosave.record, autosave.wait, args.actions, args.think_time,
+                                       args.seed)
+        autosave.close()
+        journal_size: int = os.path.getsize(file_name + AUTOSAVE_JOURNAL_SUFFIX) - \
+            AutosaveService.JOURNAL_HEADER.size
+    finally:
+        shutil.rmtree(directory)
+
+    print(tabulate([["save_game_data", str(round(save_time, 2)), str(save_size)],
+                    ["autosave", str(round(autosave_time, 2)), str(round(journal_size / args.actions, 1))]],
+                   headers=["Save after every action", "Input loop wait per action (ms)", "Bytes written per action"],
+                   tablefmt='fancy_grid'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
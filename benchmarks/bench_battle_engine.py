@@ -0,0 +1,89 @@
+"""
+This file contains a benchmark of the headless batch battle engine of the game "Gemini CLI Planet Adventure" against
+battles carried out with legendary creature objects, comparing both their speed and their winner distributions.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+def create_ai_player(name, level):
+    # type: (str, int) -> AIPlayer
+    ai_player: AIPlayer = AIPlayer(name)
+    for legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS, level):
+        ai_player.add_legendary_creature(legendary_creature)
+        ai_player.add_legendary_creature_to_team(legendary_creature)
+    return ai_player
+
+
+def reset(player):
+    # type: (Player) -> None
+    player.battle_team.recover_all()
+    for legendary_creature in player.battle_team.get_legendary_creatures():
+        legendary_creature.attack_gauge = legendary_creature.MIN_ATTACK_GAUGE
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--matchups", type=int, default=10, help="number of different pairs of teams")
+    parser.add_argument("--battles", type=int, default=100, help="number of battles for each pair of teams")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    seed_random_streams(args.seed)
+    matchups: list = [(create_ai_player("PLAYER 1", args.level), create_ai_player("PLAYER 2", args.level))
+                      for i in range(args.matchups)]
+
+    object_win_rates: list = []  # initial value
+    start_time: float = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for player1, player2 in matchups:
+            num_wins: int = 0  # initial value
+            for i in range(args.battles):
+                reset(player1)
+                reset(player2)
+                if CreatureBattle(player1, player2).simulate() == player1.battle_team:
+                    num_wins += 1
+            object_win_rates.append(num_wins / args.battles)
+
+    object_time: float = time.perf_counter() - start_time
+    for player1, player2 in matchups:
+        reset(player1)
+        reset(player2)
+
+    start_time = time.perf_counter()
+    engine: BatchBattleEngine = BatchBattleEngine([(player1.battle_team, player2.battle_team)
+                                                   for player1, player2 in matchups
+                                                   for i in range(args.battles)], seed=args.seed)
+    winners: np.ndarray = engine.run().reshape(args.matchups, args.battles)
+    engine_time: float = time.perf_counter() - start_time
+    engine_win_rates: list = list(np.mean(winners == BatchBattleEngine.FIRST_TEAM_WON, axis=1))
+
+    num_battles: int = args.matchups * args.battles
+    print(tabulate([["objects", str(round(num_battles / object_time, 1))] +
+                    [str(round(win_rate, 2)) for win_rate in object_win_rates],
+                    ["batch engine", str(round(num_battles / engine_time, 1))] +
+                    [str(round(win_rate, 2)) for win_rate in engine_win_rates]],
+                   headers=["Path", "Battles per second"] + ["#" + str(i + 1) for i in range(args.matchups)],
+                   tablefmt='fancy_grid'))
+    print("Mean absolute difference of first team win rates: " +
+          str(round(float(np.mean(np.abs(np.array(object_win_rates) - np.array(engine_win_rates)))), 3)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
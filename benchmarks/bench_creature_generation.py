@@ -0,0 +1,113 @@
+"""
+This file contains a benchmark of the batch legendary creature generator of the game "Gemini CLI Planet Adventure"
+against generating legendary creatures one at a time with the random module as the game did before.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+def legacy_generate_random_legendary_creature(element):
+    # type: (str) -> LegendaryCreature
+    name: str = generate_random_name()
+    max_hp: mpf = number(random.randint(45000, 55000))
+    max_magic_points: mpf = number(random.randint(45000, 55000))
+    attack_power: mpf = number(random.randint(8500, 9500))
+    defense: mpf = number(random.randint(8500, 9500))
+    attack_speed: mpf = number(random.randint(100, 125))
+    skills: list = []  # initial value
+    num_attack_skills: int = 0  # initial value
+    num_heal_skills: int = 0  # initial value
+    for i in range(4):
+        if random.random() < 0.5:
+            # Generating attack skill
+            num_attack_skills += 1
+            new_skill: Skill = Skill("ATTACK SKILL #" + str(num_attack_skills), "An attack skill.",
+                                     "ATTACK", num_attack_skills * number("0.01") * random.randint(350, 450),
+                                     number("0"), power_of_ten(num_attack_skills * random.randint(2, 4)))
+            skills.append(new_skill)
+        else:
+            # Generating heal skill
+            num_heal_skills += 1
+            new_skill: Skill = Skill("HEAL SKILL #" + str(num_heal_skills), "A heal skill", "HEAL",
+                                     number("0"), power_of_ten(num_attack_skills * random.randint(1, 3)),
+                                     power_of_ten(num_attack_skills * random.randint(2, 4)))
+            skills.append(new_skill)
+
+    awaken_bonus: AwakenBonus = AwakenBonus(number(random.randint(115, 135)), number(random.randint(115, 135)),
+                                            number(random.randint(115, 135)), number(random.randint(115, 135)),
+                                            number(random.randint(0, 15)),
+                                            number(0.01 * random.randint(0, 15)), number(0.01 * random.randint(0, 15)))
+    new_legendary_creature: LegendaryCreature = LegendaryCreature(name, element, max_hp, max_magic_points,
+                                                                  attack_power, defense, attack_speed, skills,
+                                                                  awaken_bonus)
+    return new_legendary_creature
+
+
+
+def legacy_generate_creatures(n, level):
+    # type: (int, int) -> list
+    legendary_creatures: list = []  # initial value
+    for i in range(n):
+        legendary_creature: LegendaryCreature = legacy_generate_random_legendary_creature(
+            random.choice(LegendaryCreature.POTENTIAL_ELEMENTS))
+        legendary_creature.level_to(level)
+        legendary_creatures.append(legendary_creature)
+    return legendary_creatures
+
+
+def describe(legendary_creature):
+    # type: (LegendaryCreature) -> tuple
+    return (legendary_creature.name, legendary_creature.element, str(legendary_creature.get_stats()),
+            str(legendary_creature.awaken_bonus),
+            [(skill.name, skill.damage_multiplier, skill.heal_amount, skill.magic_points_cost)
+             for skill in legendary_creature.get_skills()])
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--creatures", type=int, default=10000, help="number of legendary creatures generated")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    random.seed(args.seed)
+    start_time: float = time.perf_counter()
+    legacy_generate_creatures(args.creatures, args.level)
+    legacy_speed: float = args.creatures / (time.perf_counter() - start_time)
+
+    table: list = [["one at a time", "-", str(round(legacy_speed, 1)), "1.0x"]]
+    for batch_size in [1, 5, 100, args.creatures]:
+        start_time = time.perf_counter()
+        for i in range(0, args.creatures, batch_size):
+            generate_creatures(min(batch_size, args.creatures - i), LegendaryCreature.POTENTIAL_ELEMENTS, args.level,
+                               seed=args.seed + i)
+        speed: float = args.creatures / (time.perf_counter() - start_time)
+        table.append(["generate_creatures", str(batch_size), str(round(speed, 1)),
+                      str(round(speed / legacy_speed, 1)) + "x"])
+
+    print(tabulate(table, headers=["Generator", "Batch size", "Creatures per second", "Speedup"],
+                   tablefmt='fancy_grid'))
+
+    # The same seed gives the same legendary creatures.
+    reproducible: bool = [describe(legendary_creature) for legendary_creature in generate_creatures(
+        100, LegendaryCreature.POTENTIAL_ELEMENTS, args.level, seed=args.seed)] == \
+        [describe(legendary_creature) for legendary_creature in generate_creatures(
+            100, LegendaryCreature.POTENTIAL_ELEMENTS, args.level, seed=args.seed)]
+    print("Reproducible from a seed: " + str(reproducible))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+This file contains a load test of the item shop, mission, and AI player spawning throughput of the game
+"Gemini CLI Planet Adventure" against a stand-in LLM backend (no network or API key needed).
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+def create_player():
+    # type: () -> Player
+    player: Player = Player("BENCHMARK")
+    for legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS):
+        player.add_legendary_creature(legendary_creature)
+        player.add_legendary_creature_to_team(legendary_creature)
+    return player
+
+
+def benchmark(name, function, repeats):
+    # type: (str, typing.Callable, int) -> None
+    start_time: float = time.perf_counter()
+    for i in range(repeats):
+        function()
+    elapsed_time: float = time.perf_counter() - start_time
+    print(name.ljust(20) + str(round(repeats / elapsed_time, 2)).rjust(10) + " per second (" +
+          str(round(1000 * elapsed_time / repeats, 1)) + " ms each)")
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=["fake", "http"], default="fake")
+    parser.add_argument("--url", default=None, help="URL of a running stand-in server (default: start one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-latency", type=float, default=0.2)
+    parser.add_argument("--max-latency", type=float, default=0.6)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--requests-per-minute", type=float, default=6000)
+    parser.add_argument("--tokens-per-minute", type=float, default=1e8)
+    parser.add_argument("--max-concurrent-requests", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args: argparse.Namespace = parser.parse_args()
+
+    server: LLMStandInServer or None = None  # initial value
+    if args.backend == "http" and args.url is None:
+        server = LLMStandInServer("127.0.0.1", 0, FakeBackend(seed=args.seed, min_latency=args.min_latency,
+                                                              max_latency=args.max_latency,
+                                                              failure_rate=args.failure_rate))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        args.url = "http://127.0.0.1:" + str(server.server_address[1])
+
+    generation_config: dict = {"temperature": 1, "top_p": 0.95, "top_k": 64, "max_output_tokens": 8192}
+    if args.backend == "http":
+        os.environ["LLM_BACKEND"] = "http"
+        os.environ["LLM_BACKEND_URL"] = args.url
+    else:
+        os.environ["LLM_BACKEND"] = "fake"
+        os.environ["LLM_FAKE_SEED"] = str(args.seed)
+        os.environ["LLM_FAKE_MIN_LATENCY"] = str(args.min_latency)
+        os.environ["LLM_FAKE_MAX_LATENCY"] = str(args.max_latency)
+        os.environ["LLM_FAKE_FAILURE_RATE"] = str(args.failure_rate)
+
+    # A fresh in-memory cache makes sure that the backend is actually exercised.
+    llm_service: LLMService = LLMService([], LLMResponseCache(":memory:"), TokenBucketRateLimiter(
+        args.requests_per_minute, args.tokens_per_minute, args.max_concurrent_requests), CircuitBreaker(),
+        LLMTelemetry())
+    json_model: TelemetryGenerativeModel = llm_service.get_model(dict(generation_config,
+                                                                      response_mime_type="application/json"))
+    player: Player = create_player()
+
+    # A board without pools only generates missions when asked to.
+    mission_board: MissionBoard = MissionBoard(json_model, pool_size=0)
+
+    print("Backend: " + str(args.backend) + ", latency: " + str(args.min_latency) + " - " + str(args.max_latency) +
+          " seconds\n")
+    benchmark("item shop", lambda: build_item_shop(json_model), args.repeats)
+    benchmark("missions", lambda: mission_board.generate_missions("downtown", MISSION_BOARD_POOL_SIZE),
+              args.repeats)
+    benchmark("city with AI players", lambda: generate_city(json_model, get_average_battle_creature_level(player)),
+              args.repeats)
+
+    mission_board.discard()
+    print("\n" + str(llm_service))
+    llm_service.close()
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
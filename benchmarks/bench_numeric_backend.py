@@ -0,0 +1,122 @@
+"""
+This file contains a benchmark of the numeric backends ("exact" and "fast") of the game
+"Gemini CLI Planet Adventure" on battle simulation and levelling up.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import subprocess
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+MAX_TURNS_PER_BATTLE: int = 100000
+
+
+def create_ai_player(name, level):
+    # type: (str, int) -> AIPlayer
+    ai_player: AIPlayer = AIPlayer(name)
+    for legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS, level):
+        ai_player.add_legendary_creature(legendary_creature)
+        ai_player.add_legendary_creature_to_team(legendary_creature)
+    return ai_player
+
+
+def simulate_battle(player1, player2):
+    # type: (AIPlayer, AIPlayer) -> int
+    """
+    Simulating a battle between the teams of two AI players, making the same random choices as the AI player
+    does in the game.
+    :return: the number of turns taken
+    """
+
+    creature_battle: CreatureBattle = CreatureBattle(player1, player2)
+    num_turns: int = 0  # initial value
+    while creature_battle.winner is None and num_turns < MAX_TURNS_PER_BATTLE:
+        creature_battle.get_someone_to_move()
+        legendary_creature: LegendaryCreature = creature_battle.whose_turn
+        opponents: list = player2.battle_team.get_legendary_creatures() if legendary_creature in \
+            player1.battle_team.get_legendary_creatures() else player1.battle_team.get_legendary_creatures()
+        chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
+        if chosen_action == "NORMAL HEAL":
+            legendary_creature.have_turn(legendary_creature, None, chosen_action)
+        elif chosen_action == "NORMAL ATTACK":
+            legendary_creature.have_turn(random.choice(opponents), None, chosen_action)
+        else:
+            skill_to_use: Skill = random.choice(legendary_creature.get_skills())
+            target: LegendaryCreature = legendary_creature if skill_to_use.skill_type == "HEAL" else \
+                random.choice(opponents)
+            legendary_creature.have_turn(target, skill_to_use, chosen_action)
+
+        num_turns += 1
+        if player2.battle_team.all_died():
+            creature_battle.winner = player1.battle_team
+        elif player1.battle_team.all_died():
+            creature_battle.winner = player2.battle_team
+
+    return num_turns
+
+
+def run_worker(args):
+    # type: (argparse.Namespace) -> dict
+    seed_random_streams(args.seed)
+    start_time: float = time.perf_counter()
+    for i in range(args.level_ups):
+        create_ai_player("LEVELLER", args.level)
+
+    level_up_time: float = time.perf_counter() - start_time
+    num_turns: int = 0  # initial value
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.battles):
+            num_turns += simulate_battle(create_ai_player("PLAYER 1", args.level),
+                                         create_ai_player("PLAYER 2", args.level))
+
+    return {"backend": NUMBER_BACKEND, "level_up_time": level_up_time,
+            "battle_time": time.perf_counter() - start_time, "turns": num_turns}
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--battles", type=int, default=20)
+    parser.add_argument("--level", type=int, default=5, help="level of the legendary creatures in battles")
+    parser.add_argument("--level-ups", type=int, default=50, help="number of teams levelled up to --level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return 0
+
+    # The numeric backend is chosen at startup, so every backend is measured in its own process.
+    results: dict = {}  # initial value
+    for backend in ["exact", "fast"]:
+        output: str = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker"] + sys.argv[1:],
+                                     env=dict(os.environ, NUMBER_BACKEND=backend), capture_output=True, text=True,
+                                     check=True).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    for key, name in [("level_up_time", "level ups"), ("battle_time", "battles")]:
+        print(name.ljust(12) + "exact " + str(round(results["exact"][key], 3)).rjust(8) + " s, fast " +
+              str(round(results["fast"][key], 3)).rjust(8) + " s, speedup " +
+              str(round(results["exact"][key] / results["fast"][key], 1)) + "x")
+
+    print("turns       exact " + str(results["exact"]["turns"]) + ", fast " + str(results["fast"]["turns"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
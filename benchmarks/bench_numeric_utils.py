@@ -0,0 +1,131 @@
+"""
+This file contains a benchmark of the numeric utilities (mpf_sum_of_list, mpf_product_of_list, and is_number) of the
+game "Gemini CLI Planet Adventure" against the string based versions they replaced, counting the numbers converted to
+strings and parsed back on the way.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import time
+import argparse
+import mpmath.ctx_mp_python
+from functools import reduce
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+def legacy_is_number(string: str) -> bool:
+    try:
+        mpf(string)
+        return True
+    except ValueError:
+        return False
+
+
+def legacy_mpf_sum_of_list(a_list: list) -> mpf:
+    return mpf(str(sum(mpf(str(elem)) for elem in a_list if legacy_is_number(str(elem)))))
+
+
+def legacy_mpf_product_of_list(a_list: list) -> mpf:
+    return number(reduce(lambda x, y: number(x) * number(y) if legacy_is_number(x) and
+                                                      legacy_is_number(y) else mpf(x) if legacy_is_number(x) and not
+                         legacy_is_number(y) else mpf(y) if legacy_is_number(y) and not legacy_is_number(x) else 1,
+                         a_list, 1))
+
+
+class StringRoundTripCounter:
+    """
+    This class contains attributes of a counter of the numbers converted to strings and of the strings parsed to mpf
+    numbers while it is active.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.num_conversions: int = 0  # initial value
+        self.__from_str: typing.Callable = mpmath.ctx_mp_python.from_str
+        self.__mpf_str: typing.Callable = mpf.__str__
+
+    def __enter__(self):
+        # type: () -> StringRoundTripCounter
+        def counted_from_str(*args, **kwargs):
+            self.num_conversions += 1
+            return self.__from_str(*args, **kwargs)
+
+        def counted_mpf_str(value):
+            self.num_conversions += 1
+            return self.__mpf_str(value)
+
+        mpmath.ctx_mp_python.from_str = counted_from_str
+        mpf.__str__ = counted_mpf_str
+        return self
+
+    def __exit__(self, *exc_info):
+        # type: (object) -> None
+        mpmath.ctx_mp_python.from_str = self.__from_str
+        mpf.__str__ = self.__mpf_str
+
+
+def measure(function, make_input, repeats):
+    # type: (typing.Callable, typing.Callable, int) -> tuple
+    """
+    Measuring 'function' on inputs made by 'make_input', which are made outside the measured time.
+    :return: the number of calls per second and the number of string conversions per call
+    """
+
+    inputs: list = [make_input() for i in range(repeats)]
+    with StringRoundTripCounter() as counter:
+        start_time: float = time.perf_counter()
+        for value in inputs:
+            function(value)
+        elapsed_time: float = time.perf_counter() - start_time
+    return repeats / elapsed_time, counter.num_conversions / repeats
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000, help="number of elements in each list")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    random.seed(args.seed)
+    inputs: dict = {
+        "int": [random.randint(1, 10 ** 6) for i in range(args.size)],
+        "float": [random.uniform(1, 2) for i in range(args.size)],
+        "mpf": [mpf(random.uniform(1, 2)) * power_of_ten(random.randint(0, 400)) for i in range(args.size)],
+        "mixed": [random.choice([random.randint(1, 9), random.uniform(1, 2), mpf(random.uniform(1, 2)), "1.5",
+                                 "NOT A NUMBER"]) for i in range(args.size)]
+    }
+
+    table: list = []  # initial value
+    for name, function, legacy_function in [("sum", mpf_sum_of_list, legacy_mpf_sum_of_list),
+                                            ("product", mpf_product_of_list, legacy_mpf_product_of_list),
+                                            ("is_number", lambda a_list: [is_number(elem) for elem in a_list],
+                                             lambda a_list: [legacy_is_number(elem) for elem in a_list])]:
+        for input_name, a_list in inputs.items():
+            legacy_speed, legacy_conversions = measure(legacy_function, lambda: list(a_list), args.repeats)
+            speed, conversions = measure(function, lambda: list(a_list), args.repeats)
+            row: list = [name, input_name, str(round(legacy_speed, 1)), str(round(speed, 1)),
+                         str(round(speed / legacy_speed, 1)) + "x", str(legacy_conversions), str(conversions)]
+            if name != "is_number":
+                # Generators are reduced without being turned into lists first.
+                generator_speed, generator_conversions = measure(function, lambda: iter(a_list), args.repeats)
+                row += [str(round(generator_speed, 1)), str(generator_conversions)]
+            table.append(row)
+
+    print(tabulate(table, headers=["Function", "Input", "Legacy calls per second", "Calls per second", "Speedup",
+                                   "Legacy string conversions per call", "String conversions per call",
+                                   "Generator calls per second", "Generator string conversions per call"],
+                   tablefmt='fancy_grid'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+This file contains a benchmark of the save format of the game "Gemini CLI Planet Adventure" against the pickles saved
+game data was written as before, comparing the sizes of saved game files and the time taken to save and load them.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import io
+import time
+import pickle
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+def create_saved_game_data(num_creatures, num_ai_players, num_items, level):
+    # type: (int, int, int, int) -> SavedGameData
+    """
+    Creating saved game data of a player far into the game: a player with 'num_creatures' legendary creatures and
+    'num_items' items in a city with 'num_ai_players' AI players, generated the way the game generates them (without
+    asking Gemini AI for names).
+    :return: the saved game data
+    """
+
+    gym: ExerciseGym = ExerciseGym("GYM", [
+        TrainingOption("ATTACK POWER", number("5"), player_attack_power_gain=number("5")),
+        TrainingOption("DEFENSE", number("5"), player_defense_gain=number("5")),
+        TrainingOption("DEXTERITY", number("5"), player_dexterity_gain=number("5")),
+        TrainingOption("SPEED", number("5"), player_speed_gain=number("5"))
+    ])
+    player: Player = Player(generate_random_name())
+    for legendary_creature in generate_creatures(num_creatures, LegendaryCreature.POTENTIAL_ELEMENTS, level):
+        player.add_legendary_creature(legendary_creature)
+        if len(player.battle_team.get_legendary_creatures()) < BattleTeam.MAX_LEGENDARY_CREATURES:
+            player.add_legendary_creature_to_team(legendary_creature)
+
+    rng: random.Random = get_random_stream("items")
+    for i in range(num_items):
+        rating: int = rng.randint(Rune.MIN_RATING, Rune.MAX_RATING)
+        player.add_item_to_inventory(Rune(generate_random_name(), "A rune to strengthen legendary creatures.",
+                                          Magnitude(rng.randint(1, 9), rng.randint(5, 10)), rating,
+                                          rng.randint(Rune.MIN_SLOT_NUMBER, Rune.MAX_SLOT_NUMBER), rating, rating,
+                                          rating, rating, rating * 2, rating * number("0.01"),
+                                          rating * number("0.05")))
+
+    city: City = City(generate_random_name(), generate_city_tiles())
+    for i in range(num_ai_players):
+        ai_player: AIPlayer = AIPlayer(generate_random_name())
+        for legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS, level):
+            ai_player.add_legendary_creature(legendary_creature)
+            ai_player.add_legendary_creature_to_team(legendary_creature)
+
+        ai_player.location = AdventureModeLocation(rng.randint(1, len(city.get_tiles()[0]) - 1),
+                                                   rng.randint(1, len(city.get_tiles()) - 1))
+        city.get_tile_at(ai_player.location.tile_x, ai_player.location.tile_y).add_game_character(ai_player)
+
+    player.spawn_in_city(city)
+    return SavedGameData(player.name, 1, 0.95, 64, 8192, player, gym)
+
+
+def check_round_trip(game_data):
+    # type: (SavedGameData) -> None
+    """
+    Checking that saved game data comes back unchanged (shared game objects included) when it is saved and loaded
+    again, both from the save format and from a pickle written before the save format existed.
+    :return: None
+    """
+
+    encoded: bytes = SavedGameEncoder().encode(game_data)
+    directory: str = tempfile.mkdtemp()
+    try:
+        file_name: str = os.path.join(directory, "PLAYER")
+        save_game_data(game_data, file_name)
+        if SavedGameEncoder().encode(load_game_data(file_name)) != encoded:
+            raise AssertionError("Saved game data changed when it was saved and loaded.")
+
+        with open(file_name, "wb") as save_file:
+            pickle.dump(game_data, save_file)
+        if SavedGameEncoder().encode(load_game_data(file_name)) != encoded:
+            raise AssertionError("Pickled saved game data changed when it was loaded.")
+    finally:
+        shutil.rmtree(directory)
+
+
+def measure(function, repeats):
+    # type: (typing.Callable, int) -> float
+    """
+    Measuring 'function'.
+    :return: the mean time taken by a call in milliseconds
+    """
+
+    start_time: float = time.perf_counter()
+    for i in range(repeats):
+        function()
+    return (time.perf_counter() - start_time) / repeats * 1000
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--creatures", type=int, default=200, help="number of legendary creatures the player has")
+    parser.add_argument("--ai-players", type=int, default=10, help="number of AI players in the city")
+    parser.add_argument("--items", type=int, default=100, help="number of runes the player has")
+    parser.add_argument("--level", type=int, default=20, help="level of the legendary creatures")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    seed_random_streams(args.seed)
+    game_data: SavedGameData = create_saved_game_data(args.creatures, args.ai_players, args.items, args.level)
+    check_round_trip(game_data)
+    pickled: bytes = pickle.dumps(game_data)
+    encoded: bytes = SavedGameEncoder().encode(game_data)
+
+    table: list = []  # initial value
+    for name, data, save, load in [
+        ("pickle", pickled, lambda: pickle.dumps(game_data),
+         lambda: SavedGameUnpickler(io.BytesIO(pickled)).load()),
+        ("save format v" + str(SAVE_FORMAT_VERSION), encoded, lambda: SavedGameEncoder().encode(game_data),
+         lambda: SavedGameDecoder().decode(encoded))
+    ]:
+        table.append([name, str(len(data)), str(round(len(data) / len(pickled), 2)),
+                      str(round(measure(save, args.repeats), 2)), str(round(measure(load, args.repeats), 2))])
+
+    print(tabulate(table, headers=["Format", "Size (bytes)", "Size relative to pickle", "Save time (ms)",
+                                   "Load time (ms)"], tablefmt='fancy_grid'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
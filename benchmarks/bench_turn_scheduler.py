@@ -0,0 +1,117 @@
+"""
+This file contains a benchmark of the turn scheduler of the game "Gemini CLI Planet Adventure" against the tick loop it
+replaced, checking first that both let the same participants move in randomly generated battles (including battles
+whose attack gauges tie exactly) and then comparing the time taken to decide the turns.
+Author: GlobalCreativeApkDev
+"""
+
+
+# Importing necessary libraries
+
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gemini_cli_planet_adventure.gemini_cli_planet_adventure import *
+
+
+class Participant:
+    """
+    This class contains attributes of a participant of a battle, with only what deciding turns needs.
+    """
+
+    def __init__(self, speed, full_attack_gauge):
+        # type: (mpf, mpf) -> None
+        self.speed: mpf = speed
+        self.FULL_ATTACK_GAUGE: mpf = full_attack_gauge
+        self.attack_gauge: mpf = number("0")
+
+
+def legacy_next_turn(participants):
+    # type: (list) -> Participant
+    # Ticking the clock for everyone until someone has a full attack gauge, as battles used to.
+    full_attack_gauge_list: list = []  # initial value
+    while len(full_attack_gauge_list) == 0:
+        for participant in participants:
+            if participant.attack_gauge >= participant.FULL_ATTACK_GAUGE and participant not in \
+                    full_attack_gauge_list:
+                full_attack_gauge_list.append(participant)
+
+        for participant in participants:
+            participant.attack_gauge += participant.speed * 0.07
+
+    max_attack_gauge: mpf = max(participant.attack_gauge for participant in full_attack_gauge_list)
+    whose_turn: Participant or None = None  # initial value
+    for participant in full_attack_gauge_list:
+        if participant.attack_gauge == max_attack_gauge:
+            whose_turn = participant
+    return whose_turn
+
+
+def create_battle(rng):
+    # type: (random.Random) -> tuple
+    """
+    Creating the speeds and the full attack gauge of the participants of a battle. Speeds are often multiples of a
+    common speed, so that attack gauges often tie exactly (e.g. speeds 110 and 165 both reach 69.3).
+    :return: a tuple of the speeds and the full attack gauge
+    """
+
+    common_speed: int = rng.randint(1, 60)
+    speeds: list = [number(common_speed * rng.randint(1, 4) if rng.random() < 0.7 else rng.randint(1, 300))
+                    for i in range(rng.randint(2, 10))]
+    return speeds, number(rng.choice([1, 60, 65, 100, 1000]))
+
+
+def decide_turns(speeds, full_attack_gauge, num_turns, use_turn_scheduler):
+    # type: (list, mpf, int, bool) -> list
+    """
+    Deciding 'num_turns' turns of a battle, with the turn scheduler or with the tick loop.
+    :return: the list of the indices of the participants which moved
+    """
+
+    participants: list = [Participant(speed, full_attack_gauge) for speed in speeds]
+    turn_scheduler: TurnScheduler = TurnScheduler(participants, "speed")
+    movers: list = []  # initial value
+    for i in range(num_turns):
+        whose_turn: Participant = turn_scheduler.next_turn() if use_turn_scheduler else \
+            legacy_next_turn(participants)
+        movers.append(participants.index(whose_turn))
+        whose_turn.attack_gauge = number("0")  # the attack gauge is reset when the participant has its turn
+    return movers
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--battles", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=50, help="number of turns in each battle")
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    rng: random.Random = random.Random(args.seed)
+    battles: list = [create_battle(rng) for i in range(args.battles)]
+    times: dict = {True: 0.0, False: 0.0}
+    for speeds, full_attack_gauge in battles:
+        movers: dict = {}  # initial value
+        for use_turn_scheduler in [False, True]:
+            start_time: float = time.perf_counter()
+            movers[use_turn_scheduler] = decide_turns(speeds, full_attack_gauge, args.turns, use_turn_scheduler)
+            times[use_turn_scheduler] += time.perf_counter() - start_time
+
+        if movers[True] != movers[False]:
+            raise AssertionError("The turn scheduler lets other participants move than the tick loop with speeds " +
+                                 str([str(speed) for speed in speeds]) + " and a full attack gauge of " +
+                                 str(full_attack_gauge) + ".")
+
+    num_turns: int = args.battles * args.turns
+    print(tabulate([["tick loop", str(round(num_turns / times[False], 1))],
+                    ["turn scheduler", str(round(num_turns / times[True], 1))]],
+                   headers=["Deciding turns with", "Turns per second"], tablefmt='fancy_grid'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
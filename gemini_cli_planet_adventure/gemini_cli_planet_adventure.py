@@ -12,18 +12,45 @@ Author: GlobalCreativeApkDev
 
 import sys
 import time
+import argparse
+import asyncio
+import typing
 import uuid
 import pickle
 import copy
+import json
+import hashlib
+import sqlite3
+import threading
+import queue
+import atexit
+import re
+import io
+import struct
+import zlib
+import base64
+import tempfile
+import contextlib
+import math
+import heapq
+import http.client
 import google.generativeai as gemini
+from google.api_core import exceptions as google_exceptions
 import random
 from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
 import os
 from dotenv import load_dotenv
-from functools import reduce
+from functools import partial
+from collections import deque
 
+import mpmath.ctx_mp_python
 from mpmath import mp, mpf
+from mpmath.libmp import MPZ
 from tabulate import tabulate
+import numpy as np
 
 mp.pretty = True
 
@@ -31,30 +58,450 @@ mp.pretty = True
 # Creating static variables to be used throughout the game.
 
 
+# The numeric backend is chosen at startup: "exact" (arbitrary precision mpf numbers) or "fast" (native floats).
+load_dotenv()
+NUMBER_BACKEND: str = os.environ.get("NUMBER_BACKEND", "exact")
+if NUMBER_BACKEND not in ["exact", "fast"]:
+    raise ValueError("Unknown numeric backend: " + str(NUMBER_BACKEND))
+
+FAST_NUMBER_MAX_EXPONENT: int = 300  # larger powers of ten are mpf numbers even in the fast backend
+FAST_NUMBER_MAX: float = 1e300  # native floats beyond this are promoted to mpf numbers before they overflow
+
 LETTERS: str = "abcdefghijklmnopqrstuvwxyz"
+# Attacking element: (elements taking double damage from it, elements taking half damage from it)
+ELEMENT_EFFECTIVENESS: dict = {
+    "TERRA": (["ELECTRIC", "DARK"], ["METAL", "WAR"]),
+    "FLAME": (["NATURE", "ICE"], ["SEA", "WAR"]),
+    "SEA": (["FLAME", "WAR"], ["NATURE", "ELECTRIC"]),
+    "NATURE": (["SEA", "LIGHT"], ["FLAME", "ICE"]),
+    "ELECTRIC": (["SEA", "METAL"], ["TERRA", "LIGHT"]),
+    "ICE": (["NATURE", "WAR"], ["FLAME", "METAL"]),
+    "METAL": (["TERRA", "ICE"], ["ELECTRIC", "DARK"]),
+    "DARK": (["METAL", "LIGHT"], ["TERRA"]),
+    "LIGHT": (["ELECTRIC", "DARK"], ["NATURE"]),
+    "WAR": (["TERRA", "FLAME"], ["SEA", "ICE"]),
+    "PURE": (["LEGEND"], ["PRIMAL"]),
+    "LEGEND": (["PRIMAL"], ["PURE"]),
+    "PRIMAL": (["PURE"], ["LEGEND"]),
+    "WIND": (["WIND"], []),
+    "BEAUTY": ([], []),
+    "MAGIC": ([], []),
+    "CHAOS": ([], []),
+    "HAPPY": ([], []),
+    "DREAM": ([], []),
+    "SOUL": ([], [])
+}
+ELEMENTS: list = list(ELEMENT_EFFECTIVENESS.keys())
+ELEMENT_CODES: dict = {element: code for code, element in enumerate(ELEMENTS)}
 ELEMENT_CHART: list = [
-    ["ATTACKING\nELEMENT", "TERRA", "FLAME", "SEA", "NATURE", "ELECTRIC", "ICE", "METAL", "DARK", "LIGHT", "WAR",
-     "PURE",
-     "LEGEND", "PRIMAL", "WIND"],
-    ["DOUBLE\nDAMAGE", "ELECTRIC\nDARK", "NATURE\nICE", "FLAME\nWAR", "SEA\nLIGHT", "SEA\nMETAL", "NATURE\nWAR",
-     "TERRA\nICE", "METAL\nLIGHT", "ELECTRIC\nDARK", "TERRA\nFLAME", "LEGEND", "PRIMAL", "PURE", "WIND"],
-    ["HALF\nDAMAGE", "METAL\nWAR", "SEA\nWAR", "NATURE\nELECTRIC", "FLAME\nICE", "TERRA\nLIGHT", "FLAME\nMETAL",
-     "ELECTRIC\nDARK", "TERRA", "NATURE", "SEA\nICE", "PRIMAL", "PURE", "LEGEND", "N/A"],
-    ["NORMAL\nDAMAGE", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER", "OTHER",
-     "OTHER",
-     "OTHER", "OTHER", "OTHER"]
+    ["ATTACKING\nELEMENT"] + ELEMENTS,
+    ["DOUBLE\nDAMAGE"] + ["\n".join(ELEMENT_EFFECTIVENESS[element][0]) or "N/A" for element in ELEMENTS],
+    ["HALF\nDAMAGE"] + ["\n".join(ELEMENT_EFFECTIVENESS[element][1]) or "N/A" for element in ELEMENTS],
+    ["NORMAL\nDAMAGE"] + ["OTHER" for element in ELEMENTS]
 ]
 
+# Damage multipliers indexed by [attacking element code][defending element code]
+ELEMENT_MULTIPLIER_MATRIX: np.ndarray = np.ones((len(ELEMENTS), len(ELEMENTS)))
+for attacking_element, (double_damage_elements, half_damage_elements) in ELEMENT_EFFECTIVENESS.items():
+    for defending_element in double_damage_elements:
+        ELEMENT_MULTIPLIER_MATRIX[ELEMENT_CODES[attacking_element], ELEMENT_CODES[defending_element]] = 2
+    for defending_element in half_damage_elements:
+        ELEMENT_MULTIPLIER_MATRIX[ELEMENT_CODES[attacking_element], ELEMENT_CODES[defending_element]] = 0.5
+
+ITEM_SHOP_ITEM_TYPES: list = ["BALL", "RUNE", "AWAKEN SHARD", "EXP SHARD", "LEVEL UP SHARD", "SKILL LEVEL UP SHARD"]
+NAME_KINDS: dict = {
+    "CITY": "a fictional city",
+    "CHARACTER": "a male/female game character",
+    "BALL": "a ball to catch a monster like in Pokemon games",
+    "RUNE": "a rune to strengthen legendary creatures"
+}
+NAME_MAX_LENGTH: int = 30
+NAME_BATCH_MAX_SIZE: int = 50  # maximum number of names requested from Gemini in one request
+NAME_GENERATION_MAX_ATTEMPTS: int = 3
+ITEM_SHOP_CONCURRENCY_LIMIT: int = 10  # maximum number of item name requests sent to Gemini at a time
+_event_loop: asyncio.AbstractEventLoop or None = None  # initial value
+LLM_CACHE_FILE_NAME: str = "../llm_response_cache.sqlite3"
+LLM_CACHE_VARIANTS_PER_KEY: int = 3  # number of different responses kept for the same prompt
+LLM_CACHE_MAX_ENTRIES: int = 10000
+LLM_CACHE_TIME_TO_LIVE: float = 30 * 24 * 60 * 60  # 30 days in seconds
+GEMINI_MODEL_NAME: str = "gemini-1.5-pro"
+GEMINI_REQUESTS_PER_MINUTE: float = 60
+GEMINI_TOKENS_PER_MINUTE: float = 1000000
+GEMINI_MAX_CONCURRENT_REQUESTS: int = 10
+LLM_STAND_IN_SERVER_URL: str = "http://127.0.0.1:8765"
+HTTP_MAX_IDLE_CONNECTIONS: int = 10  # number of connections to the stand-in server kept open for reuse
+CITY_PREFETCH_DISTANCE: int = 2  # number of tiles from a portal at which the next city starts being built
+LLM_CALL_DEADLINE: float = 30  # maximum number of seconds a single attempt to call Gemini may take
+LLM_CALL_TIME_BUDGET: float = 60  # maximum number of seconds a call to Gemini may take including retries
+LLM_MAX_RETRIES: int = 3
+LLM_BACKOFF_BASE_TIME: float = 0.5  # in seconds
+LLM_BACKOFF_MAX_TIME: float = 8  # in seconds
+CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # number of consecutive failures after which Gemini is not called
+CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30  # number of seconds before Gemini is tried again
+NPC_CONTEXT_MAX_TURNS: int = 6  # number of turns of an NPC conversation sent to Gemini verbatim
+NPC_CONTEXT_MAX_TOKENS: int = 2000  # maximum number of prompt tokens of a turn of an NPC conversation
+NPC_SUMMARY_MAX_WORDS: int = 100
+MISSION_BOARD_POOL_SIZE: int = 3  # number of missions kept ready for each kind of city tile
+MISSION_BOARD_RETRY_DELAY: float = 10  # number of seconds to wait before retrying failed mission generation
+MISSION_NAME_MAX_LENGTH: int = 60
+BATTLE_SIMULATION_MAX_TURNS: int = 10000  # number of turns after which a simulated battle has no winner
+BATTLE_SIMULATION_CHUNKS_PER_WORKER: int = 4  # number of batches of battles handed to each simulator process
+MAGNITUDE_ATTRIBUTES: list = ["exp", "required_exp", "dollars", "dollars_cost", "sell_dollars_gain",
+                              "level_up_dollars_cost", "exp_granted", "player_reward_exp", "player_reward_dollars",
+                              "legendary_creature_reward_exp"]  # attributes holding magnitudes
+SAVE_FILE_MAGIC: bytes = b"GCPASAVE"  # first bytes of saved game files (older ones are pickles)
+SAVE_FORMAT_VERSION: int = 1
+AUTOSAVE_FILE_MAGIC: bytes = b"GCPAAUTO"  # first bytes of autosave snapshots and journals
+AUTOSAVE_SNAPSHOT_SUFFIX: str = ".autosave"  # appended to the name of the saved game file
+AUTOSAVE_JOURNAL_SUFFIX: str = ".journal"  # appended to the name of the saved game file
+AUTOSAVE_COMPACT_RECORDS: int = 50  # number of records after which the autosave journal is compacted
+AUTOSAVE_COMPACT_INTERVAL: float = 30.0  # in seconds, time after which a non-empty journal is compacted
+TEMPORARY_FILE_SUFFIX: str = ".tmp"
+LLM_TRACE_FILE_NAME: str = "../llm_trace.jsonl"
+LLM_DEFAULT_CALL_SITE: str = "other"
+GEMINI_INPUT_PRICE_PER_MILLION_TOKENS: float = 1.25  # in USD, for prompts of up to 128k tokens
+GEMINI_OUTPUT_PRICE_PER_MILLION_TOKENS: float = 5.0  # in USD, for prompts of up to 128k tokens
+TRANSIENT_LLM_ERRORS: tuple = (ConnectionError, TimeoutError, FutureTimeoutError, asyncio.TimeoutError,
+                               http.client.HTTPException, google_exceptions.TooManyRequests,
+                               google_exceptions.InternalServerError, google_exceptions.ServiceUnavailable,
+                               google_exceptions.GatewayTimeout, google_exceptions.DeadlineExceeded)
+
 
 # Creating static functions to be used in this game.
 
 
-def is_number(string: str) -> bool:
+# Types of numbers used in this game, which are handled without parsing
+NUMBER_TYPES: tuple = (int, float, mpf)
+
+
+def parse_number(value):
+    # Getting the number in 'value' (a number, or a string which is parsed once), or None if it is not a number.
+    if isinstance(value, NUMBER_TYPES):
+        return value
+    elif isinstance(value, str):
+        try:
+            return mpf(value)
+        except ValueError:
+            return None
+    return None
+
+
+def is_number(value) -> bool:
+    return parse_number(value) is not None
+
+
+# Creating a number with the numeric backend chosen at startup
+number: typing.Callable = float if NUMBER_BACKEND == "fast" else mpf
+
+
+# Elemental damage multipliers as numbers of the chosen numeric backend, made once for lookups during battles
+NEUTRAL_ELEMENT_MULTIPLIER: mpf = number("1")
+ELEMENT_MULTIPLIERS: list = [[{2: number("2"), 0.5: number("0.5")}.get(multiplier, NEUTRAL_ELEMENT_MULTIPLIER)
+                              for multiplier in row] for row in ELEMENT_MULTIPLIER_MATRIX.tolist()]
+
+
+def power_of_ten(exponent: int) -> mpf:
+    if NUMBER_BACKEND == "fast" and exponent <= FAST_NUMBER_MAX_EXPONENT:
+        return 10.0 ** exponent
+    return mpf("10") ** exponent
+
+
+# Heal amounts and magic points costs of skills of new legendary creatures, made once for the exponents 0 to 4 * 4
+SKILL_POWERS_OF_TEN: list = [power_of_ten(exponent) for exponent in range(17)]
+
+
+def multiply(a, b):
+    # Multiplying two numbers, switching to mpf numbers where a native float would overflow.
     try:
-        mpf(string)
-        return True
-    except ValueError:
-        return False
+        product = a * b
+    except OverflowError:
+        return mpf(a) * mpf(b)
+    if isinstance(product, float) and not -FAST_NUMBER_MAX <= product <= FAST_NUMBER_MAX:
+        return mpf(a) * mpf(b)
+    return product
+
+
+def convert_number(value):
+    # Converting a number stored by the other numeric backend to the numeric backend chosen at startup.
+    if NUMBER_BACKEND == "fast" and isinstance(value, mpf) and -FAST_NUMBER_MAX <= value <= FAST_NUMBER_MAX:
+        return float(value)
+    elif NUMBER_BACKEND == "exact" and isinstance(value, float):
+        return mpf(value)
+    return value
+
+
+def convert_numbers(obj, visited=None):
+    # Converting all numbers stored in the game objects reachable from 'obj' (in place).
+    visited = visited if visited is not None else set()
+    if id(obj) in visited:
+        return
+
+    visited.add(id(obj))
+    if isinstance(obj, list):
+        items = enumerate(obj)
+    elif isinstance(obj, dict):
+        items = obj.items()
+    elif type(obj).__module__ == __name__ and hasattr(obj, "__dict__"):
+        obj = vars(obj)
+        items = obj.items()
+    else:
+        return
+
+    for key, value in list(items):
+        obj[key] = convert_number(value)
+        convert_numbers(obj[key], visited)
+
+
+class Magnitude:
+    """
+    This class contains attributes of a number growing exponentially in this game (EXP, dollars, rewards, and costs),
+    stored as a mantissa (1 <= |mantissa| < 10, or 0) and an exponent of ten so that arithmetic on it takes constant
+    time however large it gets.
+    """
+
+    # Numbers whose exponents are further apart than this are too far apart for the smaller one to change their sum.
+    MAX_EXPONENT_DIFFERENCE: int = 17
+
+    __slots__ = ("mantissa", "exponent")
+
+    def __init__(self, value=0, exponent=0):
+        # type: (object, int) -> None
+        if isinstance(value, Magnitude):
+            self.__set(value.mantissa, value.exponent + exponent)
+            return
+
+        if isinstance(value, str):
+            value = mpf(value)
+
+        if not isinstance(value, NUMBER_TYPES):
+            raise TypeError("Cannot make a magnitude out of " + str(type(value).__name__) + ".")
+        elif value == 0:
+            self.__set(0.0, 0)
+        elif isinstance(value, mpf):
+            if not mp.isfinite(value):
+                raise ValueError("Cannot make a magnitude out of " + str(value) + ".")
+            value_exponent: int = int(mp.floor(mp.log10(abs(value))))
+            self.__set(float(value / mpf(10) ** value_exponent), value_exponent + exponent)
+        elif isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError("Cannot make a magnitude out of " + str(value) + ".")
+            self.__set(value, exponent)
+        elif -FAST_NUMBER_MAX <= value <= FAST_NUMBER_MAX:
+            self.__set(float(value), exponent)
+        else:
+            # Integers too large for floats are divided by a power of ten first.
+            value_exponent: int = int(math.floor(math.log10(abs(value))))
+            self.__set(value / 10 ** value_exponent, value_exponent + exponent)
+
+    def __set(self, mantissa, exponent):
+        # type: (float, int) -> None
+        if 1 <= abs(mantissa) < 10:
+            self.mantissa: float = mantissa
+            self.exponent: int = exponent
+            return
+        elif mantissa == 0:
+            self.mantissa = 0.0
+            self.exponent = 0
+            return
+
+        shift: int = math.floor(math.log10(abs(mantissa)))
+        if shift != 0:
+            mantissa /= 10.0 ** shift
+            exponent += shift
+
+        # Rounding may leave the mantissa just outside [1, 10).
+        if abs(mantissa) >= 10:
+            mantissa /= 10
+            exponent += 1
+        elif abs(mantissa) < 1:
+            mantissa *= 10
+            exponent -= 1
+
+        self.mantissa = mantissa
+        self.exponent = exponent
+
+    @staticmethod
+    def __make(mantissa, exponent):
+        # type: (float, int) -> Magnitude
+        magnitude: Magnitude = object.__new__(Magnitude)
+        magnitude.__set(mantissa, exponent)
+        return magnitude
+
+    @staticmethod
+    def __coerce(value):
+        # type: (object) -> Magnitude or None
+        if isinstance(value, Magnitude):
+            return value
+        elif isinstance(value, NUMBER_TYPES):
+            return Magnitude(value)
+        return None
+
+    @staticmethod
+    def power_of_ten(exponent):
+        # type: (int) -> Magnitude
+        return Magnitude.__make(1.0, exponent)
+
+    def log10(self):
+        # type: () -> float
+        return math.log10(abs(self.mantissa)) + self.exponent
+
+    def to_mpf(self):
+        # type: () -> mpf
+        return mpf(self.mantissa) * mpf(10) ** self.exponent
+
+    def __add__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        if other is None:
+            return NotImplemented
+        elif other.mantissa == 0 or self.exponent - other.exponent > self.MAX_EXPONENT_DIFFERENCE:
+            return self
+        elif self.mantissa == 0 or other.exponent - self.exponent > self.MAX_EXPONENT_DIFFERENCE:
+            return other
+        elif self.exponent >= other.exponent:
+            return Magnitude.__make(self.mantissa + other.mantissa / 10.0 ** (self.exponent - other.exponent),
+                                    self.exponent)
+        return Magnitude.__make(other.mantissa + self.mantissa / 10.0 ** (other.exponent - self.exponent),
+                                other.exponent)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        # type: () -> Magnitude
+        return Magnitude.__make(-self.mantissa, self.exponent)
+
+    def __abs__(self):
+        # type: () -> Magnitude
+        return Magnitude.__make(abs(self.mantissa), self.exponent)
+
+    def __sub__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self + -other
+
+    def __rsub__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else other + -self
+
+    def __mul__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        if other is None:
+            return NotImplemented
+        return Magnitude.__make(self.mantissa * other.mantissa, self.exponent + other.exponent)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        if other is None:
+            return NotImplemented
+        elif other.mantissa == 0:
+            raise ZeroDivisionError("Cannot divide a magnitude by zero.")
+        return Magnitude.__make(self.mantissa / other.mantissa, self.exponent - other.exponent)
+
+    def __rtruediv__(self, other):
+        # type: (object) -> Magnitude
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else other / self
+
+    def __key(self):
+        # type: () -> tuple
+        # Larger exponents make positive numbers larger and negative numbers smaller.
+        sign: int = (self.mantissa > 0) - (self.mantissa < 0)
+        return sign, sign * self.exponent, self.mantissa
+
+    def __eq__(self, other):
+        # type: (object) -> bool
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self.__key() == other.__key()
+
+    def __lt__(self, other):
+        # type: (object) -> bool
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self.__key() < other.__key()
+
+    def __le__(self, other):
+        # type: (object) -> bool
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self.__key() <= other.__key()
+
+    def __gt__(self, other):
+        # type: (object) -> bool
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self.__key() > other.__key()
+
+    def __ge__(self, other):
+        # type: (object) -> bool
+        other = Magnitude.__coerce(other)
+        return NotImplemented if other is None else self.__key() >= other.__key()
+
+    def __hash__(self):
+        # type: () -> int
+        # Equal numbers have equal hashes whether they are magnitudes or not.
+        value: float = float(self)
+        return hash(value) if math.isfinite(value) else hash(self.__key())
+
+    def __bool__(self):
+        # type: () -> bool
+        return self.mantissa != 0
+
+    def __float__(self):
+        # type: () -> float
+        try:
+            return self.mantissa * 10.0 ** self.exponent
+        except OverflowError:
+            return math.copysign(math.inf, self.mantissa)
+
+    def __reduce__(self):
+        # type: () -> tuple
+        return Magnitude, (self.mantissa, self.exponent)
+
+    def __str__(self):
+        # type: () -> str
+        # Showing 15 significant digits like mpf numbers do
+        digits, shift = ("%.14e" % self.mantissa).split("e")
+        exponent: int = self.exponent + int(shift)
+        if -5 < exponent < 15:
+            return repr(float(digits + "e" + str(exponent)))
+        digits = digits.rstrip("0")
+        if digits.endswith("."):
+            digits += "0"
+        return digits + "e" + ("+" if exponent >= 0 else "-") + str(abs(exponent))
+
+    def __repr__(self):
+        # type: () -> str
+        return "Magnitude(" + repr(self.mantissa) + ", " + str(self.exponent) + ")"
+
+    def clone(self):
+        # type: () -> Magnitude
+        return self
+
+
+def convert_magnitudes(obj, visited=None):
+    # Converting the numbers stored in attributes holding magnitudes in the game objects reachable from 'obj' (in
+    # place).
+    visited = visited if visited is not None else set()
+    if id(obj) in visited:
+        return
+
+    visited.add(id(obj))
+    if isinstance(obj, list):
+        values = obj
+    elif isinstance(obj, dict):
+        values = obj.values()
+    elif type(obj).__module__ == __name__ and hasattr(obj, "__dict__"):
+        for key in MAGNITUDE_ATTRIBUTES:
+            if isinstance(getattr(obj, key, None), NUMBER_TYPES):
+                setattr(obj, key, Magnitude(getattr(obj, key)))
+        values = vars(obj).values()
+    else:
+        return
+
+    for value in list(values):
+        convert_magnitudes(value, visited)
 
 
 def list_to_string(a_list: list) -> str:
@@ -68,117 +515,364 @@ def list_to_string(a_list: list) -> str:
     return res + "]"
 
 
+def split_into_chunks(text: str, num_chunks: int) -> list:
+    chunk_length: int = max(1, -(-len(text) // max(1, num_chunks)))  # ceiling division
+    return [text[i:i + chunk_length] for i in range(0, len(text), chunk_length)] if len(text) > 0 else [""]
+
+
+def get_content_text(content) -> str:
+    # Getting the text of a chat message given either as a string, a dictionary, or a Gemini content object.
+    if isinstance(content, str):
+        return content
+    parts = content.get("parts", []) if isinstance(content, dict) else getattr(content, "parts", [])
+    return "".join(part if isinstance(part, str) else str(getattr(part, "text", "")) for part in parts)
+
+
 def tabulate_element_chart() -> str:
     return str(tabulate(ELEMENT_CHART, headers='firstrow', tablefmt='fancy_grid'))
 
 
-def generate_random_name() -> str:
+class RandomStreams:
+    """
+    This class contains attributes of the random number streams of a session of this game. Every subsystem (city
+    generation, battles, AI players, encounters, the item shop, ...) draws from its own stream, which is seeded from
+    the session seed and the name of the stream, so the random choices of one subsystem do not shift when another
+    one draws more or fewer numbers.
+    """
+
+    def __init__(self, seed):
+        # type: (int) -> None
+        self.seed: int = seed
+        self.__streams: dict = {}  # name -> random.Random
+        self.__lock: threading.Lock = threading.Lock()
+
+    def get(self, name):
+        # type: (str) -> random.Random
+        with self.__lock:
+            if name not in self.__streams:
+                digest: bytes = hashlib.sha256((str(self.seed) + ":" + str(name)).encode("utf-8")).digest()
+                self.__streams[name] = random.Random(int.from_bytes(digest[:8], "big"))
+
+            return self.__streams[name]
+
+
+_random_streams: RandomStreams or None = None  # initial value
+
+
+def seed_random_streams(seed):
+    # type: (int) -> RandomStreams
+    """
+    Seeding all the random number streams (and the random module, for anything not drawing from a stream) from
+    'seed'.
+    :return: the random number streams
+    """
+
+    global _random_streams
+    random.seed(seed)
+    _random_streams = RandomStreams(seed)
+    return _random_streams
+
+
+def get_random_stream(name):
+    # type: (str) -> random.Random
+    # Sessions which were not seeded explicitly get a random seed the first time a stream is needed.
+    if _random_streams is None:
+        seed_random_streams(random.getrandbits(64))
+
+    return _random_streams.get(name)
+
+
+def generate_random_name(rng: random.Random or None = None) -> str:
+    rng = rng if rng is not None else get_random_stream("names")
     res: str = ""  # initial value
-    name_length: int = random.randint(3, 25)
+    name_length: int = rng.randint(3, 25)
     for i in range(name_length):
-        res += LETTERS[random.randint(0, len(LETTERS) - 1)]
+        res += LETTERS[rng.randint(0, len(LETTERS) - 1)]
 
     return res.capitalize()
 
 
 def generate_random_legendary_creature(element):
     # type: (str) -> LegendaryCreature
-    name: str = generate_random_name()
-    max_hp: mpf = mpf(random.randint(45000, 55000))
-    max_magic_points: mpf = mpf(random.randint(45000, 55000))
-    attack_power: mpf = mpf(random.randint(8500, 9500))
-    defense: mpf = mpf(random.randint(8500, 9500))
-    attack_speed: mpf = mpf(random.randint(100, 125))
-    skills: list = []  # initial value
-    num_attack_skills: int = 0  # initial value
-    num_heal_skills: int = 0  # initial value
-    for i in range(4):
-        if random.random() < 0.5:
-            # Generating attack skill
-            num_attack_skills += 1
-            new_skill: Skill = Skill("ATTACK SKILL #" + str(num_attack_skills), "An attack skill.",
-                                     "ATTACK", num_attack_skills * mpf("0.01") * random.randint(350, 450),
-                                     mpf("0"), mpf("10") ** (num_attack_skills * random.randint(2, 4)))
-            skills.append(new_skill)
-        else:
-            # Generating heal skill
-            num_heal_skills += 1
-            new_skill: Skill = Skill("HEAL SKILL #" + str(num_heal_skills), "A heal skill", "HEAL",
-                                     mpf("0"), mpf("10") ** (num_attack_skills * random.randint(1, 3)),
-                                     mpf("10") ** (num_attack_skills * random.randint(2, 4)))
-            skills.append(new_skill)
-
-    awaken_bonus: AwakenBonus = AwakenBonus(mpf(random.randint(115, 135)), mpf(random.randint(115, 135)),
-                                            mpf(random.randint(115, 135)), mpf(random.randint(115, 135)),
-                                            mpf(random.randint(0, 15)),
-                                            mpf(0.01 * random.randint(0, 15)), mpf(0.01 * random.randint(0, 15)))
-    new_legendary_creature: LegendaryCreature = LegendaryCreature(name, element, max_hp, max_magic_points,
-                                                                  attack_power, defense, attack_speed, skills,
-                                                                  awaken_bonus)
-    return new_legendary_creature
+    return generate_creatures(1, [element])[0]
+
+
+def generate_creatures(n, elements, level=1, seed=None):
+    # type: (int, list or str, int, int or np.random.Generator or None) -> list
+    """
+    Generating 'n' random legendary creatures at 'level' at once, with elements chosen from 'elements'. All their
+    names and stats are drawn together from a NumPy generator made from 'seed' (an integer or a generator), or from
+    the "creatures" random stream if no seed is given so that seed_random_streams() still makes the game
+    reproducible.
+    :return: a list of the legendary creatures
+    """
+
+    rng: np.random.Generator = np.random.default_rng(seed if seed is not None else
+                                                     get_random_stream("creatures").getrandbits(64))
+    elements = [elements] if isinstance(elements, str) else list(elements)
+
+    # Every row holds the integers drawn for one legendary creature: the index of its element, the length of its
+    # name, its stats, the rolls for its four skills (damage multipliers, heal amounts, and magic points costs), and
+    # the rolls for its awaken bonus.
+    rolls: np.ndarray = rng.integers([0, 3, 45000, 45000, 8500, 8500, 100] + [350] * 4 + [1] * 4 + [2] * 4 +
+                                     [115] * 4 + [0] * 3,
+                                     [len(elements), 26, 55001, 55001, 9501, 9501, 126] + [451] * 4 + [4] * 4 +
+                                     [5] * 4 + [136] * 4 + [16] * 3, (n, 26))
+
+    # Names are cut out of one string of random letters.
+    name_ends: list = np.cumsum(rolls[:, 1]).tolist()
+    letters: str = np.frombuffer(LETTERS.encode(), dtype=np.uint8)[
+        rng.integers(0, len(LETTERS), name_ends[-1] if n > 0 else 0)].tobytes().decode()
+
+    # Each of the four skills is an attack skill or a heal skill with equal chance.
+    is_attack_skill: np.ndarray = rng.random((n, 4)) < 0.5
+    num_attack_skills: list = np.cumsum(is_attack_skill, axis=1).tolist()
+    num_heal_skills: list = np.cumsum(~is_attack_skill, axis=1).tolist()
+    is_attack_skill: list = is_attack_skill.tolist()
+
+    zero: mpf = number("0")
+    one_percent: mpf = number("0.01")
+    legendary_creatures: list = []  # initial value
+    for i, row in enumerate(rolls.tolist()):
+        skills: list = []  # initial value
+        for j in range(4):
+            num_attack_skills_so_far: int = num_attack_skills[i][j]
+            if is_attack_skill[i][j]:
+                skills.append(Skill("ATTACK SKILL #" + str(num_attack_skills_so_far), "An attack skill.", "ATTACK",
+                                    num_attack_skills_so_far * one_percent * row[7 + j], zero,
+                                    SKILL_POWERS_OF_TEN[num_attack_skills_so_far * row[15 + j]]))
+            else:
+                skills.append(Skill("HEAL SKILL #" + str(num_heal_skills[i][j]), "A heal skill", "HEAL", zero,
+                                    SKILL_POWERS_OF_TEN[num_attack_skills_so_far * row[11 + j]],
+                                    SKILL_POWERS_OF_TEN[num_attack_skills_so_far * row[15 + j]]))
+
+        awaken_bonus: AwakenBonus = AwakenBonus(number(row[19]), number(row[20]), number(row[21]), number(row[22]),
+                                                number(row[23]), number(0.01 * row[24]), number(0.01 * row[25]))
+        legendary_creature: LegendaryCreature = LegendaryCreature(
+            letters[name_ends[i] - row[1]:name_ends[i]].capitalize(), elements[row[0]], number(row[2]),
+            number(row[3]), number(row[4]), number(row[5]), number(row[6]), skills, awaken_bonus)
+        legendary_creature.level_to(level)
+        legendary_creatures.append(legendary_creature)
+
+    return legendary_creatures
+
+
+def get_average_battle_creature_level(player):
+    # type: (Player) -> int
+    legendary_creatures: list = player.battle_team.get_legendary_creatures()
+    if len(legendary_creatures) == 0:
+        return 1
+    return sum(legendary_creature.level for legendary_creature in legendary_creatures) // len(legendary_creatures)
+
+
+def generate_city_tiles(rng=None):
+    # type: (random.Random or None) -> list
+    rng = rng if rng is not None else get_random_stream("city")
+    city_width: int = rng.randint(6, 10)
+    city_height: int = rng.randint(6, 10)
+    city_tiles: list = []  # initial value
+    portals: int = 0  # initial value
+    for y in range(city_height):
+        curr_row: list = []
+        for x in range(city_width):
+            if x == 0 and y == 0:
+                curr_tile: str = rng.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
+                if curr_tile == "DOWNTOWN":
+                    curr_row.append(DowntownTile())
+                elif curr_tile == "SUBURB":
+                    curr_row.append(SuburbTile())
+                elif curr_tile == "PARK":
+                    curr_row.append(ParkTile())
+                elif curr_tile == "BEACH":
+                    curr_row.append(BeachTile())
+            elif portals == 0:
+                if x == city_width - 1 and y == city_height - 1:
+                    portals += 1
+                    curr_row.append(PortalTile())
+                else:
+                    curr_tile: str = rng.choice(["PORTAL", "DOWNTOWN", "SUBURB", "PARK", "BEACH"])
+                    if curr_tile == "PORTAL":
+                        curr_row.append(PortalTile())
+                    elif curr_tile == "DOWNTOWN":
+                        curr_row.append(DowntownTile())
+                    elif curr_tile == "SUBURB":
+                        curr_row.append(SuburbTile())
+                    elif curr_tile == "PARK":
+                        curr_row.append(ParkTile())
+                    elif curr_tile == "BEACH":
+                        curr_row.append(BeachTile())
+            else:
+                curr_tile: str = rng.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
+                if curr_tile == "DOWNTOWN":
+                    curr_row.append(DowntownTile())
+                elif curr_tile == "SUBURB":
+                    curr_row.append(SuburbTile())
+                elif curr_tile == "PARK":
+                    curr_row.append(ParkTile())
+                elif curr_tile == "BEACH":
+                    curr_row.append(BeachTile())
+        city_tiles.append(curr_row)
+    return city_tiles
 
 
 def triangular(n: int) -> int:
     return int(n * (n - 1) / 2)
 
 
-def mpf_sum_of_list(a_list: list) -> mpf:
-    return mpf(str(sum(mpf(str(elem)) for elem in a_list if is_number(str(elem)))))
+def triangular_product(level: int, new_level: int) -> int:
+    # Getting the product of triangular(n) for every level n from 'level' + 1 to 'new_level' in one step, using
+    # triangular(n) = n * (n - 1) / 2.
+    return (math.factorial(new_level) // math.factorial(level)) * \
+        (math.factorial(new_level - 1) // math.factorial(level - 1)) // 2 ** (new_level - level)
+
+
+def get_required_exp(level: int, required_exp: Magnitude, new_level: int) -> Magnitude:
+    # Getting the EXP required to level up at 'new_level' given that 'required_exp' EXP is required at 'level' and
+    # that reaching level n multiplies the EXP required by 10 ** n.
+    return required_exp * Magnitude.power_of_ten(triangular(new_level + 1) - triangular(level + 1))
+
+
+def get_level_reached(level: int, exp: Magnitude, required_exp: Magnitude) -> int:
+    # Getting the level reached by levelling up as far as 'exp' EXP allows from 'level', at which 'required_exp' EXP
+    # is required to level up.
+    if exp < required_exp:
+        return level
+
+    # Solving triangular(new_level + 1) > triangular(level + 1) + log10(exp / required_exp) for the smallest new level
+    # and correcting the estimate for rounding errors
+    exponent: float = triangular(level + 1) + (Magnitude(exp) / required_exp).log10()
+    new_level: int = max(level + 1, int(math.floor((-1 + math.sqrt(1 + 8 * exponent)) / 2)) + 1)
+    while new_level > level + 1 and exp < get_required_exp(level, required_exp, new_level - 1):
+        new_level -= 1
+    while exp >= get_required_exp(level, required_exp, new_level):
+        new_level += 1
+    return new_level
+
+
+def get_numbers(a_list: typing.Iterable) -> typing.Iterator:
+    # Getting the numbers in 'a_list', skipping elements which are not numbers. Magnitudes are not skipped silently but
+    # rejected, as they are added up and multiplied with the arithmetic of magnitudes instead.
+    for value in a_list:
+        if isinstance(value, Magnitude):
+            raise TypeError("Magnitudes cannot be added up or multiplied as numbers of the numeric backend.")
+
+        value = parse_number(value)
+        if value is not None:
+            yield value
 
 
-def mpf_product_of_list(a_list: list) -> mpf:
-    return mpf(reduce(lambda x, y: mpf(x) * mpf(y) if is_number(x) and
-                                                      is_number(y) else mpf(x) if is_number(x) and not is_number(
-        y) else mpf(y) if is_number(y) and not is_number(x) else 1, a_list, 1))
+def mpf_sum_of_list(a_list: typing.Iterable) -> mpf:
+    # Adding up the numbers in 'a_list' (which may also be a generator), skipping elements which are not numbers.
+    return convert_number(mp.fsum(get_numbers(a_list)))
+
+
+def mpf_product_of_list(a_list: typing.Iterable) -> mpf:
+    # Multiplying the numbers in 'a_list' (which may also be a generator), skipping elements which are not numbers.
+    product: mpf = number(1)  # initial value
+    for value in get_numbers(a_list):
+        product = multiply(product, value if isinstance(value, mpf) else number(value))
+    return convert_number(product)
 
 
 def get_elemental_damage_multiplier(element1: str, element2: str) -> mpf:
-    if element1 == "TERRA":
-        return mpf("2") if element2 in ["ELECTRIC, DARK"] else mpf("0.5") if element2 in ["METAL", "WAR"] else mpf("1")
-    elif element1 == "FLAME":
-        return mpf("2") if element2 in ["NATURE", "ICE"] else mpf("0.5") if element2 in ["SEA", "WAR"] else mpf("1")
-    elif element1 == "SEA":
-        return mpf("2") if element2 in ["FLAME", "WAR"] else mpf("0.5") if element2 in ["NATURE", "ELECTRIC"] else \
-            mpf("1")
-    elif element1 == "NATURE":
-        return mpf("2") if element2 in ["SEA", "LIGHT"] else mpf("0.5") if element2 in ["FLAME", "ICE"] else mpf("1")
-    elif element1 == "ELECTRIC":
-        return mpf("2") if element2 in ["SEA", "METAL"] else mpf("0.5") if element2 in ["TERRA", "LIGHT"] else mpf("1")
-    elif element1 == "ICE":
-        return mpf("2") if element2 in ["NATURE", "WAR"] else mpf("0.5") if element2 in ["FLAME", "METAL"] else mpf("1")
-    elif element1 == "METAL":
-        return mpf("2") if element2 in ["TERRA", "ICE"] else mpf("0.5") if element2 in ["ELECTRIC", "DARK"] else \
-            mpf("1")
-    elif element1 == "DARK":
-        return mpf("2") if element2 in ["METAL", "LIGHT"] else mpf("0.5") if element2 == "TERRA" else mpf("1")
-    elif element1 == "LIGHT":
-        return mpf("2") if element2 in ["ELECTRIC", "DARK"] else mpf("0.5") if element2 == "NATURE" else mpf("1")
-    elif element1 == "WAR":
-        return mpf("2") if element2 in ["TERRA", "FLAME"] else mpf("0.5") if element2 in ["SEA", "ICE"] else mpf("1")
-    elif element1 == "PURE":
-        return mpf("2") if element2 == "LEGEND" else mpf("0.5") if element2 == "PRIMAL" else mpf("1")
-    elif element1 == "LEGEND":
-        return mpf("2") if element2 == "PRIMAL" else mpf("0.5") if element2 == "PURE" else mpf("1")
-    elif element1 == "PRIMAL":
-        return mpf("2") if element2 == "PURE" else mpf("0.5") if element2 == "LEGEND" else mpf("1")
-    elif element1 == "WIND":
-        return mpf("2") if element2 == "WIND" else mpf("1")
-    else:
-        return mpf("1")
+    if element1 not in ELEMENT_CODES or element2 not in ELEMENT_CODES:
+        return NEUTRAL_ELEMENT_MULTIPLIER
+    return ELEMENT_MULTIPLIERS[ELEMENT_CODES[element1]][ELEMENT_CODES[element2]]
+
+
+def get_elemental_damage_multipliers(element_codes1, element_codes2) -> np.ndarray:
+    # Getting the damage multipliers of many attacks at once given arrays of attacking and defending element codes.
+    return ELEMENT_MULTIPLIER_MATRIX[np.asarray(element_codes1), np.asarray(element_codes2)]
+
+
+# Functions upgrading saved game data written with a save format version to the next version (in place)
+SAVE_FORMAT_MIGRATIONS: dict = {
+    0: convert_magnitudes  # pickles written before magnitudes existed stored EXP, dollars, and costs as numbers
+}
+
+
+def read_saved_game_file(file_name):
+    # type: (str) -> tuple
+    # Reading the saved game data in 'file_name' together with the save format version it was written with.
+    with open(file_name, "rb") as save_file:
+        data: bytes = save_file.read()
+
+    if data.startswith(SAVE_FILE_MAGIC):
+        return SavedGameDecoder().decode(data)
+
+    # Saved game data written before the save format existed is a pickle (save format version 0).
+    return SavedGameUnpickler(io.BytesIO(data)).load(), 0
 
 
 def load_game_data(file_name):
     # type: (str) -> SavedGameData
-    return pickle.load(open(file_name, "rb"))
+    # Recorded sessions keep the saved game data they started from, so that they can be replayed anywhere.
+    if _game_session is not None:
+        for saved_game_file_name in [file_name, file_name + AUTOSAVE_SNAPSHOT_SUFFIX,
+                                     file_name + AUTOSAVE_JOURNAL_SUFFIX]:
+            if os.path.exists(saved_game_file_name):
+                _game_session.record_saved_game(saved_game_file_name)
+
+    # Autosaved game data is only left behind if the game stopped before the player exited it, so it is newer than
+    # the saved game file (if any).
+    autosaved_game_data: tuple or None = None  # initial value
+    try:
+        autosaved_game_data = AutosaveService.load(file_name)
+    except ValueError:
+        if not os.path.exists(file_name):
+            raise
+
+    game_data, version = autosaved_game_data if autosaved_game_data is not None else \
+        read_saved_game_file(file_name)
+    for old_version in range(version, SAVE_FORMAT_VERSION):
+        SAVE_FORMAT_MIGRATIONS[old_version](game_data)
+
+    # Saved game data written before numeric backends existed used mpf numbers.
+    if getattr(game_data, "number_backend", "exact") != NUMBER_BACKEND:
+        convert_numbers(game_data)
+        game_data.number_backend = NUMBER_BACKEND
+    return game_data
 
 
 def save_game_data(game_data, file_name):
     # type: (SavedGameData, str) -> None
-    pickle.dump(game_data, open(file_name, "wb"))
+    game_data.number_backend = NUMBER_BACKEND
+    write_file_atomically(file_name, SavedGameEncoder().encode(game_data))
+
+
+def write_file_atomically(file_name, data):
+    # type: (str, bytes) -> None
+    # Writing a temporary file and renaming it, so that 'file_name' holds either the old or the new data even if the
+    # game or the computer stops in between.
+    temporary_file_name: str = file_name + TEMPORARY_FILE_SUFFIX
+    with open(temporary_file_name, "wb") as temporary_file:
+        temporary_file.write(data)
+        temporary_file.flush()
+        os.fsync(temporary_file.fileno())
+
+    os.replace(temporary_file_name, file_name)
+    sync_directory(os.path.dirname(file_name))
+
+
+def sync_directory(directory):
+    # type: (str) -> None
+    # Making files created, renamed, or removed in 'directory' durable (directories cannot be synced on Windows).
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+
+    directory_fd: int = os.open(directory if directory != "" else ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
 
 
 def clear():
     # type: () -> None
+    # Replayed sessions run headlessly, so there is no screen to clear.
+    if _game_session is not None and _game_session.replaying:
+        return
+
     if sys.platform.startswith('win'):
         os.system('cls')  # For Windows System
     else:
@@ -210,12 +904,12 @@ class Action:
             if user == target:
                 return False
 
-            is_crit: bool = random.random() < user.crit_rate
-            crit_factor: mpf = user.crit_damage if is_crit else mpf("1")
+            is_crit: bool = get_random_stream("battle").random() < user.crit_rate
+            crit_factor: mpf = user.crit_damage if is_crit else number("1")
             raw_damage: mpf = user.attack_power * crit_factor - target.defense
             damage_multiplier_by_element: mpf = get_elemental_damage_multiplier(user.element, target.element)
             raw_damage *= damage_multiplier_by_element
-            damage: mpf = raw_damage if raw_damage > mpf("0") else mpf("0")
+            damage: mpf = raw_damage if raw_damage > number("0") else number("0")
             target.curr_hp -= damage
             print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
             return True
@@ -238,12 +932,12 @@ class Action:
                     if user.curr_hp >= user.max_hp:
                         user.curr_hp = user.max_hp
                 elif skill_to_use.skill_type == "ATTACK":
-                    is_crit: bool = random.random() < user.crit_rate
-                    crit_factor: mpf = user.crit_damage if is_crit else mpf("1")
+                    is_crit: bool = get_random_stream("battle").random() < user.crit_rate
+                    crit_factor: mpf = user.crit_damage if is_crit else number("1")
                     raw_damage: mpf = user.attack_power * skill_to_use.damage_multiplier * crit_factor - target.defense
                     damage_multiplier_by_element: mpf = get_elemental_damage_multiplier(user.element, target.element)
                     raw_damage *= damage_multiplier_by_element
-                    damage: mpf = raw_damage if raw_damage > mpf("0") else mpf("0")
+                    damage: mpf = raw_damage if raw_damage > number("0") else number("0")
                     target.curr_hp -= damage
                     print(str(user.name) + " dealt " + str(damage) + " damage on " + str(target.name) + "!")
                 return True
@@ -304,6 +998,144 @@ class AwakenBonus:
         return copy.deepcopy(self)
 
 
+class TurnScheduler:
+    """
+    This class contains attributes of the scheduler deciding whose turn it is in a battle.
+
+    Rather than ticking the clock for everyone until someone has a full attack gauge, the scheduler works out the tick
+    at which the attack gauge of a participant becomes full once, whenever it is reset, and keeps the participants in
+    a heap keyed by that tick. Both that tick and the attack gauge at any tick are computed directly from the attack
+    gauge and the tick at which it was last reset. Only the participants with full attack gauges are looked at to
+    decide who moves: the one with the fullest attack gauge, with ties going to the participant which comes last, as
+    before. Where rounding could tell apart attack gauges which the clock used to build by adding the gauge gained
+    per tick over and over, those few are added up the same way, so that the same participant moves.
+    """
+
+    ATTACK_GAUGE_INCREASE_PER_SPEED: float = 0.07  # attack gauge gained per tick for each point of speed
+    ROUNDING_ERROR_PER_TICK: float = 2 ** -40  # bound on the relative rounding error per tick of an attack gauge
+
+    def __init__(self, participants, speed_attribute):
+        # type: (list, str) -> None
+        self.__participants: list = participants
+        self.__rates: list = [getattr(participant, speed_attribute) * self.ATTACK_GAUGE_INCREASE_PER_SPEED
+                              for participant in participants]
+        self.__tick: int = 0  # number of ticks since the battle started
+        self.__gauges: list = [participant.attack_gauge for participant in participants]
+        self.__gauge_ticks: list = [0 for participant in participants]  # ticks at which the gauges above were set
+        self.__heap: list = []  # (tick at which the attack gauge is full, participant index)
+        self.__last_mover: int or None = None  # initial value
+        for index in range(len(participants)):
+            heapq.heappush(self.__heap, (self.__get_ready_tick(index), index))
+
+    def __advance(self, index, tick):
+        # type: (int, int) -> mpf
+        return self.__gauges[index] + self.__rates[index] * (tick - self.__gauge_ticks[index])
+
+    def __add_up(self, index, tick):
+        # type: (int, int) -> mpf
+        # The attack gauge grows by the same additions as the clock used to make, so that ties are broken alike.
+        gauge: mpf = self.__gauges[index]
+        for i in range(tick - self.__gauge_ticks[index]):
+            gauge += self.__rates[index]
+        return gauge
+
+    def __get_rounding_error(self, index, tick, gauge):
+        # type: (int, int, mpf) -> mpf
+        # Bounding how far 'gauge' (the attack gauge at 'tick' computed by __advance()) can be from __add_up().
+        return (tick - self.__gauge_ticks[index] + 2) * self.ROUNDING_ERROR_PER_TICK * \
+            max(abs(gauge), abs(self.__gauges[index]))
+
+    def __get_ready_tick(self, index):
+        # type: (int) -> int or float
+        full_attack_gauge: mpf = self.__participants[index].FULL_ATTACK_GAUGE
+        gauge: mpf = self.__gauges[index]
+        if gauge >= full_attack_gauge:
+            return self.__gauge_ticks[index]
+        elif self.__rates[index] <= 0:
+            return math.inf
+
+        # Rounding may put the quotient a tick off, so the ready tick is checked against the attack gauge which
+        # __advance() actually gives: the first tick at which it is full.
+        ready_tick: int = self.__gauge_ticks[index] + max(1, math.ceil((full_attack_gauge - gauge) /
+                                                                          self.__rates[index]))
+        while ready_tick - 1 > self.__gauge_ticks[index] and \
+                self.__advance(index, ready_tick - 1) >= full_attack_gauge:
+            ready_tick -= 1
+        while self.__advance(index, ready_tick) < full_attack_gauge:
+            ready_tick += 1
+
+        # If the attack gauge is full only just (or only just not), the additions of the clock decide the tick.
+        if any(abs(self.__advance(index, tick) - full_attack_gauge) <=
+               self.__get_rounding_error(index, tick, self.__advance(index, tick))
+               for tick in [ready_tick - 1, ready_tick]):
+            ready_tick = self.__gauge_ticks[index]
+            while gauge < full_attack_gauge:
+                gauge += self.__rates[index]
+                ready_tick += 1
+        return ready_tick
+
+    def next_turn(self):
+        # type: () -> GameCharacter
+        """
+        Advancing the clock to the tick at which someone has a full attack gauge and getting who moves.
+        :return: the participant which moves
+        """
+
+        # The attack gauge of the participant which moved last was reset when it had its turn.
+        if self.__last_mover is not None:
+            self.__gauges[self.__last_mover] = self.__participants[self.__last_mover].attack_gauge
+            self.__gauge_ticks[self.__last_mover] = self.__tick
+            heapq.heappush(self.__heap, (self.__get_ready_tick(self.__last_mover), self.__last_mover))
+            self.__last_mover = None
+
+        if len(self.__heap) == 0 or self.__heap[0][0] == math.inf:
+            raise ValueError("None of the participants of the battle can ever move.")
+
+        check_tick: int = max(self.__tick, self.__heap[0][0])
+        ready: list = []  # initial value
+        while len(self.__heap) > 0 and self.__heap[0][0] <= check_tick:
+            ready.append(heapq.heappop(self.__heap))
+
+        # The clock ticks once more after someone with a full attack gauge is found.
+        self.__tick = check_tick + 1
+        ready_indices: list = sorted(index for ready_tick, index in ready)
+        gauges: dict = {index: self.__advance(index, self.__tick) for index in ready_indices}
+
+        # Attack gauges tying with the fullest one within rounding are added up again as the clock used to.
+        max_attack_gauge: mpf = max(gauges.values())
+        max_rounding_error: mpf = max(self.__get_rounding_error(index, self.__tick, gauges[index])
+                                      for index in ready_indices)
+        tied_indices: list = [index for index in ready_indices
+                              if max_attack_gauge - gauges[index] <= 2 * max_rounding_error]
+        if len(tied_indices) > 1:
+            for index in tied_indices:
+                gauges[index] = self.__add_up(index, self.__tick)
+
+        max_attack_gauge = None
+        for index in ready_indices:
+            self.__participants[index].attack_gauge = gauges[index]
+            if max_attack_gauge is None or gauges[index] >= max_attack_gauge:
+                max_attack_gauge = gauges[index]
+                self.__last_mover = index
+
+        for entry in ready:
+            if entry[1] != self.__last_mover:
+                heapq.heappush(self.__heap, entry)
+
+        return self.__participants[self.__last_mover]
+
+    def sync(self):
+        # type: () -> None
+        """
+        Writing the current attack gauges back to the participants of the battle.
+        :return: None
+        """
+
+        for index in range(len(self.__participants)):
+            if index != self.__last_mover:
+                self.__participants[index].attack_gauge = self.__advance(index, self.__tick)
+
+
 class Battle:
     """
     This class contains attributes of a battle in this game.
@@ -313,6 +1145,9 @@ class Battle:
         # type: (Player) -> None
         self.player1: Player = player1
         self.reward: Reward = Reward()
+        self.turn_scheduler: TurnScheduler or None = None
+        self.num_turns: int = 0
+        self.damage_dealt: list = [[], []]  # damage of each attack by the side of player 1 and by the other side
 
     def __str__(self):
         # type: () -> str
@@ -328,6 +1163,37 @@ class Battle:
 
         return res + ")"
 
+    def sync(self):
+        # type: () -> None
+        """
+        Writing the attack gauges kept by the turn scheduler back to the participants of the battle, so that their
+        current stats can be shown.
+        :return: None
+        """
+
+        if self.turn_scheduler is not None:
+            self.turn_scheduler.sync()
+
+    def take_ai_turn(self, legendary_creature, opponents):
+        # type: (LegendaryCreature, list) -> mpf or None
+        """
+        Letting a legendary creature have its turn with the random choices AI players make.
+        :return: the damage dealt, or None if the legendary creature did not attack
+        """
+
+        rng: random.Random = get_random_stream("ai")
+        chosen_action: str = rng.choice(Action.POSSIBLE_NAMES)
+        skill_to_use: Skill or None = rng.choice(legendary_creature.get_skills()) \
+            if chosen_action == "USE SKILL" else None
+        if chosen_action == "NORMAL HEAL" or (skill_to_use is not None and skill_to_use.skill_type == "HEAL"):
+            legendary_creature.have_turn(legendary_creature, skill_to_use, chosen_action)
+            return None
+
+        target: LegendaryCreature = rng.choice(opponents)
+        hp_before_attack: mpf = target.curr_hp
+        legendary_creature.have_turn(target, skill_to_use, chosen_action)
+        return hp_before_attack - target.curr_hp
+
     def clone(self):
         # type: () -> Battle
         return copy.deepcopy(self)
@@ -344,9 +1210,10 @@ class PVPBattle(Battle):
         self.whose_turn: Player or None = None
         self.winner: Player or None = None
         self.player2: Player = player2
-        self.reward = Reward(mpf("10") ** (5 * self.player2.level),
-                             mpf("10") ** (5 * self.player2.level - 2),
-                             mpf("10") ** (5 * self.player2.level))
+        self.reward = Reward(Magnitude.power_of_ten(5 * self.player2.level),
+                             Magnitude.power_of_ten(5 * self.player2.level - 2),
+                             Magnitude.power_of_ten(5 * self.player2.level))
+        self.turn_scheduler = TurnScheduler([self.player1, self.player2], "speed")
 
     def get_someone_to_move(self):
         # type: () -> None
@@ -355,33 +1222,30 @@ class PVPBattle(Battle):
         :return: None
         """
 
-        # Finding out which legendary creature moves
-        full_attack_gauge_list: list = []  # initial value
-        while len(full_attack_gauge_list) == 0:
-            if self.player1.attack_gauge >= Player.FULL_ATTACK_GAUGE and self.player1 not \
-                        in full_attack_gauge_list:
-                full_attack_gauge_list.append(self.player1)
-
-            if self.player2.attack_gauge >= Player.FULL_ATTACK_GAUGE and self.player2 not \
-                        in full_attack_gauge_list:
-                full_attack_gauge_list.append(self.player2)
-
-            self.tick()
-
-        max_attack_gauge: mpf = max(player.attack_gauge for player in full_attack_gauge_list)
-        for player in full_attack_gauge_list:
-            if player.attack_gauge == max_attack_gauge:
-                self.whose_turn = player
+        self.whose_turn = self.turn_scheduler.next_turn()
 
-    def tick(self):
-        # type: () -> None
+    def simulate(self, max_turns=BATTLE_SIMULATION_MAX_TURNS):
+        # type: (int) -> Player or None
         """
-        The clock ticks when battles are carried out.
-        :return: None
+        Carrying out the battle with both players attacking whenever it is their turn.
+        :return: the winning player, or None if there is no winner after the maximum number of turns
         """
 
-        self.player1.attack_gauge += self.player1.speed * 0.07
-        self.player2.attack_gauge += self.player2.speed * 0.07
+        while self.winner is None and self.num_turns < max_turns:
+            self.get_someone_to_move()
+            side: int = 0 if self.whose_turn == self.player1 else 1
+            other_player: Player = [self.player2, self.player1][side]
+            hp_before_attack: mpf = other_player.curr_hp
+            self.whose_turn.attack(other_player)
+            self.damage_dealt[side].append(hp_before_attack - other_player.curr_hp)
+
+            self.num_turns += 1
+            if not self.player1.is_alive():
+                self.winner = self.player2
+            elif not self.player2.is_alive():
+                self.winner = self.player1
+
+        return self.winner
 
 
 class WildBattle(Battle):
@@ -395,11 +1259,13 @@ class WildBattle(Battle):
         self.wild_legendary_creature: LegendaryCreature = wild_legendary_creature
         self.whose_turn: LegendaryCreature or None = None
         self.winner: BattleTeam or None = None
-        self.reward = Reward(mpf("10") ** (5 * self.wild_legendary_creature.level),
-                             mpf("10") ** (5 * self.wild_legendary_creature.level - 2),
-                             mpf("10") ** (5 * self.wild_legendary_creature.level))
+        self.reward = Reward(Magnitude.power_of_ten(5 * self.wild_legendary_creature.level),
+                             Magnitude.power_of_ten(5 * self.wild_legendary_creature.level - 2),
+                             Magnitude.power_of_ten(5 * self.wild_legendary_creature.level))
         self.wild_legendary_creature_caught: bool = False
         self.player_fled: bool = False
+        self.turn_scheduler = TurnScheduler(self.player1.battle_team.get_legendary_creatures() +
+                                            [self.wild_legendary_creature], "attack_speed")
 
     def get_someone_to_move(self):
         # type: () -> None
@@ -408,36 +1274,32 @@ class WildBattle(Battle):
         :return: None
         """
 
-        # Finding out which legendary creature moves
-        full_attack_gauge_list: list = []  # initial value
-        while len(full_attack_gauge_list) == 0:
-            for legendary_creature in self.player1.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
+        self.whose_turn = self.turn_scheduler.next_turn()
 
-            if (self.wild_legendary_creature.attack_gauge >= self.wild_legendary_creature.FULL_ATTACK_GAUGE and
-                    self.wild_legendary_creature not in full_attack_gauge_list):
-                full_attack_gauge_list.append(self.wild_legendary_creature)
-
-            self.tick()
-
-        max_attack_gauge: mpf = max(legendary_creature.attack_gauge for legendary_creature in full_attack_gauge_list)
-        for legendary_creature in full_attack_gauge_list:
-            if legendary_creature.attack_gauge == max_attack_gauge:
-                self.whose_turn = legendary_creature
-
-    def tick(self):
-        # type: () -> None
+    def simulate(self, max_turns=BATTLE_SIMULATION_MAX_TURNS):
+        # type: (int) -> BattleTeam or None
         """
-        The clock ticks when battles are carried out.
-        :return: None
+        Carrying out the battle with the legendary creatures of player 1 making random choices like the wild
+        legendary creature does (without fleeing or catching).
+        :return: the winning battle team, or None if there is no winner after the maximum number of turns
         """
 
-        for legendary_creature in self.player1.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
+        while self.winner is None and self.num_turns < max_turns:
+            self.get_someone_to_move()
+            side: int = 1 if self.whose_turn == self.wild_legendary_creature else 0
+            damage: mpf or None = self.take_ai_turn(self.whose_turn, [[self.wild_legendary_creature],
+                                                                      self.player1.battle_team.
+                                                                      get_legendary_creatures()][side])
+            if damage is not None:
+                self.damage_dealt[side].append(damage)
+
+            self.num_turns += 1
+            if not self.wild_legendary_creature.get_is_alive():
+                self.winner = self.player1.battle_team
+            elif self.player1.battle_team.all_died():
+                self.winner = BattleTeam([self.wild_legendary_creature])
 
-        self.wild_legendary_creature.attack_gauge += self.wild_legendary_creature.attack_speed * 0.07
+        return self.winner
 
 
 class CreatureBattle(Battle):
@@ -451,12 +1313,14 @@ class CreatureBattle(Battle):
         self.player2: Player = player2
         self.whose_turn: LegendaryCreature or None = None
         self.winner: BattleTeam or None = None
-        self.reward = Reward(mpf("10") ** sum(5 * legendary_creature.level for legendary_creature in
-                                              self.player2.battle_team.get_legendary_creatures()),
-                             mpf("10") ** sum(5 * legendary_creature.level - 2 for legendary_creature in
-                                              self.player2.battle_team.get_legendary_creatures()),
-                             mpf("10") ** sum(5 * legendary_creature.level for legendary_creature in
-                                              self.player2.battle_team.get_legendary_creatures()))
+        self.reward = Reward(Magnitude.power_of_ten(sum(5 * legendary_creature.level for legendary_creature in
+                                                        self.player2.battle_team.get_legendary_creatures())),
+                             Magnitude.power_of_ten(sum(5 * legendary_creature.level - 2 for legendary_creature in
+                                                        self.player2.battle_team.get_legendary_creatures())),
+                             Magnitude.power_of_ten(sum(5 * legendary_creature.level for legendary_creature in
+                                                        self.player2.battle_team.get_legendary_creatures())))
+        self.turn_scheduler = TurnScheduler(self.player1.battle_team.get_legendary_creatures() +
+                                            self.player2.battle_team.get_legendary_creatures(), "attack_speed")
 
     def get_someone_to_move(self):
         # type: () -> None
@@ -465,38 +1329,214 @@ class CreatureBattle(Battle):
         :return: None
         """
 
-        # Finding out which legendary creature moves
-        full_attack_gauge_list: list = []  # initial value
-        while len(full_attack_gauge_list) == 0:
-            for legendary_creature in self.player1.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
+        self.whose_turn = self.turn_scheduler.next_turn()
+
+    def simulate(self, max_turns=BATTLE_SIMULATION_MAX_TURNS):
+        # type: (int) -> BattleTeam or None
+        """
+        Carrying out the battle with both players making random choices like AI players do.
+        :return: the winning battle team, or None if there is no winner after the maximum number of turns
+        """
+
+        while self.winner is None and self.num_turns < max_turns:
+            self.get_someone_to_move()
+            side: int = 0 if self.whose_turn in self.player1.battle_team.get_legendary_creatures() else 1
+            damage: mpf or None = self.take_ai_turn(self.whose_turn, [self.player2, self.player1][side].battle_team.
+                                                    get_legendary_creatures())
+            if damage is not None:
+                self.damage_dealt[side].append(damage)
+
+            self.num_turns += 1
+            if self.player2.battle_team.all_died():
+                self.winner = self.player1.battle_team
+            elif self.player1.battle_team.all_died():
+                self.winner = self.player2.battle_team
+
+        return self.winner
+
+
+class BatchBattleEngine:
+    """
+    This class contains attributes of a headless engine carrying out many battles between teams of legendary
+    creatures at once.
+
+    The legendary creatures are packed into arrays with a row for each battle and a column for each place in the
+    battle (the first team followed by the second team). Every turn is then carried out for all the battles which
+    are not over in one go, with the same rules and the same kind of random choices as CreatureBattle.simulate(),
+    but without printing anything. Rows of battles which are over are dropped from time to time, so that the arrays
+    only hold battles which are still going on. Stats are native floats, so the battles should be at levels where
+    they fit.
+    """
+
+    FIRST_TEAM_WON: int = 0
+    SECOND_TEAM_WON: int = 1
+    NO_WINNER: int = -1
+    BATTLE_ARRAYS: list = ["battle_indices", "team_sizes", "num_alive", "present", "max_hp", "hp", "magic_points",
+                           "attack_power", "defense", "crit_rate", "crit_damage", "gauge", "gauge_rate",
+                           "element_codes", "num_skills", "skill_is_heal", "skill_damage_multiplier",
+                           "skill_heal_amount", "skill_magic_points_cost"]
+
+    def __init__(self, battles, seed=None):
+        # type: (list, int or None) -> None
+        """
+        :param battles: a list of (BattleTeam, BattleTeam) pairs, one for each battle
+        :param seed: seed of the random choices
+        """
+
+        self.num_battles: int = len(battles)
+        self.team_size: int = max([len(team.get_legendary_creatures()) for battle in battles for team in battle] +
+                                  [1])
+        max_num_skills: int = max([len(legendary_creature.get_skills()) for battle in battles for team in battle
+                                   for legendary_creature in team.get_legendary_creatures()] + [1])
+        shape: tuple = (self.num_battles, 2 * self.team_size)
+        self.battle_indices: np.ndarray = np.arange(self.num_battles)  # battles which the rows below belong to
+        self.team_sizes: np.ndarray = np.zeros((self.num_battles, 2), dtype=np.int64)
+        self.num_alive: np.ndarray = np.zeros((self.num_battles, 2), dtype=np.int64)
+        self.present: np.ndarray = np.zeros(shape, dtype=bool)
+        self.max_hp: np.ndarray = np.zeros(shape)
+        self.hp: np.ndarray = np.zeros(shape)
+        self.magic_points: np.ndarray = np.zeros(shape)
+        self.attack_power: np.ndarray = np.zeros(shape)
+        self.defense: np.ndarray = np.zeros(shape)
+        self.crit_rate: np.ndarray = np.zeros(shape)
+        self.crit_damage: np.ndarray = np.zeros(shape)
+        self.gauge: np.ndarray = np.zeros(shape)
+        self.gauge_rate: np.ndarray = np.zeros(shape)
+        self.element_codes: np.ndarray = np.zeros(shape, dtype=np.int64)
+        self.num_skills: np.ndarray = np.zeros(shape, dtype=np.int64)
+        self.skill_is_heal: np.ndarray = np.zeros(shape + (max_num_skills,), dtype=bool)
+        self.skill_damage_multiplier: np.ndarray = np.zeros(shape + (max_num_skills,))
+        self.skill_heal_amount: np.ndarray = np.zeros(shape + (max_num_skills,))
+        self.skill_magic_points_cost: np.ndarray = np.zeros(shape + (max_num_skills,))
+        for battle_index, battle in enumerate(battles):
+            for team_index, team in enumerate(battle):
+                self.team_sizes[battle_index, team_index] = len(team.get_legendary_creatures())
+                for creature_index, legendary_creature in enumerate(team.get_legendary_creatures()):
+                    place: tuple = (battle_index, team_index * self.team_size + creature_index)
+                    self.present[place] = True
+                    self.max_hp[place] = float(legendary_creature.max_hp)
+                    self.hp[place] = float(legendary_creature.curr_hp)
+                    self.magic_points[place] = float(legendary_creature.curr_magic_points)
+                    self.attack_power[place] = float(legendary_creature.attack_power)
+                    self.defense[place] = float(legendary_creature.defense)
+                    self.crit_rate[place] = float(legendary_creature.crit_rate)
+                    self.crit_damage[place] = float(legendary_creature.crit_damage)
+                    self.gauge[place] = float(legendary_creature.attack_gauge)
+                    self.gauge_rate[place] = float(legendary_creature.attack_speed *
+                                                   TurnScheduler.ATTACK_GAUGE_INCREASE_PER_SPEED)
+                    self.element_codes[place] = legendary_creature.get_element_code()
+                    self.num_skills[place] = len(legendary_creature.get_skills())
+                    for skill_index, skill in enumerate(legendary_creature.get_skills()):
+                        self.skill_is_heal[place + (skill_index,)] = skill.skill_type == "HEAL"
+                        self.skill_damage_multiplier[place + (skill_index,)] = float(skill.damage_multiplier)
+                        self.skill_heal_amount[place + (skill_index,)] = float(skill.heal_amount)
+                        self.skill_magic_points_cost[place + (skill_index,)] = float(skill.magic_points_cost)
+                    if legendary_creature.get_is_alive():
+                        self.num_alive[battle_index, team_index] += 1
+
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.winners: np.ndarray = np.full(self.num_battles, self.NO_WINNER, dtype=np.int64)
+        self.num_turns: np.ndarray = np.zeros(self.num_battles, dtype=np.int64)
+        self.over: np.ndarray = np.zeros(self.num_battles, dtype=bool)
+
+    def run(self, max_turns=BATTLE_SIMULATION_MAX_TURNS):
+        # type: (int) -> np.ndarray
+        """
+        Carrying out all the battles until they are over.
+        :return: the winner of each battle (FIRST_TEAM_WON, SECOND_TEAM_WON, or NO_WINNER)
+        """
 
-            for legendary_creature in self.player2.battle_team.get_legendary_creatures():
-                if legendary_creature.attack_gauge >= legendary_creature.FULL_ATTACK_GAUGE and legendary_creature not \
-                        in full_attack_gauge_list:
-                    full_attack_gauge_list.append(legendary_creature)
+        for turn in range(max_turns):
+            # Dropping the rows of battles which are over once they make up half of the arrays
+            num_rows_over: int = int(np.count_nonzero(self.over[self.battle_indices]))
+            if num_rows_over == len(self.battle_indices):
+                break
+            elif num_rows_over >= len(self.battle_indices) // 2:
+                rows_kept: np.ndarray = ~self.over[self.battle_indices]
+                for name in self.BATTLE_ARRAYS:
+                    setattr(self, name, getattr(self, name)[rows_kept])
 
-            self.tick()
+            self.take_turns()
 
-        max_attack_gauge: mpf = max(legendary_creature.attack_gauge for legendary_creature in full_attack_gauge_list)
-        for legendary_creature in full_attack_gauge_list:
-            if legendary_creature.attack_gauge == max_attack_gauge:
-                self.whose_turn = legendary_creature
+        return self.winners
 
-    def tick(self):
+    def take_turns(self):
         # type: () -> None
         """
-        The clock ticks when battles are carried out.
+        Carrying out one turn in each of the battles in the arrays.
         :return: None
         """
 
-        for legendary_creature in self.player1.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
-
-        for legendary_creature in self.player2.battle_team.get_legendary_creatures():
-            legendary_creature.attack_gauge += legendary_creature.attack_speed * 0.07
+        rows: np.ndarray = np.arange(len(self.battle_indices))
+
+        # Finding out which legendary creature moves, like TurnScheduler does
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ticks: np.ndarray = np.where(self.gauge >= 1, 0, np.ceil((1 - self.gauge) / self.gauge_rate))
+        ticks[~self.present | ((self.gauge < 1) & (self.gauge_rate <= 0))] = np.inf
+        num_ticks: np.ndarray = ticks.min(axis=1)
+        stalled: np.ndarray = np.isinf(num_ticks)  # battles in which nobody can ever move
+        num_ticks[stalled] = 0
+        self.gauge += (num_ticks[:, None] + 1) * self.gauge_rate
+        movers: np.ndarray = self.gauge.shape[1] - 1 - np.argmax(
+            np.where(ticks <= num_ticks[:, None], self.gauge, -np.inf)[:, ::-1], axis=1)
+        self.gauge[rows, movers] = 0
+
+        # Making random choices like AI players do
+        actions: np.ndarray = self.rng.integers(0, len(Action.POSSIBLE_NAMES), len(rows))
+        mover_teams: np.ndarray = movers // self.team_size
+        targets: np.ndarray = (1 - mover_teams) * self.team_size + (
+                self.rng.random(len(rows)) * self.team_sizes[rows, 1 - mover_teams]).astype(np.int64)
+        num_skills: np.ndarray = self.num_skills[rows, movers]
+        skills: np.ndarray = np.minimum((self.rng.random(len(rows)) * num_skills).astype(np.int64),
+                                        np.maximum(num_skills - 1, 0))
+        is_crit: np.ndarray = self.rng.random(len(rows)) < self.crit_rate[rows, movers]
+
+        # Carrying out the actions
+        is_heal_skill: np.ndarray = self.skill_is_heal[rows, movers, skills]
+        magic_points_cost: np.ndarray = self.skill_magic_points_cost[rows, movers, skills]
+        uses_skill: np.ndarray = (actions == Action.POSSIBLE_NAMES.index("USE SKILL")) & (num_skills > 0) & \
+            (self.magic_points[rows, movers] >= magic_points_cost)
+        attacks: np.ndarray = (actions == Action.POSSIBLE_NAMES.index("NORMAL ATTACK")) | (uses_skill &
+                                                                                          ~is_heal_skill)
+        heals: np.ndarray = (actions == Action.POSSIBLE_NAMES.index("NORMAL HEAL")) | (uses_skill & is_heal_skill)
+        self.magic_points[rows, movers] -= np.where(uses_skill, magic_points_cost, 0)
+
+        target_hp: np.ndarray = self.hp[rows, targets]
+        raw_damage: np.ndarray = (self.attack_power[rows, movers] *
+                                  np.where(uses_skill, self.skill_damage_multiplier[rows, movers, skills], 1) *
+                                  np.where(is_crit, self.crit_damage[rows, movers], 1) -
+                                  self.defense[rows, targets]) * get_elemental_damage_multipliers(
+            self.element_codes[rows, movers], self.element_codes[rows, targets])
+        new_target_hp: np.ndarray = np.where(attacks, target_hp - np.maximum(raw_damage, 0), target_hp)
+        self.hp[rows, targets] = new_target_hp
+
+        mover_hp: np.ndarray = self.hp[rows, movers]
+        new_mover_hp: np.ndarray = np.where(heals, np.minimum(mover_hp + np.where(
+            uses_skill, self.skill_heal_amount[rows, movers, skills], 0.05 * self.max_hp[rows, movers]),
+            self.max_hp[rows, movers]), mover_hp)
+        self.hp[rows, movers] = new_mover_hp
+
+        # Keeping count of the legendary creatures alive in each team
+        self.num_alive[rows, 1 - mover_teams] -= (target_hp > 0) & (new_target_hp <= 0)
+        self.num_alive[rows, mover_teams] += (mover_hp <= 0) & (new_mover_hp > 0)
+
+        # Checking whether a team won
+        battles: np.ndarray = self.battle_indices
+        running: np.ndarray = ~self.over[battles]
+        self.num_turns[battles[running]] += 1
+        first_team_won: np.ndarray = running & (self.num_alive[:, 1] == 0)
+        second_team_won: np.ndarray = running & ~first_team_won & (self.num_alive[:, 0] == 0)
+        self.winners[battles[first_team_won]] = self.FIRST_TEAM_WON
+        self.winners[battles[second_team_won]] = self.SECOND_TEAM_WON
+        self.over[battles[first_team_won | second_team_won | stalled]] = True
+
+    def get_winner_distribution(self):
+        # type: () -> dict
+        return {
+            "first team": float(np.mean(self.winners == self.FIRST_TEAM_WON)),
+            "second team": float(np.mean(self.winners == self.SECOND_TEAM_WON)),
+            "no winner": float(np.mean(self.winners == self.NO_WINNER))
+        }
 
 
 class City:
@@ -623,6 +1663,100 @@ class BeachTile(CityTile):
         CityTile.__init__(self)
 
 
+class CityPrefetcher:
+    """
+    This class contains attributes of a prefetcher which builds the next city (with its name, AI players, and
+    their battle teams) on a worker thread once the player is within 'prefetch_distance' tiles of a portal.
+    """
+
+    def __init__(self, json_model, prefetch_distance=CITY_PREFETCH_DISTANCE):
+        # type: (TelemetryGenerativeModel, int) -> None
+        self.json_model: TelemetryGenerativeModel = json_model
+        self.prefetch_distance: int = prefetch_distance
+        self.__next_city: Future or None = None  # initial value
+        self.__average_player_battle_creature_level: int = 0  # initial value
+
+    @staticmethod
+    def get_distance_to_nearest_portal(player):
+        # type: (Player) -> int or None
+        if not isinstance(player.city, City):
+            return None
+
+        distances: list = [abs(x - player.location.tile_x) + abs(y - player.location.tile_y)
+                           for y, row in enumerate(player.city.get_tiles())
+                           for x, tile in enumerate(row) if isinstance(tile, PortalTile)]
+        return min(distances) if len(distances) > 0 else None
+
+    def update(self, player):
+        # type: (Player) -> bool
+        """
+        Starting to build the next city in the background if the player is close enough to a portal
+        and no city is being prefetched yet.
+        :return: a boolean value indicating whether prefetching started
+        """
+
+        if self.__next_city is not None:
+            return False
+
+        distance: int or None = self.get_distance_to_nearest_portal(player)
+        if distance is None or distance > self.prefetch_distance:
+            return False
+
+        self.__average_player_battle_creature_level = get_average_battle_creature_level(player)
+        self.__next_city = Future()
+
+        # The worker thread gets its own random stream, so it does not race the game for the "city" random stream.
+        threading.Thread(target=self.__build_city, args=(self.__next_city,
+                                                         self.__average_player_battle_creature_level,
+                                                         random.Random(get_random_stream("city").getrandbits(64))),
+                         name="city-prefetcher", daemon=True).start()
+        return True
+
+    def __build_city(self, next_city, average_player_battle_creature_level, rng):
+        # type: (Future, int, random.Random) -> None
+        if not next_city.set_running_or_notify_cancel():
+            return
+
+        try:
+            next_city.set_result(generate_city(self.json_model, average_player_battle_creature_level, rng))
+        except Exception as e:
+            next_city.set_exception(e)
+
+    def take(self, player):
+        # type: (Player) -> City
+        """
+        Taking the prefetched city, waiting for it if it is still being built. A new city is generated
+        right away if none was prefetched, if prefetching failed, or if the average level of the player's
+        battle team has changed since prefetching started.
+        :return: the next city
+        """
+
+        next_city: Future or None = self.__next_city
+        self.__next_city = None
+        average_player_battle_creature_level: int = get_average_battle_creature_level(player)
+        if next_city is not None and \
+                self.__average_player_battle_creature_level == average_player_battle_creature_level:
+            try:
+                return next_city.result()
+            except Exception:
+                pass  # generate the city again below
+
+        return generate_city(self.json_model, average_player_battle_creature_level,
+                             random.Random(get_random_stream("city").getrandbits(64)))
+
+    def discard(self):
+        # type: () -> None
+        """
+        Dropping the prefetched city (if any). A city which is still being built is left to the daemon
+        worker thread and thrown away once it finishes.
+        :return: None
+        """
+
+        if self.__next_city is not None:
+            self.__next_city.cancel()
+            self.__next_city = None
+
+
 ###########################################
 # ADVENTURE MODE
 ###########################################
@@ -797,14 +1931,13 @@ class LegendaryCreature:
     This class contains attributes of a legendary creature in this game.
     """
 
-    MIN_CRIT_RATE: mpf = mpf("0.15")
-    MAX_CRIT_RATE: mpf = mpf("1")
-    MIN_CRIT_DAMAGE: mpf = mpf("1.5")
-    MIN_ATTACK_GAUGE: mpf = mpf("0")
-    FULL_ATTACK_GAUGE: mpf = mpf("1")
-    POTENTIAL_ELEMENTS: list = ["TERRA", "FLAME", "SEA", "NATURE", "ELECTRIC", "ICE", "METAL", "DARK", "LIGHT", "WAR",
-                                "PURE", "LEGEND", "PRIMAL", "WIND", "BEAUTY", "MAGIC", "CHAOS", "HAPPY", "DREAM",
-                                "SOUL"]
+    MIN_CRIT_RATE: mpf = number("0.15")
+    MAX_CRIT_RATE: mpf = number("1")
+    MIN_CRIT_DAMAGE: mpf = number("1.5")
+    MIN_ATTACK_GAUGE: mpf = number("0")
+    FULL_ATTACK_GAUGE: mpf = number("1")
+    POTENTIAL_ELEMENTS: list = ELEMENTS
+    PERCENTAGE_STATS: list = ["max_hp", "max_magic_points", "attack_power", "defense"]  # raised by percentages
 
     def __init__(self, name, element, max_hp, max_magic_points, attack_power, defense, attack_speed, skills,
                  awaken_bonus):
@@ -812,48 +1945,138 @@ class LegendaryCreature:
         self.name: str = name
         self.element: str = element if element in self.POTENTIAL_ELEMENTS else self.POTENTIAL_ELEMENTS[0]
         self.level: int = 1
-        self.exp: mpf = mpf("0")
-        self.required_exp: mpf = mpf("1e6")
+        self.exp: Magnitude = Magnitude(0)
+        self.required_exp: Magnitude = Magnitude(1, 6)
         self.curr_hp: mpf = max_hp
-        self.max_hp: mpf = max_hp
         self.curr_magic_points: mpf = max_magic_points
-        self.max_magic_points: mpf = max_magic_points
-        self.attack_power: mpf = attack_power
-        self.defense: mpf = defense
-        self.attack_speed: mpf = attack_speed
+        self.base_stats: dict = {
+            "max_hp": max_hp,
+            "max_magic_points": max_magic_points,
+            "attack_power": attack_power,
+            "defense": defense,
+            "attack_speed": attack_speed,
+            "crit_rate": self.MIN_CRIT_RATE,
+            "crit_damage": self.MIN_CRIT_DAMAGE
+        }  # stats at level 1 without awakening and runes
+        self.__stats: dict or None = None  # stats with level, awakening and runes, worked out when needed
         self.__skills: list = skills
         self.awaken_bonus: AwakenBonus = awaken_bonus
-        self.crit_rate: mpf = self.MIN_CRIT_RATE
-        self.crit_damage: mpf = self.MIN_CRIT_DAMAGE
         self.__runes: dict = {}  # initial value
         self.attack_gauge: mpf = self.MIN_ATTACK_GAUGE
         self.has_awakened: bool = False
         self.corresponding_team: BattleTeam or None = None  # initial value
 
+    def __getstate__(self):
+        # type: () -> dict
+        state: dict = self.__dict__.copy()
+        state["_LegendaryCreature__stats"] = None
+        return state
+
+    def __setstate__(self, state):
+        # type: (dict) -> None
+        self.__dict__.update(state)
+        self.__stats = None
+        if "base_stats" in state:
+            return
+
+        # Saved game data written before stats were derived holds the stats with level, awakening and runes.
+        stats: dict = {name: self.__dict__.pop(name) for name in ["max_hp", "max_magic_points", "attack_power",
+                                                                   "defense", "attack_speed", "crit_rate",
+                                                                   "crit_damage"]}
+        self.base_stats = {name: number("1") for name in self.PERCENTAGE_STATS}
+        self.base_stats.update(attack_speed=number("0"), crit_rate=self.MIN_CRIT_RATE,
+                               crit_damage=self.MIN_CRIT_DAMAGE)
+        factors: dict = self.get_stats()
+        for name in self.PERCENTAGE_STATS:
+            self.base_stats[name] = convert_number(stats[name] / factors[name])
+        self.base_stats["attack_speed"] = stats["attack_speed"] - factors["attack_speed"]
+        self.__stats = None
+
     def awaken(self):
         # type: () -> bool
         if not self.has_awakened:
             self.name = "AWAKENED " + str(self.name)
-            self.max_hp *= 1 + self.awaken_bonus.max_hp_percentage_up / 100
-            self.max_magic_points *= 1 + self.awaken_bonus.max_magic_points_percentage_up / 100
-            self.attack_power *= 1 + self.awaken_bonus.attack_power_percentage_up / 100
-            self.defense *= 1 + self.awaken_bonus.defense_percentage_up / 100
-            self.attack_speed += self.awaken_bonus.attack_speed_up
-            self.crit_rate += self.awaken_bonus.crit_rate_up
-            if self.crit_rate > self.MAX_CRIT_RATE:
-                self.crit_rate = self.MAX_CRIT_RATE
-
-            self.crit_damage += self.awaken_bonus.crit_damage_up
-            self.restore()
             self.has_awakened = True
+            self.invalidate_stats()
+            self.restore()
             return True
         return False
 
+    def get_stats(self):
+        # type: () -> dict
+        """
+        Getting the stats of the legendary creature, which are worked out again from the stats at level 1, the level,
+        the awakening and the runes only after one of them changed.
+        :return: a dictionary of the stats
+        """
+
+        if self.__stats is None:
+            # Every level n from level 2 multiplies the stats raised by percentages by triangular(n).
+            bonuses: list = ([self.awaken_bonus] if self.has_awakened else []) + list(self.__runes.values())
+            level_factor: int = triangular_product(1, self.level)
+            stats: dict = {}  # initial value
+            for name in self.PERCENTAGE_STATS:
+                stats[name] = multiply(self.base_stats[name], level_factor)
+                for bonus in bonuses:
+                    stats[name] *= 1 + getattr(bonus, name + "_percentage_up") / 100
+
+            stats["attack_speed"] = self.base_stats["attack_speed"] + 2 * (self.level - 1) + \
+                mpf_sum_of_list(bonus.attack_speed_up for bonus in bonuses)
+            stats["crit_rate"] = min(self.MAX_CRIT_RATE, max(self.MIN_CRIT_RATE, self.base_stats["crit_rate"] +
+                                                             mpf_sum_of_list(bonus.crit_rate_up for bonus in bonuses)))
+            stats["crit_damage"] = max(self.MIN_CRIT_DAMAGE, self.base_stats["crit_damage"] + mpf_sum_of_list(
+                bonus.crit_damage_up for bonus in bonuses))
+            self.__stats = stats
+        return self.__stats
+
+    def invalidate_stats(self):
+        # type: () -> None
+        self.__stats = None
+
+    @property
+    def max_hp(self):
+        # type: () -> mpf
+        return self.get_stats()["max_hp"]
+
+    @property
+    def max_magic_points(self):
+        # type: () -> mpf
+        return self.get_stats()["max_magic_points"]
+
+    @property
+    def attack_power(self):
+        # type: () -> mpf
+        return self.get_stats()["attack_power"]
+
+    @property
+    def defense(self):
+        # type: () -> mpf
+        return self.get_stats()["defense"]
+
+    @property
+    def attack_speed(self):
+        # type: () -> mpf
+        return self.get_stats()["attack_speed"]
+
+    @property
+    def crit_rate(self):
+        # type: () -> mpf
+        return self.get_stats()["crit_rate"]
+
+    @property
+    def crit_damage(self):
+        # type: () -> mpf
+        return self.get_stats()["crit_damage"]
+
     def restore(self):
         # type: () -> None
         self.curr_magic_points = self.max_magic_points
         self.curr_hp = self.max_hp
 
+    def get_element_code(self):
+        # type: () -> int
+        return ELEMENT_CODES[self.element]
+
     def get_skills(self):
         # type: () -> list
         return self.__skills
@@ -881,71 +2104,57 @@ class LegendaryCreature:
             self.remove_rune(rune.slot_number)
 
         self.__runes[rune.slot_number] = rune
-        self.max_hp *= 1 + (rune.max_hp_percentage_up / 100)
-        self.max_magic_points *= 1 + (rune.max_magic_points_percentage_up / 100)
-        self.attack_power *= 1 + (rune.attack_power_percentage_up / 100)
-        self.defense *= 1 + (rune.stat_increase.defense_percentage_up / 100)
-        self.attack_speed += rune.attack_speed_up
-        self.crit_rate += rune.crit_rate_up
-        if self.crit_rate > self.MAX_CRIT_RATE:
-            self.crit_rate = self.MAX_CRIT_RATE
-
-        self.crit_damage += rune.crit_damage_up
+        self.invalidate_stats()
         self.restore()
         rune.already_placed = True
         return True
 
     def level_up(self):
         # type: () -> None
-        while self.exp >= self.required_exp:
-            self.level += 1
-            self.required_exp *= mpf("10") ** self.level
-            temp_runes: dict = self.__runes
-            for slot_number in self.__runes.keys():
-                self.remove_rune(slot_number)
-
-            self.attack_power *= triangular(self.level)
-            self.max_hp *= triangular(self.level)
-            self.max_magic_points *= triangular(self.level)
-            self.defense *= triangular(self.level)
-            self.attack_speed += 2
-            for rune in temp_runes.values():
-                self.place_rune(rune)
+        self.level_to(get_level_reached(self.level, self.exp, self.required_exp))
 
-            self.restore()
+    def grant_exp(self, exp):
+        # type: (mpf) -> None
+        self.exp += exp
+        self.level_up()
+
+    def level_to(self, level):
+        # type: (int) -> bool
+        """
+        Levelling up the legendary creature to 'level' in one step, giving it the EXP needed to reach that level.
+        :return: a boolean value indicating whether the level of the legendary creature went up
+        """
+
+        if level <= self.level:
+            return False
+
+        # Reaching level n multiplies the EXP required to level up by 10 ** n.
+        previous_required_exp: Magnitude = get_required_exp(self.level, self.required_exp, level - 1)
+        self.exp = max(self.exp, previous_required_exp)
+        self.required_exp = previous_required_exp * Magnitude.power_of_ten(level)
+        self.level = level
+        self.invalidate_stats()
+        self.restore()
+        return True
 
     def level_up_rune(self, slot_number):
         # type: (int) -> bool
         if slot_number not in self.__runes.keys():
             return False
 
-        current_rune: Rune = self.__runes[slot_number]
-        self.remove_rune(slot_number)
-        success: bool = current_rune.level_up()
-        self.place_rune(current_rune)
+        success: bool = self.__runes[slot_number].level_up()
+        self.invalidate_stats()
+        self.restore()
         return success
 
     def remove_rune(self, slot_number):
         # type: (int) -> bool
         if slot_number in self.__runes.keys():
             # Remove the rune at slot number 'slot_number'
-            current_rune: Rune = self.__runes[slot_number]
-            self.max_hp /= 1 + (current_rune.max_hp_percentage_up / 100)
-            self.max_magic_points /= 1 + (current_rune.max_magic_points_percentage_up / 100)
-            self.attack_power /= 1 + (current_rune.attack_power_percentage_up / 100)
-            self.defense /= 1 + (current_rune.defense_percentage_up / 100)
-            self.attack_speed -= current_rune.attack_speed_up
-            self.crit_rate -= current_rune.crit_rate_up
-            if self.crit_rate <= self.MIN_CRIT_RATE:
-                self.crit_rate = self.MIN_CRIT_RATE
-
-            self.crit_damage -= current_rune.crit_damage_up
-            if self.crit_damage <= self.MIN_CRIT_DAMAGE:
-                self.crit_damage = self.MIN_CRIT_DAMAGE
-
-            self.restore()
-            self.__runes.pop(current_rune.slot_number)
+            current_rune: Rune = self.__runes.pop(slot_number)
             current_rune.already_placed = False
+            self.invalidate_stats()
+            self.restore()
             return True
         return False
 
@@ -991,10 +2200,19 @@ class LegendaryCreature:
         # type: () -> str
         res: str = str(type(self).__name__) + "("  # initial value
         index: int = 0  # initial value
-        for item in vars(self).items():
+
+        # The stats are shown with level, awakening and runes in place of the stats at level 1.
+        items: list = []  # initial value
+        for key, value in vars(self).items():
+            if key == "base_stats":
+                items += list(self.get_stats().items())
+            elif key != "_LegendaryCreature__stats":
+                items.append((key, value))
+
+        for item in items:
             res += str(item[0]) + "=" + str(item[1])
 
-            if index < len(vars(self).items()) - 1:
+            if index < len(items) - 1:
                 res += ", "
 
             index += 1
@@ -1019,14 +2237,14 @@ class Skill:
         self.level: int = 1
         self.description: str = description
         self.skill_type: str = skill_type if skill_type in self.POSSIBLE_SKILL_TYPES else self.POSSIBLE_SKILL_TYPES[0]
-        self.damage_multiplier: mpf = damage_multiplier if self.skill_type == "ATTACK" else mpf("0")
-        self.heal_amount: mpf = heal_amount if self.skill_type == "HEAL" else mpf("0")
+        self.damage_multiplier: mpf = damage_multiplier if self.skill_type == "ATTACK" else number("0")
+        self.heal_amount: mpf = heal_amount if self.skill_type == "HEAL" else number("0")
         self.magic_points_cost: mpf = magic_points_cost
 
     def level_up(self):
         # type: () -> None
-        self.damage_multiplier *= mpf("1.25") * self.level
-        self.heal_amount *= mpf("1.25") * self.level
+        self.damage_multiplier *= number("1.25") * self.level
+        self.heal_amount *= number("1.25") * self.level
         self.level += 1
 
     def __str__(self):
@@ -1067,8 +2285,8 @@ class Item:
         # type: (str, str, mpf) -> None
         self.name: str = name
         self.description: str = description
-        self.dollars_cost: mpf = dollars_cost
-        self.sell_dollars_gain: mpf = dollars_cost / 5
+        self.dollars_cost: Magnitude = Magnitude(dollars_cost)
+        self.sell_dollars_gain: Magnitude = self.dollars_cost / 5
 
     def __str__(self):
         # type: () -> str
@@ -1094,8 +2312,8 @@ class Ball(Item):
     This class contains attributes of a ball used to catch a legendary creature.
     """
 
-    MIN_CATCH_SUCCESS_RATE: mpf = mpf("0.15")
-    MAX_CATCH_SUCCESS_RATE: mpf = mpf("1")
+    MIN_CATCH_SUCCESS_RATE: mpf = number("0.15")
+    MAX_CATCH_SUCCESS_RATE: mpf = number("1")
 
     def __init__(self, name, description, dollars_cost, catch_success_rate):
         # type: (str, str, mpf, mpf) -> None
@@ -1113,7 +2331,7 @@ class Rune(Item):
     MAX_SLOT_NUMBER: int = 6
     MIN_RATING: int = 1
     MAX_RATING: int = 6
-    MAX_CRIT_RATE_UP: mpf = mpf("0.85")
+    MAX_CRIT_RATE_UP: mpf = number("0.85")
 
     def __init__(self, name, description, dollars_cost, rating, slot_number, max_magic_points_percentage_up,
                  max_hp_percentage_up, attack_power_percentage_up, defense_percentage_up, attack_speed_up,
@@ -1128,36 +2346,34 @@ class Rune(Item):
         self.attack_power_percentage_up: mpf = attack_power_percentage_up
         self.defense_percentage_up: mpf = defense_percentage_up
         self.attack_speed_up: mpf = attack_speed_up
-        self.crit_rate_up: mpf = crit_rate_up if mpf("0") <= crit_rate_up <= self.MAX_CRIT_RATE_UP else mpf("0")
+        self.crit_rate_up: mpf = crit_rate_up if number("0") <= crit_rate_up <= self.MAX_CRIT_RATE_UP else number("0")
         self.crit_damage_up: mpf = crit_damage_up
         self.level: int = 1
-        self.level_up_dollars_cost: mpf = dollars_cost
-        self.level_up_success_rate: mpf = mpf("1")
+        self.level_up_dollars_cost: Magnitude = Magnitude(dollars_cost)
+        self.level_up_success_rate: mpf = number("1")
         self.already_placed: bool = False  # initial value
 
     def level_up(self):
         # type: () -> bool
         # Check whether levelling up is successful or not
-        if random.random() > self.level_up_success_rate:
+        if get_random_stream("runes").random() > self.level_up_success_rate:
             return False
 
         # Increase the level of the rune
         self.level += 1
 
         # Update the cost and success rate of levelling up the rune
-        self.level_up_dollars_cost *= mpf("10") ** (self.level + self.rating)
-        self.level_up_success_rate *= mpf("0.95")
+        self.level_up_dollars_cost *= Magnitude.power_of_ten(self.level + self.rating)
+        self.level_up_success_rate *= number("0.95")
 
         # Increase stats
-        self.stat_increase.max_hp_percentage_up += self.rating
-        self.stat_increase.max_magic_points_percentage_up += self.rating
-        self.stat_increase.attack_percentage_up += self.rating
-        self.stat_increase.defense_percentage_up += self.rating
-        self.stat_increase.attack_speed_up += 2 * self.rating
-        self.stat_increase.crit_rate_up += 0.01 * self.rating
-        self.stat_increase.crit_damage_up += 0.05 * self.rating
-        self.stat_increase.resistance_up += 0.01 * self.rating
-        self.stat_increase.accuracy_up += 0.01 * self.rating
+        self.max_hp_percentage_up += self.rating
+        self.max_magic_points_percentage_up += self.rating
+        self.attack_power_percentage_up += self.rating
+        self.defense_percentage_up += self.rating
+        self.attack_speed_up += 2 * self.rating
+        self.crit_rate_up = min(self.MAX_CRIT_RATE_UP, self.crit_rate_up + number("0.01") * self.rating)
+        self.crit_damage_up += number("0.05") * self.rating
         return True
 
 
@@ -1180,7 +2396,7 @@ class EXPShard(Item):
     def __init__(self, name, description, dollars_cost, exp_granted):
         # type: (str, str, mpf, mpf) -> None
         Item.__init__(self, name, description, dollars_cost)
-        self.exp_granted: mpf = exp_granted
+        self.exp_granted: Magnitude = Magnitude(exp_granted)
 
 
 class LevelUpShard(Item):
@@ -1224,18 +2440,18 @@ class ExerciseGym:
         # type: (str, list) -> None
         self.name: str = name
         self.level: int = 1
-        self.level_up_dollars_cost: mpf = mpf("1e6")
+        self.level_up_dollars_cost: Magnitude = Magnitude(1, 6)
         self.__training_options = training_options
 
     def level_up(self):
         # type: () -> None
         self.level += 1
-        self.level_up_dollars_cost *= mpf("10") ** self.level
+        self.level_up_dollars_cost *= Magnitude.power_of_ten(self.level)
         for training_option in self.__training_options:
-            training_option.player_attack_power_gain *= mpf("1.15") * self.level
-            training_option.player_defense_gain *= mpf("1.15") * self.level
-            training_option.player_speed_gain *= mpf("1.15") * self.level
-            training_option.player_dexterity_gain *= mpf("1.15") * self.level
+            training_option.player_attack_power_gain *= number("1.15") * self.level
+            training_option.player_defense_gain *= number("1.15") * self.level
+            training_option.player_speed_gain *= number("1.15") * self.level
+            training_option.player_dexterity_gain *= number("1.15") * self.level
 
     def get_training_options(self):
         # type: () -> list
@@ -1265,8 +2481,8 @@ class TrainingOption:
     This class contains attributes of a training option for fitness.
     """
 
-    def __init__(self, name, stamina_cost, player_attack_power_gain=mpf("0"), player_defense_gain=mpf("0"),
-                 player_speed_gain=mpf("0"), player_dexterity_gain=mpf("0")):
+    def __init__(self, name, stamina_cost, player_attack_power_gain=number("0"), player_defense_gain=number("0"),
+                 player_speed_gain=number("0"), player_dexterity_gain=number("0")):
         # type: (str, mpf, mpf, mpf, mpf, mpf) -> None
         self.name: str = name
         self.stamina_cost: mpf = stamina_cost
@@ -1309,9 +2525,10 @@ class GameCharacter:
     This class contains attributes of a game character.
     """
 
-    def __init__(self, name):
-        # type: (str) -> None
-        self.character_id: str = str(uuid.uuid1())
+    def __init__(self, name, rng=None):
+        # type: (str, random.Random or None) -> None
+        rng = rng if rng is not None else get_random_stream("players")
+        self.character_id: str = str(uuid.UUID(int=rng.getrandbits(128), version=4))
         self.name: str = name
 
     def __str__(self):
@@ -1343,54 +2560,208 @@ class NPC(GameCharacter):
         GameCharacter.__init__(self, name)
 
 
-class Player(GameCharacter):
+class NPCConversation:
     """
-    This class contains attributes of the player in this game.
+    This class contains attributes of a conversation between the player and an NPC. The replies of the NPC
+    are streamed to the terminal as they are generated. Only the last 'max_turns' turns are sent to Gemini AI
+    verbatim; older turns are folded into a running summary, and more turns are folded whenever the prompt
+    would exceed 'max_tokens' tokens. The prompt size, time to first token, and total time of each turn are
+    recorded.
     """
 
-    MIN_ATTACK_GAUGE: mpf = mpf("0")
-    FULL_ATTACK_GAUGE: mpf = mpf("1")
-    MAX_STAMINA: mpf = mpf("100")
+    def __init__(self, npc, model, max_turns=NPC_CONTEXT_MAX_TURNS, max_tokens=NPC_CONTEXT_MAX_TOKENS):
+        # type: (NPC, TelemetryGenerativeModel, int, int) -> None
+        self.npc: NPC = npc
+        self.__model: TelemetryGenerativeModel = model
+        self.max_turns: int = max_turns
+        self.max_tokens: int = max_tokens
+        self.summary: str = ""  # initial value
+        self.__turns: list = []  # (message, reply) tuples of the turns kept verbatim
+        self.turn_stats: list = []  # initial value
+
+    def get_history(self):
+        # type: () -> list
+        history: list = []  # initial value
+        if self.summary != "":
+            history.append({"role": "user", "parts": ["Here is a summary of our conversation so far: " +
+                                                      str(self.summary)]})
+            history.append({"role": "model", "parts": ["Got it."]})
 
-    def __init__(self, name):
-        # type: (str) -> None
-        GameCharacter.__init__(self, name)
-        self.level: int = 1
-        self.max_hp: mpf = mpf(random.randint(100, 150))
-        self.curr_hp: mpf = self.max_hp
-        self.stamina: mpf = self.MAX_STAMINA
-        self.attack_power: mpf = mpf(random.randint(20, 30))
-        self.defense: mpf = mpf(random.randint(20, 30))
-        self.speed: mpf = mpf(random.randint(20, 30))
-        self.dexterity: mpf = mpf(random.randint(20, 30))
-        self.exp: mpf = mpf("0")
-        self.required_exp: mpf = mpf("1e6")
-        self.dollars: mpf = mpf("5e6")
-        self.attack_gauge: mpf = self.MIN_ATTACK_GAUGE
-        self.battle_team: BattleTeam = BattleTeam()
-        self.item_inventory: ItemInventory = ItemInventory()
-        self.legendary_creature_inventory: LegendaryCreatureInventory = LegendaryCreatureInventory()
-        self.city: City or None = None  # initial value
-        self.location: AdventureModeLocation = AdventureModeLocation(0, 0)
-        self.missions_completed: int = 0  # initial value
+        for message, reply in self.__turns:
+            history.append({"role": "user", "parts": [message]})
+            history.append({"role": "model", "parts": [reply]})
 
-    def is_alive(self):
-        # type: () -> bool
-        return self.curr_hp > 0
+        return history
 
-    def attack(self, player):
-        # type: (Player) -> None
-        self.attack_gauge = self.MIN_ATTACK_GAUGE
-        raw_damage: mpf = self.attack_power - player.defense
-        damage: mpf = raw_damage if raw_damage > mpf("0") else mpf("0")
-        player.curr_hp -= damage
-        print(str(self.name) + " dealt " + str(damage) + " damage on " + str(player.name) + "!")
+    def count_prompt_tokens(self, message):
+        # type: (str) -> int
+        return self.__model.count_tokens(self.get_history() + [{"role": "user", "parts": [message]}],
+                                         call_site="NPC chat")
 
-    def recharge_stamina(self):
-        # type: () -> None
-        self.stamina += mpf("5")
-        if self.stamina >= self.MAX_STAMINA:
-            self.stamina = self.MAX_STAMINA
+    def __summarize(self, turns):
+        # type: (list) -> None
+        """
+        Folding 'turns' into the running summary. If Gemini AI is unavailable, the turns are dropped.
+        :return: None
+        """
+
+        transcript: str = "\n".join("Player: " + str(message) + "\n" + str(self.npc.name) + ": " + str(reply)
+                                    for message, reply in turns)
+        prompt: str = "Please summarize the following conversation between the player and " + \
+                      str(self.npc.name) + " in at most " + str(NPC_SUMMARY_MAX_WORDS) + \
+                      " words, keeping the names, facts, and promises mentioned (safe summary only please).\n"
+        if self.summary != "":
+            prompt += "Summary of the earlier conversation: " + str(self.summary) + "\n"
+
+        try:
+            response: LLMResponse = self.__model.generate_content(prompt + transcript, use_cache=False,
+                                                                  call_site="NPC summary")
+        except (gemini.types.generation_types.BlockedPromptException,
+                gemini.types.generation_types.StopCandidateException):
+            return
+
+        if not response.is_fallback:
+            self.summary = str(response.text).strip()
+
+    def fit_context(self, message):
+        # type: (str) -> tuple
+        """
+        Folding the oldest turns into the summary until at most 'max_turns' turns are left and the prompt
+        for 'message' fits into 'max_tokens' tokens.
+        :return: a tuple of the number of prompt tokens and the number of turns folded into the summary
+        """
+
+        turns_to_fold: list = self.__turns[:max(0, len(self.__turns) - self.max_turns)]
+        self.__turns = self.__turns[len(turns_to_fold):]
+        num_turns_folded: int = 0  # initial value
+        num_prompt_tokens: int = self.count_prompt_tokens(message)
+        while len(turns_to_fold) > 0 or (num_prompt_tokens > self.max_tokens and len(self.__turns) > 0):
+            while num_prompt_tokens > self.max_tokens and len(self.__turns) > 0:
+                turns_to_fold.append(self.__turns.pop(0))
+                num_prompt_tokens = self.count_prompt_tokens(message)
+
+            # The summary grows as well, so the prompt is measured again once the turns have been folded.
+            self.__summarize(turns_to_fold)
+            num_turns_folded += len(turns_to_fold)
+            turns_to_fold = []
+            num_prompt_tokens = self.count_prompt_tokens(message)
+
+        return num_prompt_tokens, num_turns_folded
+
+    def reply(self, message):
+        # type: (str) -> bool
+        """
+        Printing the reply of the NPC to 'message' chunk by chunk.
+        :return: a boolean value indicating whether a reply could be generated
+        """
+
+        start_time: float = time.perf_counter()
+        num_prompt_tokens, num_turns_folded = self.fit_context(message)
+        convo = self.__model.start_chat(history=self.get_history(), call_site="NPC chat")
+        texts: list = []  # initial value
+        time_to_first_token: float or None = None  # initial value
+        success: bool = True  # initial value
+        try:
+            for text in convo.send_message_stream(message):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                    print(str(self.npc.name) + ": ", end="")
+
+                print(text, end="", flush=True)
+                texts.append(text)
+        except (gemini.types.generation_types.BlockedPromptException,
+                gemini.types.generation_types.StopCandidateException, LLMUnavailableError):
+            if time_to_first_token is not None:
+                print("")
+
+            print(str(self.npc.name) + ": Sorry! Cannot generate response.", end="")
+            success = False
+
+        print("")
+        if success:
+            self.__turns.append((message, "".join(texts)))
+
+        self.turn_stats.append({
+            "prompt_token_count": num_prompt_tokens,
+            "turns_summarized": num_turns_folded,
+            "time_to_first_token": time_to_first_token,
+            "total_time": time.perf_counter() - start_time
+        })
+        return success
+
+    def get_turn_report(self):
+        # type: () -> str
+        return str(tabulate([[i + 1, stats["prompt_token_count"], stats["turns_summarized"],
+                              "-" if stats["time_to_first_token"] is None else
+                              round(stats["time_to_first_token"], 2), round(stats["total_time"], 2)]
+                             for i, stats in enumerate(self.turn_stats)],
+                            headers=["Turn", "Prompt Tokens", "Turns Summarized", "Time to First Token (s)",
+                                     "Total Time (s)"], tablefmt='fancy_grid'))
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+
+class Player(GameCharacter):
+    """
+    This class contains attributes of the player in this game.
+    """
+
+    MIN_ATTACK_GAUGE: mpf = number("0")
+    FULL_ATTACK_GAUGE: mpf = number("1")
+    MAX_STAMINA: mpf = number("100")
+
+    def __init__(self, name, rng=None):
+        # type: (str, random.Random or None) -> None
+        rng = rng if rng is not None else get_random_stream("players")
+        GameCharacter.__init__(self, name, rng)
+        self.level: int = 1
+        self.max_hp: mpf = number(rng.randint(100, 150))
+        self.curr_hp: mpf = self.max_hp
+        self.stamina: mpf = self.MAX_STAMINA
+        self.attack_power: mpf = number(rng.randint(20, 30))
+        self.defense: mpf = number(rng.randint(20, 30))
+        self.speed: mpf = number(rng.randint(20, 30))
+        self.dexterity: mpf = number(rng.randint(20, 30))
+        self.exp: Magnitude = Magnitude(0)
+        self.required_exp: Magnitude = Magnitude(1, 6)
+        self.dollars: Magnitude = Magnitude(5, 6)
+        self.attack_gauge: mpf = self.MIN_ATTACK_GAUGE
+        self.battle_team: BattleTeam = BattleTeam()
+        self.item_inventory: ItemInventory = ItemInventory()
+        self.legendary_creature_inventory: LegendaryCreatureInventory = LegendaryCreatureInventory()
+        self.city: City or None = None  # initial value
+        self.location: AdventureModeLocation = AdventureModeLocation(0, 0)
+        self.missions_completed: int = 0  # initial value
+
+    def is_alive(self):
+        # type: () -> bool
+        return self.curr_hp > 0
+
+    def attack(self, player):
+        # type: (Player) -> None
+        self.attack_gauge = self.MIN_ATTACK_GAUGE
+        raw_damage: mpf = self.attack_power - player.defense
+        damage: mpf = raw_damage if raw_damage > number("0") else number("0")
+        player.curr_hp -= damage
+        print(str(self.name) + " dealt " + str(damage) + " damage on " + str(player.name) + "!")
+
+    def recharge_stamina(self):
+        # type: () -> None
+        self.stamina += number("5")
+        if self.stamina >= self.MAX_STAMINA:
+            self.stamina = self.MAX_STAMINA
 
     def recover(self):
         # type: () -> None
@@ -1440,14 +2811,18 @@ class Player(GameCharacter):
             return False
         return False
 
+    def spawn_in_city(self, city):
+        # type: (City) -> None
+        self.city = city
+        self.location = AdventureModeLocation(0, 0)
+        city.get_tile_at(0, 0).add_game_character(self)
+
     def claim_reward(self, reward):
         # type: (Reward) -> None
-        self.exp += reward.player_reward_exp
-        self.level_up()
+        self.grant_exp(reward.player_reward_exp)
         self.dollars += reward.player_reward_dollars
         for legendary_creature in self.battle_team.get_legendary_creatures():
-            legendary_creature.exp += reward.legendary_creature_reward_exp
-            legendary_creature.level_up()
+            legendary_creature.grant_exp(reward.legendary_creature_reward_exp)
 
         self.battle_team.recover_all()
 
@@ -1476,15 +2851,36 @@ class Player(GameCharacter):
 
     def level_up(self):
         # type: () -> None
-        while self.exp >= self.required_exp:
-            self.level += 1
-            self.required_exp *= mpf("10") ** self.level
-            self.max_hp += self.level * 5
-            self.recover()
-            self.attack_power += self.level * 5
-            self.defense += self.level * 5
-            self.speed += self.level * 5
-            self.dexterity += self.level * 5
+        self.level_to(get_level_reached(self.level, self.exp, self.required_exp))
+
+    def grant_exp(self, exp):
+        # type: (mpf) -> None
+        self.exp += exp
+        self.level_up()
+
+    def level_to(self, level):
+        # type: (int) -> bool
+        """
+        Levelling up the player to 'level' in one step, giving the player the EXP needed to reach that level.
+        :return: a boolean value indicating whether the level of the player went up
+        """
+
+        if level <= self.level:
+            return False
+
+        # Every level n adds 5 * n to the stats and multiplies the EXP required to level up by 10 ** n.
+        stat_increase: int = 5 * (triangular(level + 1) - triangular(self.level + 1))
+        self.max_hp += stat_increase
+        self.attack_power += stat_increase
+        self.defense += stat_increase
+        self.speed += stat_increase
+        self.dexterity += stat_increase
+        previous_required_exp: Magnitude = get_required_exp(self.level, self.required_exp, level - 1)
+        self.exp = max(self.exp, previous_required_exp)
+        self.required_exp = previous_required_exp * Magnitude.power_of_ten(level)
+        self.level = level
+        self.recover()
+        return True
 
     def purchase_item(self, item):
         # type: (Item) -> bool
@@ -1528,247 +2924,3517 @@ class Player(GameCharacter):
             return False
         return False
 
-    def add_item_to_inventory(self, item):
-        # type: (Item) -> None
-        self.item_inventory.add_item(item)
+    def add_item_to_inventory(self, item):
+        # type: (Item) -> None
+        self.item_inventory.add_item(item)
+
+    def remove_item_from_inventory(self, item):
+        # type: (Item) -> bool
+        if isinstance(item, Rune):
+            for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+                if item in legendary_creature.get_runes().values():
+                    return False
+
+        return self.item_inventory.remove_item(item)
+
+    def add_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> None
+        self.legendary_creature_inventory.add_legendary_creature(legendary_creature)
+
+    def remove_legendary_creature(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.battle_team.get_legendary_creatures():
+            return False
+        return self.legendary_creature_inventory.remove_legendary_creature(legendary_creature)
+
+    def add_legendary_creature_to_team(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            if self.battle_team.add_legendary_creature(legendary_creature):
+                legendary_creature.corresponding_team = self.battle_team
+                return True
+            return False
+        return False
+
+    def remove_legendary_creature_from_team(self, legendary_creature):
+        # type: (LegendaryCreature) -> bool
+        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
+            legendary_creature.corresponding_team = None
+            return self.battle_team.remove_legendary_creature(legendary_creature)
+        return False
+
+    def level_up_gym(self, gym):
+        # type: (ExerciseGym) -> bool
+        if self.dollars >= gym.level_up_dollars_cost:
+            self.dollars -= gym.level_up_dollars_cost
+            gym.level_up()
+            return True
+        return False
+
+    def train_in_gym(self, gym, option):
+        # type: (ExerciseGym, TrainingOption) -> bool
+        if option not in gym.get_training_options():
+            return False
+
+        if self.stamina < option.stamina_cost:
+            return False
+
+        self.stamina -= option.stamina_cost
+        self.attack_power += option.player_attack_power_gain
+        self.defense += option.player_defense_gain
+        self.speed += option.player_speed_gain
+        self.dexterity += option.player_dexterity_gain
+        return True
+
+    def take_mission(self, mission):
+        # type: (Mission) -> bool
+        if self.stamina < mission.stamina_cost:
+            print(str(self.name) + " has insufficient stamina!")
+            return False
+        self.stamina -= mission.stamina_cost
+        print(str(self.name) + " takes on mission " + str(mission.name) + "!")
+        print("Mission description: " + str(mission.description))
+        self.missions_completed += 1
+        self.claim_reward(mission.clear_reward)
+        return True
+
+
+class AIPlayer(Player):
+    """
+    This class contains attributes of an AI controlled player in this game.
+    """
+
+    def __init__(self, name, rng=None):
+        # type: (str, random.Random or None) -> None
+        Player.__init__(self, name, rng)
+
+
+class Mission:
+    """
+    This class contains attributes of a mission in this game.
+    """
+
+    def __init__(self, name, description, stamina_cost, clear_reward):
+        # type: (str, str, mpf, Reward) -> None
+        self.name: str = name
+        self.description: str = description
+        self.stamina_cost: mpf = stamina_cost
+        self.clear_reward: Reward = clear_reward
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> Mission
+        return copy.deepcopy(self)
+
+
+class MissionBoard:
+    """
+    This class contains attributes of a board of missions ready to be taken. A pool of up to 'pool_size'
+    missions is kept for each kind of city tile, and a worker thread tops the pools up, generating the names
+    and descriptions of a batch of missions with one structured request to Gemini AI. Taking a mission never
+    waits for Gemini AI: if the pool is empty, a mission is made up locally.
+    """
+
+    TILE_TYPES: list = ["downtown", "beach", "suburb", "park"]
+
+    def __init__(self, json_model, pool_size=MISSION_BOARD_POOL_SIZE):
+        # type: (TelemetryGenerativeModel, int) -> None
+        self.json_model: TelemetryGenerativeModel = json_model
+        self.pool_size: int = pool_size
+        self.__pools: dict = {tile_type: [] for tile_type in self.TILE_TYPES}
+        self.__condition: threading.Condition = threading.Condition()
+        self.__discarded: bool = False  # initial value
+        # The worker thread draws from its own stream, seeded here so that the "missions" stream stays on this thread.
+        self.__rng: random.Random = random.Random(get_random_stream("missions").getrandbits(64))
+        threading.Thread(target=self.__refill_pools, name="mission-board", daemon=True).start()
+
+    @staticmethod
+    def get_tile_type(city_tile):
+        # type: (CityTile) -> str
+        return "downtown" if isinstance(city_tile, DowntownTile) else "beach" if isinstance(city_tile, BeachTile) \
+            else "suburb" if isinstance(city_tile, SuburbTile) else "park"
+
+    @staticmethod
+    def get_mission_generation_prompt(tile_type, num_missions):
+        # type: (str, int) -> str
+        return "Please enter " + str(num_missions) + " different good missions in " + str(tile_type) + \
+            " area in an RPG (safe mission names and descriptions only please)! Respond with a JSON array of " + \
+            str(num_missions) + " objects with the keys \"name\" and \"description\"."
+
+    @staticmethod
+    def parse_missions(response_text, num_missions, rng):
+        # type: (str, int, random.Random) -> list
+        """
+        Building missions from a JSON response of Gemini AI, drawing their stamina costs from 'rng'. Invalid entries
+        are skipped.
+        :return: a list of at most 'num_missions' missions
+        """
+
+        try:
+            generated_missions = json.loads(response_text)
+        except ValueError:
+            return []
+
+        if isinstance(generated_missions, dict):
+            # Accepting responses like {"missions": [...]}
+            generated_missions = next((value for value in generated_missions.values() if isinstance(value, list)),
+                                      [generated_missions])
+
+        if not isinstance(generated_missions, list):
+            return []
+
+        missions: list = []  # initial value
+        for generated_mission in generated_missions[:num_missions]:
+            if not isinstance(generated_mission, dict):
+                continue
+
+            name = generated_mission.get("name")
+            description = generated_mission.get("description")
+            if not isinstance(name, str) or not isinstance(description, str) or name.strip() == "" or \
+                    len(name.strip()) > MISSION_NAME_MAX_LENGTH or description.strip() == "":
+                continue
+
+            missions.append(Mission(name.strip(), description.strip(),
+                                    number(rng.randint(5, 25)), Reward()))
+
+        return missions
+
+    def generate_missions(self, tile_type, num_missions):
+        # type: (str, int) -> list
+        try:
+            response: LLMResponse = self.json_model.generate_content(
+                self.get_mission_generation_prompt(tile_type, num_missions), call_site="missions")
+        except (gemini.types.generation_types.BlockedPromptException,
+                gemini.types.generation_types.StopCandidateException):
+            return []
+
+        if response.is_fallback:
+            return []
+
+        return self.parse_missions(str(response.text), num_missions, self.__rng)
+
+    def __get_tile_type_to_refill(self):
+        # type: () -> str or None
+        return next((tile_type for tile_type in self.TILE_TYPES if len(self.__pools[tile_type]) < self.pool_size),
+                    None)
+
+    def __refill_pools(self):
+        # type: () -> None
+        while True:
+            with self.__condition:
+                tile_type: str or None = self.__get_tile_type_to_refill()
+                while not self.__discarded and tile_type is None:
+                    self.__condition.wait()
+                    tile_type = self.__get_tile_type_to_refill()
+
+                if self.__discarded:
+                    return
+
+                num_missions: int = self.pool_size - len(self.__pools[tile_type])
+
+            try:
+                missions: list = self.generate_missions(tile_type, num_missions)
+            except Exception:
+                missions: list = []  # the worker thread must keep running whatever goes wrong
+
+            with self.__condition:
+                self.__pools[tile_type].extend(missions)
+                if len(missions) == 0:
+                    # Giving Gemini AI a rest before trying again
+                    self.__condition.wait(MISSION_BOARD_RETRY_DELAY)
+
+    def get_num_missions_ready(self, tile_type):
+        # type: (str) -> int
+        with self.__condition:
+            return len(self.__pools[tile_type])
+
+    def take(self, player):
+        # type: (Player) -> Mission
+        """
+        Taking a mission from the pool for the kind of tile the player is on. The reward of the mission
+        depends on the level of the player.
+        :return: the mission
+        """
+
+        tile_type: str = self.get_tile_type(player.get_city_tile())
+        with self.__condition:
+            pool: list = self.__pools[tile_type]
+            mission: Mission or None = pool.pop(0) if len(pool) > 0 else None
+            self.__condition.notify()
+
+        if mission is None:
+            rng: random.Random = get_random_stream("missions")
+            mission = Mission(generate_random_name(rng), "A mission in " + str(tile_type) + " area.",
+                              number(rng.randint(5, 25)), Reward())
+
+        # Whether a mission was ready depends on how fast Gemini AI answered, so recorded sessions keep the mission.
+        if _game_session is not None:
+            name, description, stamina_cost = _game_session.call(
+                "mission", tile_type, lambda: [mission.name, mission.description, int(mission.stamina_cost)])
+            mission = Mission(name, description, number(stamina_cost), Reward())
+
+        mission.clear_reward = Reward(Magnitude.power_of_ten(5 * player.level),
+                                      Magnitude.power_of_ten(5 * player.level - 2),
+                                      Magnitude.power_of_ten(5 * player.level))
+        return mission
+
+    def discard(self):
+        # type: () -> None
+        with self.__condition:
+            self.__discarded = True
+            self.__condition.notify()
+
+
+class ItemShop:
+    """
+    This class contains attributes of an item shop selling items.
+    """
+
+    def __init__(self, items_sold):
+        # type: (list) -> None
+        self.name: str = "ITEM SHOP"
+        self.__items_sold: list = items_sold
+
+    def get_items_sold(self):
+        # type: () -> list
+        return self.__items_sold
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> ItemShop
+        return copy.deepcopy(self)
+
+
+class Reward:
+    """
+    This class contains attributes of a reward gained for accomplishing something in this game.
+    """
+
+    def __init__(self, player_reward_exp=Magnitude(0), player_reward_dollars=Magnitude(0),
+                 legendary_creature_reward_exp=Magnitude(0)):
+        # type: (Magnitude, Magnitude, Magnitude) -> None
+        self.player_reward_exp: Magnitude = Magnitude(player_reward_exp)
+        self.player_reward_dollars: Magnitude = Magnitude(player_reward_dollars)
+        self.legendary_creature_reward_exp: Magnitude = Magnitude(legendary_creature_reward_exp)
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> Reward
+        return copy.deepcopy(self)
+
+
+class AdventureModeLocation:
+    """
+    This class contains attributes of the location of a player in adventure mode of this game.
+    """
+
+    def __init__(self, tile_x, tile_y):
+        # type: (int, int) -> None
+        self.tile_x: int = tile_x
+        self.tile_y: int = tile_y
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> AdventureModeLocation
+        return copy.deepcopy(self)
+
+
+class SavedGameData:
+    """
+    This class contains attributes of the saved game data in this game.
+    """
+
+    def __init__(self, player_name, temperature, top_p, top_k, max_output_tokens, player_data, gym):
+        # type: (str, float, float, float, int, Player, ExerciseGym) -> None
+        self.player_name: str = player_name
+        self.temperature: float = temperature
+        self.top_p: float = top_p
+        self.top_k: float = top_k
+        self.max_output_tokens: int = max_output_tokens
+        self.player_data: Player = player_data
+        self.gym: ExerciseGym = gym
+        self.number_backend: str = NUMBER_BACKEND  # numeric backend which wrote the saved game data
+
+    def __str__(self):
+        # type: () -> str
+        res: str = ""  # initial value
+        res += str(self.player_name).upper() + "\n"
+        res += "Temperature: " + str(self.temperature) + "\n"
+        res += "Top P: " + str(self.top_p) + "\n"
+        res += "Top K: " + str(self.top_k) + "\n"
+        res += "Max output tokens: " + str(self.max_output_tokens) + "\n"
+        return res
+
+    def get_generation_config(self):
+        # type: () -> dict
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "top_k": self.top_k,
+            "max_output_tokens": self.max_output_tokens,
+        }
+
+    def clone(self):
+        # type: () -> SavedGameData
+        return copy.deepcopy(self)
+
+
+###########################################
+# SAVED GAME DATA FORMAT
+###########################################
+
+
+# Classes whose objects can be stored in saved game data. Loading saved game data never creates objects of any other
+# class.
+SAVED_GAME_CLASSES: dict = {cls.__name__: cls for cls in [
+    SavedGameData, Player, AIPlayer, NPC, City, CityTile, PortalTile, DowntownTile, SuburbTile, ParkTile, BeachTile,
+    AdventureModeLocation, LegendaryCreature, Skill, AwakenBonus, BattleTeam, LegendaryCreatureInventory,
+    ItemInventory, Item, Ball, Rune, AwakenShard, EXPShard, LevelUpShard, SkillLevelUpShard, ExerciseGym,
+    TrainingOption, Mission, Reward]}
+
+
+def zigzag_encode(value):
+    # type: (int) -> int
+    # Mapping signed integers to unsigned ones (0, -1, 1, -2, ... to 0, 1, 2, 3, ...) so that small negative
+    # integers also take few bytes as varints.
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def zigzag_decode(value):
+    # type: (int) -> int
+    return value >> 1 if value & 1 == 0 else -((value + 1) >> 1)
+
+
+class SavedGameEncoder:
+    """
+    This class contains attributes of an encoder of saved game data into the save format of this game: a header
+    (magic bytes, save format version, and CRC-32 checksum of the body) followed by one tagged value. Integers are
+    written as varints, and every game object, list, dictionary, set, and string is written once and referred to by its
+    index afterwards, so saved game data shared between objects (e.g. legendary creatures in both the inventory and
+    the battle team) is only stored once. The names of the attributes of game objects are written with the first
+    object of each shape (class and attribute names) only.
+    """
+
+    HEADER: struct.Struct = struct.Struct("<8sHI")
+    FLOAT: struct.Struct = struct.Struct("<d")
+    MAX_INTEGRAL_FLOAT: float = 2.0 ** 53  # integral floats up to this are written as varints
+
+    # Tags of the values in saved game data
+    NONE: int = 0
+    TRUE: int = 1
+    FALSE: int = 2
+    INT: int = 3
+    FLOAT_VALUE: int = 4
+    INTEGRAL_FLOAT: int = 5
+    MPF: int = 6
+    STR: int = 7
+    STR_REFERENCE: int = 8
+    BYTES: int = 9
+    LIST: int = 10
+    TUPLE: int = 11
+    DICT: int = 12
+    SET: int = 13
+    OBJECT: int = 14
+    REFERENCE: int = 15
+    MAGNITUDE: int = 16
+    OBJECT_KEY: int = 17
+
+    def __init__(self):
+        # type: () -> None
+        self.__buffer: bytearray = bytearray()
+        self.__strings: dict = {}  # indices of the strings written so far
+        self.__references: dict = {}  # indices of the objects written so far by their ids
+        self.__referenced: list = []  # objects written so far, kept alive so that their ids are not reused
+        self.__shapes: dict = {}  # indices of the shapes of the game objects written so far
+        self.__root: object = None  # game object encoded on its own (if any)
+        self.__get_key: typing.Callable or None = None  # keys of the other game objects when encoding one on its own
+        self.__shape_headers: dict = {}  # headers of game objects encoded on their own by their shapes
+        self.__encoders: dict = {cls: self.__write_object for cls in SAVED_GAME_CLASSES.values()}
+        self.__encoders.update({type(None): self.__write_none, bool: self.__write_bool, int: self.__write_int,
+                                float: self.__write_float, mpf: self.__write_mpf, str: self.__write_str,
+                                bytes: self.__write_bytes, list: self.__write_list, tuple: self.__write_tuple,
+                                dict: self.__write_dict, set: self.__write_set, Magnitude: self.__write_magnitude})
+
+    def encode(self, game_data):
+        # type: (SavedGameData) -> bytes
+        body: bytes = self.__encode_value(game_data, None)
+        return self.HEADER.pack(SAVE_FILE_MAGIC, SAVE_FORMAT_VERSION, zlib.crc32(body)) + body
+
+    def encode_object(self, obj, get_key):
+        # type: (object, typing.Callable) -> bytes
+        """
+        Encoding the attributes of the game object 'obj' on its own (without a header), writing the other game
+        objects it refers to as the keys 'get_key' gives them (used by the autosave journal).
+        :return: the encoded game object
+        """
+
+        return self.__encode_value(obj, get_key)
+
+    def __encode_value(self, value, get_key):
+        # type: (object, typing.Callable or None) -> bytes
+        self.__buffer = bytearray()
+        self.__strings = {}
+        self.__references = {}
+        self.__referenced = []
+        self.__shapes = {}
+        self.__root = value
+        self.__get_key = get_key
+        self.__write(value)
+        return bytes(self.__buffer)
+
+    def __write(self, value):
+        # type: (object) -> None
+        encoder: typing.Callable or None = self.__encoders.get(type(value))
+        if encoder is not None:
+            encoder(value)
+        elif isinstance(value, np.integer):
+            self.__write_int(int(value))
+        elif isinstance(value, np.floating):
+            self.__write_float(float(value))
+        else:
+            raise TypeError("Cannot save objects of type " + str(type(value).__name__) + ".")
+
+    def __write_varint(self, value):
+        # type: (int) -> None
+        if value < 0x80:
+            self.__buffer.append(value)
+            return
+
+        while value >= 0x80:
+            self.__buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.__buffer.append(value)
+
+    def __write_reference(self, value):
+        # type: (object) -> bool
+        """
+        Writing a reference to 'value' if it was written before, else giving it the next index.
+        :return: whether a reference was written
+        """
+
+        index: int or None = self.__references.get(id(value))
+        if index is not None:
+            self.__buffer.append(self.REFERENCE)
+            self.__write_varint(index)
+            return True
+
+        self.__references[id(value)] = len(self.__referenced)
+        self.__referenced.append(value)
+        return False
+
+    def __write_none(self, value):
+        # type: (None) -> None
+        self.__buffer.append(self.NONE)
+
+    def __write_bool(self, value):
+        # type: (bool) -> None
+        self.__buffer.append(self.TRUE if value else self.FALSE)
+
+    def __write_int(self, value):
+        # type: (int) -> None
+        self.__buffer.append(self.INT)
+        self.__write_varint(zigzag_encode(value))
+
+    def __write_float(self, value):
+        # type: (float) -> None
+        # Stats, HP, and mantissas of magnitudes are mostly integral.
+        if value.is_integer() and abs(value) <= self.MAX_INTEGRAL_FLOAT and not (value == 0 and
+                                                                                math.copysign(1.0, value) < 0):
+            self.__buffer.append(self.INTEGRAL_FLOAT)
+            self.__write_varint(zigzag_encode(int(value)))
+        else:
+            self.__buffer.append(self.FLOAT_VALUE)
+            self.__buffer += self.FLOAT.pack(value)
+
+    def __write_mpf(self, value):
+        # type: (mpf) -> None
+        sign, mantissa, exponent, bit_count = value._mpf_
+        self.__buffer.append(self.MPF)
+        self.__write_varint(int(mantissa) << 1 | sign)
+        self.__write_varint(zigzag_encode(int(exponent)))
+        if mantissa == 0:
+            # Zero, infinities, and NaN are told apart by their exponents and bit counts.
+            self.__write_varint(zigzag_encode(int(bit_count)))
+
+    def __write_str(self, value):
+        # type: (str) -> None
+        index: int or None = self.__strings.get(value)
+        if index is not None:
+            self.__buffer.append(self.STR_REFERENCE)
+            self.__write_varint(index)
+            return
+
+        self.__strings[value] = len(self.__strings)
+        encoded: bytes = value.encode("utf-8")
+        self.__buffer.append(self.STR)
+        self.__write_varint(len(encoded))
+        self.__buffer += encoded
+
+    def __write_bytes(self, value):
+        # type: (bytes) -> None
+        self.__buffer.append(self.BYTES)
+        self.__write_varint(len(value))
+        self.__buffer += value
+
+    def __write_list(self, value):
+        # type: (list) -> None
+        if self.__write_reference(value):
+            return
+
+        self.__buffer.append(self.LIST)
+        self.__write_varint(len(value))
+        for elem in value:
+            self.__write(elem)
+
+    def __write_tuple(self, value):
+        # type: (tuple) -> None
+        self.__buffer.append(self.TUPLE)
+        self.__write_varint(len(value))
+        for elem in value:
+            self.__write(elem)
+
+    def __write_dict(self, value):
+        # type: (dict) -> None
+        if self.__write_reference(value):
+            return
+
+        self.__buffer.append(self.DICT)
+        self.__write_varint(len(value))
+        for key, elem in value.items():
+            self.__write(key)
+            self.__write(elem)
+
+    def __write_set(self, value):
+        # type: (set) -> None
+        if self.__write_reference(value):
+            return
+
+        self.__buffer.append(self.SET)
+        self.__write_varint(len(value))
+        for elem in value:
+            self.__write(elem)
+
+    def __write_magnitude(self, value):
+        # type: (Magnitude) -> None
+        self.__buffer.append(self.MAGNITUDE)
+        self.__write_float(value.mantissa)
+        self.__write_varint(zigzag_encode(value.exponent))
+
+    def __write_object(self, value):
+        # type: (object) -> None
+        if self.__get_key is not None and value is not self.__root:
+            self.__buffer.append(self.OBJECT_KEY)
+            self.__write_varint(self.__get_key(value))
+            return
+        elif self.__write_reference(value):
+            return
+
+        # Only classes customising their state (e.g. LegendaryCreature) define __getstate__ before Python 3.11.
+        get_state: typing.Callable or None = getattr(value, "__getstate__", None)
+        state: dict or None = get_state() if get_state is not None else vars(value)
+        state = state if state is not None else {}
+        shape: tuple = (type(value), tuple(state))
+        index: int or None = self.__shapes.get(shape)
+        self.__buffer.append(self.OBJECT)
+        if index is not None:
+            self.__write_varint(index)
+        elif self.__get_key is not None and shape in self.__shape_headers:
+            # Game objects of the same shape encoded on their own start with the same header (and string table).
+            header, strings = self.__shape_headers[shape]
+            self.__buffer += header
+            self.__strings = strings.copy()
+            self.__shapes[shape] = 0
+        else:
+            header_start: int = len(self.__buffer)
+            index = self.__shapes[shape] = len(self.__shapes)
+            self.__write_varint(index)
+            self.__write_str(type(value).__name__)
+            self.__write_varint(len(state))
+            for key in state:
+                self.__write_str(key)
+
+            if self.__get_key is not None:
+                self.__shape_headers[shape] = (bytes(self.__buffer[header_start:]), self.__strings.copy())
+
+        for elem in state.values():
+            self.__write(elem)
+
+
+class SavedGameDecoder:
+    """
+    This class contains attributes of a decoder of saved game data written by SavedGameEncoder.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__data: bytes = b""
+        self.__position: int = 0  # initial value
+        self.__strings: list = []  # strings read so far
+        self.__referenced: list = []  # objects read so far
+        self.__shapes: list = []  # classes and attribute names of the shapes of the game objects read so far
+        self.__root: object = None  # game object decoded on its own (if any)
+        self.__objects: dict = {}  # game objects decoded on their own by their keys
+        self.__decoders: dict = {
+            SavedGameEncoder.NONE: lambda: None,
+            SavedGameEncoder.TRUE: lambda: True,
+            SavedGameEncoder.FALSE: lambda: False,
+            SavedGameEncoder.INT: lambda: zigzag_decode(self.__read_varint()),
+            SavedGameEncoder.FLOAT_VALUE: self.__read_float,
+            SavedGameEncoder.INTEGRAL_FLOAT: lambda: float(zigzag_decode(self.__read_varint())),
+            SavedGameEncoder.MPF: self.__read_mpf,
+            SavedGameEncoder.STR: self.__read_str,
+            SavedGameEncoder.STR_REFERENCE: lambda: self.__strings[self.__read_varint()],
+            SavedGameEncoder.BYTES: lambda: bytes(self.__read_bytes(self.__read_varint())),
+            SavedGameEncoder.LIST: self.__read_list,
+            SavedGameEncoder.TUPLE: lambda: tuple(self.__read() for i in range(self.__read_varint())),
+            SavedGameEncoder.DICT: self.__read_dict,
+            SavedGameEncoder.SET: self.__read_set,
+            SavedGameEncoder.OBJECT: self.__read_object,
+            SavedGameEncoder.REFERENCE: lambda: self.__referenced[self.__read_varint()],
+            SavedGameEncoder.MAGNITUDE: lambda: Magnitude(self.__read(), zigzag_decode(self.__read_varint())),
+            SavedGameEncoder.OBJECT_KEY: lambda: self.__objects[self.__read_varint()]
+        }
+
+    def decode(self, data):
+        # type: (bytes) -> tuple
+        """
+        Decoding saved game data.
+        :return: the saved game data and the save format version it was written with
+        """
+
+        header: struct.Struct = SavedGameEncoder.HEADER
+        if len(data) < header.size or not data.startswith(SAVE_FILE_MAGIC):
+            raise ValueError("The file does not contain saved game data.")
+
+        magic, version, checksum = header.unpack_from(data)
+        if version > SAVE_FORMAT_VERSION:
+            raise ValueError("The saved game data was written by a newer version of this game (save format version "
+                             + str(version) + ").")
+        elif zlib.crc32(memoryview(data)[header.size:]) != checksum:
+            raise ValueError("The saved game data is corrupted.")
+
+        try:
+            game_data: SavedGameData = self.__decode_value(data, header.size, None)
+        except (IndexError, UnicodeDecodeError, struct.error):
+            raise ValueError("The saved game data is corrupted.")
+        return game_data, version
+
+    def decode_objects(self, entries):
+        # type: (dict) -> dict
+        """
+        Decoding game objects encoded on their own by SavedGameEncoder.encode_object, given by the keys they refer
+        to each other with.
+        :return: a dictionary of the decoded game objects by their keys
+        """
+
+        try:
+            # All the game objects are created first, as they may refer to each other in any order.
+            self.__objects = {}
+            for key, data in entries.items():
+                self.__data = data
+                self.__position = 0
+                self.__strings = []
+                if self.__read_varint() != SavedGameEncoder.OBJECT or self.__read_varint() != 0:
+                    raise ValueError("The autosaved game data is corrupted.")
+
+                name: str = self.__read()
+                if name not in SAVED_GAME_CLASSES:
+                    raise ValueError("Saved game data may not contain objects of class " + str(name) + ".")
+                self.__objects[key] = SAVED_GAME_CLASSES[name].__new__(SAVED_GAME_CLASSES[name])
+
+            for key, data in entries.items():
+                self.__decode_value(data, 0, self.__objects[key])
+        except (IndexError, KeyError, UnicodeDecodeError, struct.error):
+            raise ValueError("The autosaved game data is corrupted.")
+        return self.__objects
+
+    def __decode_value(self, data, position, root):
+        # type: (bytes, int, object) -> object
+        self.__data = data
+        self.__position = position
+        self.__strings = []
+        self.__referenced = []
+        self.__shapes = []
+        self.__root = root
+        return self.__read()
+
+    def __read(self):
+        # type: () -> object
+        tag: int = self.__data[self.__position]
+        self.__position += 1
+        decoder: typing.Callable or None = self.__decoders.get(tag)
+        if decoder is None:
+            raise ValueError("Unknown tag in saved game data: " + str(tag))
+        return decoder()
+
+    def __read_varint(self):
+        # type: () -> int
+        byte: int = self.__data[self.__position]
+        self.__position += 1
+        if byte < 0x80:
+            return byte
+
+        result: int = byte & 0x7F
+        shift: int = 7
+        while True:
+            byte = self.__data[self.__position]
+            self.__position += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def __read_bytes(self, length):
+        # type: (int) -> memoryview
+        if self.__position + length > len(self.__data):
+            raise IndexError("Saved game data ends in the middle of a value.")
+        value: memoryview = memoryview(self.__data)[self.__position:self.__position + length]
+        self.__position += length
+        return value
+
+    def __read_float(self):
+        # type: () -> float
+        return SavedGameEncoder.FLOAT.unpack(self.__read_bytes(SavedGameEncoder.FLOAT.size))[0]
+
+    def __read_mpf(self):
+        # type: () -> mpf
+        signed_mantissa: int = self.__read_varint()
+        mantissa: int = signed_mantissa >> 1
+        exponent: int = zigzag_decode(self.__read_varint())
+        bit_count: int = mantissa.bit_length() if mantissa != 0 else zigzag_decode(self.__read_varint())
+        return mp.make_mpf((signed_mantissa & 1, MPZ(mantissa), exponent, bit_count))
+
+    def __read_str(self):
+        # type: () -> str
+        value: str = str(self.__read_bytes(self.__read_varint()), "utf-8")
+        self.__strings.append(value)
+        return value
+
+    def __read_list(self):
+        # type: () -> list
+        # Containers are registered before their elements are read, as they may contain themselves.
+        value: list = []
+        self.__referenced.append(value)
+        value.extend(self.__read() for i in range(self.__read_varint()))
+        return value
+
+    def __read_dict(self):
+        # type: () -> dict
+        value: dict = {}
+        self.__referenced.append(value)
+        for i in range(self.__read_varint()):
+            key = self.__read()
+            value[key] = self.__read()
+        return value
+
+    def __read_set(self):
+        # type: () -> set
+        value: set = set()
+        self.__referenced.append(value)
+        value.update(self.__read() for i in range(self.__read_varint()))
+        return value
+
+    def __read_object(self):
+        # type: () -> object
+        index: int = self.__read_varint()
+        if index == len(self.__shapes):
+            name: str = self.__read()
+            if name not in SAVED_GAME_CLASSES:
+                raise ValueError("Saved game data may not contain objects of class " + str(name) + ".")
+            self.__shapes.append((SAVED_GAME_CLASSES[name], [self.__read() for i in range(self.__read_varint())]))
+
+        cls, keys = self.__shapes[index]
+
+        # Game objects refer to each other (e.g. legendary creatures and their battle teams), so every object is
+        # registered before its attributes are read.
+        obj = cls.__new__(cls) if self.__root is None else self.__root
+        self.__root = None
+        self.__referenced.append(obj)
+        state: dict = {key: self.__read() for key in keys}
+
+        if hasattr(obj, "__setstate__"):
+            obj.__setstate__(state)
+        else:
+            obj.__dict__.update(state)
+        return obj
+
+
+class SavedGameUnpickler(pickle.Unpickler):
+    """
+    This class contains attributes of an unpickler of saved game data written before the save format existed (as a
+    pickle). It only creates objects of the classes in saved game data, whatever else the file refers to.
+    """
+
+    # Functions and classes other than the game classes which pickled saved game data refers to
+    GLOBALS: dict = {("mpmath.ctx_mp_python", "_make_mpf"): mpmath.ctx_mp_python._make_mpf,
+                     ("builtins", "set"): set, ("builtins", "frozenset"): frozenset}
+
+    def find_class(self, module, name):
+        # type: (str, str) -> object
+        # Saved game data pickled while this game ran as a script refers to its classes in "__main__".
+        if module in ["__main__", __name__, "gemini_cli_planet_adventure.gemini_cli_planet_adventure"]:
+            if name in SAVED_GAME_CLASSES:
+                return SAVED_GAME_CLASSES[name]
+            elif name == "Magnitude":
+                return Magnitude
+        elif (module, name) in self.GLOBALS:
+            return self.GLOBALS[(module, name)]
+
+        raise pickle.UnpicklingError("Saved game data may not refer to " + str(module) + "." + str(name) + ".")
+
+
+###########################################
+# AUTOSAVE
+###########################################
+
+
+class AutosaveService:
+    """
+    This class contains attributes of the autosave of a saved game. After every action in the main menu, the saved
+    game data is handed to a background thread, which encodes the game objects changed by the action (each on its
+    own by SavedGameEncoder.encode_object) while the player thinks about the next action, appends them to a journal
+    as one small record, and syncs it to disk. Every 'compact_records' records or 'compact_interval' seconds, the
+    background thread compacts the journal into a snapshot of all the game objects (written to a temporary file,
+    synced, and renamed) and starts a new journal. The snapshot and the journal records are compressed with zlib.
+    """
+
+    COMPRESSION_LEVEL: int = 1  # the encoded game objects repeat their attribute names, so fast compression suffices
+
+    SNAPSHOT_HEADER: struct.Struct = struct.Struct("<8sHQI")  # magic, save format version, generation, CRC-32
+    JOURNAL_HEADER: struct.Struct = struct.Struct("<8sHQ")  # magic, save format version, generation
+    RECORD_HEADER: struct.Struct = struct.Struct("<II")  # length and CRC-32 of a journal record
+    RECORD_COUNTS: struct.Struct = struct.Struct("<II")  # key of the saved game data and number of game objects
+    RECORD_ENTRY: struct.Struct = struct.Struct("<II")  # key and length of a game object
+
+    def __init__(self, file_name, compact_records=AUTOSAVE_COMPACT_RECORDS,
+                 compact_interval=AUTOSAVE_COMPACT_INTERVAL):
+        # type: (str, int, float) -> None
+        self.file_name: str = file_name
+        self.compact_records: int = compact_records
+        self.compact_interval: float = compact_interval
+        self.error: Exception or None = None  # error which stopped the autosave (if any)
+        self.__encoder: SavedGameEncoder = SavedGameEncoder()
+        self.__keys: dict = {}  # keys of the autosaved game objects by their ids
+        self.__objects: dict = {}  # autosaved game objects by their keys, kept alive so that their ids are not reused
+        self.__encodings: dict = {}  # last autosaved encodings of the game objects by their keys
+        self.__next_key: int = 0  # initial value
+        self.__pending: queue.Queue = queue.Queue()  # saved game data to be autosaved
+        self.__encoded: threading.Event = threading.Event()  # set once the saved game data handed over is encoded
+        self.__encoded.set()
+        self.__thread: threading.Thread = threading.Thread(target=self.__autosave, name="autosave", daemon=True)
+        self.__thread.start()
+
+        # Records which are still pending when the game stops with an error are written before it exits.
+        atexit.register(self.close)
+
+    @staticmethod
+    def encode_record(root_key, entries, removed_keys):
+        # type: (int, dict, list) -> bytes
+        record: bytearray = bytearray(AutosaveService.RECORD_COUNTS.pack(root_key, len(entries)))
+        for key, data in entries.items():
+            record += AutosaveService.RECORD_ENTRY.pack(key, len(data))
+            record += data
+
+        record += struct.pack("<I" + "I" * len(removed_keys), len(removed_keys), *removed_keys)
+        return bytes(record)
+
+    @staticmethod
+    def apply_record(entries, record):
+        # type: (dict, bytes) -> int
+        """
+        Updating 'entries' (the encoded game objects by their keys) with a record.
+        :return: the key of the saved game data
+        """
+
+        root_key, num_entries = AutosaveService.RECORD_COUNTS.unpack_from(record)
+        position: int = AutosaveService.RECORD_COUNTS.size
+        for i in range(num_entries):
+            key, length = AutosaveService.RECORD_ENTRY.unpack_from(record, position)
+            position += AutosaveService.RECORD_ENTRY.size
+            entries[key] = bytes(record[position:position + length])
+            position += length
+
+        num_removed_keys: int = struct.unpack_from("<I", record, position)[0]
+        for key in struct.unpack_from("<" + "I" * num_removed_keys, record, position + 4):
+            entries.pop(key, None)
+        return root_key
+
+    @staticmethod
+    def load(file_name):
+        # type: (str) -> tuple or None
+        """
+        Loading the autosaved game data of the saved game file 'file_name': its snapshot together with the journal
+        records written after it. A record which was only partly written when the game stopped ends the journal.
+        :return: the autosaved game data and the save format version it was written with, or None if there is none
+        """
+
+        snapshot_file_name: str = file_name + AUTOSAVE_SNAPSHOT_SUFFIX
+        if not os.path.exists(snapshot_file_name):
+            return None
+
+        with open(snapshot_file_name, "rb") as snapshot_file:
+            snapshot: bytes = snapshot_file.read()
+
+        header: struct.Struct = AutosaveService.SNAPSHOT_HEADER
+        if len(snapshot) < header.size or not snapshot.startswith(AUTOSAVE_FILE_MAGIC):
+            raise ValueError("The autosaved game data is corrupted.")
+
+        magic, version, generation, checksum = header.unpack_from(snapshot)
+        if version > SAVE_FORMAT_VERSION:
+            raise ValueError("The autosaved game data was written by a newer version of this game (save format "
+                             "version " + str(version) + ").")
+        elif zlib.crc32(memoryview(snapshot)[header.size:]) != checksum:
+            raise ValueError("The autosaved game data is corrupted.")
+
+        entries: dict = {}  # initial value
+        try:
+            root_key: int = AutosaveService.apply_record(entries, zlib.decompress(memoryview(snapshot)[header.size:]))
+        except (struct.error, zlib.error):
+            raise ValueError("The autosaved game data is corrupted.")
+
+        # A journal left over from before the snapshot was written belongs to an older generation.
+        journal_file_name: str = file_name + AUTOSAVE_JOURNAL_SUFFIX
+        journal: bytes = b""  # initial value
+        if os.path.exists(journal_file_name):
+            with open(journal_file_name, "rb") as journal_file:
+                journal = journal_file.read()
+
+        if journal[:AutosaveService.JOURNAL_HEADER.size] == \
+                AutosaveService.JOURNAL_HEADER.pack(AUTOSAVE_FILE_MAGIC, version, generation):
+            position: int = AutosaveService.JOURNAL_HEADER.size
+            while position + AutosaveService.RECORD_HEADER.size <= len(journal):
+                length, checksum = AutosaveService.RECORD_HEADER.unpack_from(journal, position)
+                position += AutosaveService.RECORD_HEADER.size
+                record: memoryview = memoryview(journal)[position:position + length]
+                if len(record) < length or zlib.crc32(record) != checksum:
+                    break
+
+                try:
+                    root_key = AutosaveService.apply_record(entries, zlib.decompress(record))
+                except (struct.error, zlib.error):
+                    raise ValueError("The autosaved game data is corrupted.")
+                position += length
+
+        game_objects: dict = SavedGameDecoder().decode_objects(entries)
+        if root_key not in game_objects:
+            raise ValueError("The autosaved game data is corrupted.")
+        return game_objects[root_key], version
+
+    def record(self, game_data):
+        # type: (SavedGameData) -> None
+        """
+        Handing the saved game data to the background thread to be autosaved. The game objects must not be changed
+        until wait() returns.
+        :return: None
+        """
+
+        if self.error is None:
+            self.__encoded.clear()
+            self.__pending.put(game_data)
+
+    def wait(self):
+        # type: () -> None
+        """
+        Waiting for the background thread to encode the saved game data handed to it by the last record (usually
+        done while the player was choosing the next action).
+        :return: None
+        """
+
+        self.__encoded.wait()
+
+    def close(self, discard=False):
+        # type: (bool) -> None
+        """
+        Waiting for the background thread to write the records of the saved game data handed to it, and removing
+        the snapshot and the journal if 'discard' is True (once the game data is saved).
+        :return: None
+        """
+
+        atexit.unregister(self.close)
+        if self.__thread.is_alive():
+            self.__pending.put(None)
+            self.__thread.join()
+
+        if discard:
+            for suffix in [AUTOSAVE_SNAPSHOT_SUFFIX, AUTOSAVE_JOURNAL_SUFFIX]:
+                if os.path.exists(self.file_name + suffix):
+                    os.remove(self.file_name + suffix)
+            sync_directory(os.path.dirname(self.file_name))
+
+    def __encode_changes(self, game_data):
+        # type: (SavedGameData) -> bytes or None
+        """
+        Encoding the game objects which changed since the last record (and the keys of the game objects which are no
+        longer part of the game).
+        :return: the record, or None if nothing changed
+        """
+
+        changed_entries: dict = {}  # initial value
+        visited_keys: set = set()  # initial value
+        pending: list = []  # initial value
+
+        def get_key(obj):
+            # type: (object) -> int
+            key: int or None = self.__keys.get(id(obj))
+            if key is None:
+                key = self.__next_key
+                self.__next_key += 1
+                self.__keys[id(obj)] = key
+                self.__objects[key] = obj
+
+            if key not in visited_keys:
+                visited_keys.add(key)
+                pending.append((key, obj))
+            return key
+
+        root_key: int = get_key(game_data)
+        while len(pending) > 0:
+            key, obj = pending.pop()
+            data: bytes = self.__encoder.encode_object(obj, get_key)
+            if self.__encodings.get(key) != data:
+                self.__encodings[key] = data
+                changed_entries[key] = data
+
+        removed_keys: list = [key for key in self.__encodings if key not in visited_keys]
+        for key in removed_keys:
+            del self.__encodings[key]
+            del self.__keys[id(self.__objects.pop(key))]
+
+        if len(changed_entries) == 0 and len(removed_keys) == 0:
+            return None
+        return self.encode_record(root_key, changed_entries, removed_keys)
+
+    def __autosave(self):
+        # type: () -> None
+        entries: dict = {}  # encoded game objects by their keys, as in the snapshot and the journal together
+        root_key: int = 0  # initial value
+        generation: int = int.from_bytes(os.urandom(8), "little")  # told apart from journals of earlier games
+        journal: io.BufferedWriter or None = None  # initial value
+        num_journal_records: int = 0  # initial value
+        last_compaction_time: float = time.monotonic()
+        stopping: bool = False
+        try:
+            while not stopping:
+                timeout: float or None = None if num_journal_records == 0 else \
+                    max(0.0, last_compaction_time + self.compact_interval - time.monotonic())
+                saved_game_data: list = []  # initial value
+                try:
+                    saved_game_data.append(self.__pending.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+
+                # Saved game data handed over while the last records were written is synced together.
+                while not self.__pending.empty():
+                    saved_game_data.append(self.__pending.get())
+
+                stopping = None in saved_game_data
+                records: list = []  # initial value
+                for game_data in saved_game_data:
+                    record: bytes or None = self.__encode_changes(game_data) if game_data is not None else None
+                    if record is not None:
+                        root_key = self.apply_record(entries, record)
+                        records.append(record)
+                self.__encoded.set()
+
+                if journal is None or num_journal_records + len(records) >= self.compact_records or \
+                        time.monotonic() - last_compaction_time >= self.compact_interval:
+                    # The first records of a game are compacted right away, so every journal has a snapshot.
+                    if len(entries) == 0:
+                        continue
+
+                    generation += 1
+                    snapshot: bytes = zlib.compress(self.encode_record(root_key, entries, []), self.COMPRESSION_LEVEL)
+                    write_file_atomically(self.file_name + AUTOSAVE_SNAPSHOT_SUFFIX,
+                                          self.SNAPSHOT_HEADER.pack(AUTOSAVE_FILE_MAGIC, SAVE_FORMAT_VERSION,
+                                                                    generation, zlib.crc32(snapshot)) + snapshot)
+                    if journal is not None:
+                        journal.close()
+
+                    journal = open(self.file_name + AUTOSAVE_JOURNAL_SUFFIX, "wb")
+                    journal.write(self.JOURNAL_HEADER.pack(AUTOSAVE_FILE_MAGIC, SAVE_FORMAT_VERSION, generation))
+                    sync_directory(os.path.dirname(self.file_name))
+                    num_journal_records = 0
+                    last_compaction_time = time.monotonic()
+                elif len(records) > 0:
+                    for record in records:
+                        record = zlib.compress(record, self.COMPRESSION_LEVEL)
+                        journal.write(self.RECORD_HEADER.pack(len(record), zlib.crc32(record)) + record)
+                    num_journal_records += len(records)
+                else:
+                    continue
+
+                journal.flush()
+                os.fsync(journal.fileno())
+        except Exception as e:
+            self.error = e
+        finally:
+            self.__encoded.set()
+            if journal is not None:
+                journal.close()
+
+
+###########################################
+# GENERAL
+###########################################
+
+
+###########################################
+# GEMINI AI
+###########################################
+
+
+class LLMResponse:
+    """
+    This class contains attributes of a response generated by Gemini AI (or served from a cache).
+    """
+
+    def __init__(self, text, prompt_token_count=0, response_token_count=0, is_fallback=False):
+        # type: (str, int, int, bool) -> None
+        self.text: str = text
+        self.prompt_token_count: int = prompt_token_count  # 0 if unknown
+        self.response_token_count: int = response_token_count  # 0 if unknown
+        self.is_fallback: bool = is_fallback  # generated locally because Gemini AI was unavailable
+        self.num_retries: int = 0  # initial value
+        self.cache_status: str or None = None  # "HIT", "MISS", "BYPASS", or None if not looked up
+
+    def __str__(self):
+        # type: () -> str
+        res: str = str(type(self).__name__) + "("  # initial value
+        index: int = 0  # initial value
+        for item in vars(self).items():
+            res += str(item[0]) + "=" + str(item[1])
+
+            if index < len(vars(self).items()) - 1:
+                res += ", "
+
+            index += 1
+
+        return res + ")"
+
+    def clone(self):
+        # type: () -> LLMResponse
+        return copy.deepcopy(self)
+
+
+class LLMResponseCache:
+    """
+    This class contains attributes of a persistent on-disk cache of Gemini responses, backed by SQLite.
+    Responses are keyed on the prompt together with the generation config. Up to 'variants_per_key'
+    different responses are kept per key so that repeated prompts still get some variety.
+    """
+
+    def __init__(self, file_name, variants_per_key=LLM_CACHE_VARIANTS_PER_KEY, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 time_to_live=LLM_CACHE_TIME_TO_LIVE, offline=False):
+        # type: (str, int, int, float, bool) -> None
+        self.file_name: str = file_name
+        self.variants_per_key: int = variants_per_key
+        self.max_entries: int = max_entries
+        self.time_to_live: float = time_to_live  # in seconds
+        self.offline: bool = offline  # serve any cached variant instead of generating new ones
+        self.hits: int = 0  # initial value
+        self.misses: int = 0  # initial value
+        self.__lock: threading.Lock = threading.Lock()
+        self.__connection: sqlite3.Connection = sqlite3.connect(file_name, check_same_thread=False)
+        with self.__lock:
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS responses (cache_key TEXT NOT NULL, "
+                                      "variant INTEGER NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL, "
+                                      "last_accessed REAL NOT NULL, PRIMARY KEY (cache_key, variant))")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS responses_last_accessed ON "
+                                      "responses (last_accessed)")
+            self.__connection.commit()
+
+    @staticmethod
+    def get_cache_key(prompt, generation_config):
+        # type: (str, dict) -> str
+        return hashlib.sha256(json.dumps([prompt, generation_config], sort_keys=True,
+                                         default=str).encode("utf-8")).hexdigest()
+
+    def get(self, prompt, generation_config):
+        # type: (str, dict) -> str or None
+        """
+        Looking up a cached response for 'prompt'. While fewer than 'variants_per_key' responses are cached
+        for the prompt, this counts as a miss so that a new variant gets generated.
+        :return: a cached response or None
+        """
+
+        cache_key: str = self.get_cache_key(prompt, generation_config)
+        now: float = time.time()
+        with self.__lock:
+            self.__connection.execute("DELETE FROM responses WHERE cache_key = ? AND created_at < ?",
+                                      (cache_key, now - self.time_to_live))
+            rows: list = self.__connection.execute("SELECT variant, response FROM responses WHERE cache_key = ? "
+                                                   "ORDER BY variant", (cache_key,)).fetchall()
+            if len(rows) == 0 or (len(rows) < self.variants_per_key and not self.offline):
+                self.__connection.commit()
+                self.misses += 1
+                return None
+
+            variant, response = get_random_stream("cache").choice(rows)
+            self.__connection.execute("UPDATE responses SET last_accessed = ? WHERE cache_key = ? AND variant = ?",
+                                      (now, cache_key, variant))
+            self.__connection.commit()
+            self.hits += 1
+            return response
+
+    def put(self, prompt, generation_config, response):
+        # type: (str, dict, str) -> None
+        cache_key: str = self.get_cache_key(prompt, generation_config)
+        now: float = time.time()
+        with self.__lock:
+            num_variants: int = self.__connection.execute("SELECT COUNT(*) FROM responses WHERE cache_key = ?",
+                                                          (cache_key,)).fetchone()[0]
+            if num_variants >= self.variants_per_key:
+                # Replacing the least recently used variant
+                self.__connection.execute("DELETE FROM responses WHERE cache_key = ? AND variant = (SELECT variant "
+                                          "FROM responses WHERE cache_key = ? ORDER BY last_accessed LIMIT 1)",
+                                          (cache_key, cache_key))
+
+            next_variant: int = self.__connection.execute("SELECT COALESCE(MAX(variant) + 1, 0) FROM responses "
+                                                          "WHERE cache_key = ?", (cache_key,)).fetchone()[0]
+            self.__connection.execute("INSERT INTO responses VALUES (?, ?, ?, ?, ?)",
+                                      (cache_key, next_variant, response, now, now))
+            self.__evict(now)
+            self.__connection.commit()
+
+    def __evict(self, now):
+        # type: (float) -> None
+        self.__connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.time_to_live,))
+        self.__connection.execute("DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY "
+                                  "last_accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def get_stats(self):
+        # type: () -> dict
+        with self.__lock:
+            num_entries: int = self.__connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        num_lookups: int = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / num_lookups if num_lookups > 0 else 0.0,
+            "entries": num_entries
+        }
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            self.__connection.close()
+
+    def __str__(self):
+        # type: () -> str
+        stats: dict = self.get_stats()
+        return "LLM response cache: " + str(stats["hits"]) + " hits, " + str(stats["misses"]) + " misses (" + \
+            str(round(100 * stats["hit_rate"], 1)) + "% hit rate), " + str(stats["entries"]) + " entries"
+
+
+class LLMChatSession:
+    """
+    This class contains attributes of a chat session with a large language model. Every LLM backend hands out
+    chat sessions with this interface.
+    """
+
+    def __init__(self, history=None):
+        # type: (list or None) -> None
+        self.history: list = history if history is not None else []
+        self.last: LLMResponse or None = None  # initial value
+
+    def send_message(self, prompt):
+        # type: (str) -> LLMResponse
+        raise NotImplementedError
+
+    async def send_message_async(self, prompt):
+        # type: (str) -> LLMResponse
+        raise NotImplementedError
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        raise NotImplementedError
+
+
+class LLMBackend:
+    """
+    This class contains attributes of a backend serving a large language model.
+    """
+
+    def __init__(self, generation_config):
+        # type: (dict) -> None
+        self.generation_config: dict = generation_config
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> LLMChatSession
+        raise NotImplementedError
+
+    def generate_content(self, prompt):
+        # type: (str) -> LLMResponse
+        return self.start_chat().send_message(prompt)
+
+    async def generate_content_async(self, prompt):
+        # type: (str) -> LLMResponse
+        return await self.start_chat().send_message_async(prompt)
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        return sum(TokenBucketRateLimiter.estimate_num_tokens(get_content_text(content)) for content in contents)
+
+    def close(self):
+        # type: () -> None
+        pass  # nothing to release by default
+
+
+class GeminiChatSession(LLMChatSession):
+    """
+    This class contains attributes of a chat session with Gemini AI.
+    """
+
+    def __init__(self, convo):
+        # type: (gemini.ChatSession) -> None
+        self.__convo: gemini.ChatSession = convo
+        self.last: LLMResponse or None = None  # initial value
+
+    @property
+    def history(self):
+        # type: () -> list
+        return self.__convo.history
+
+    @staticmethod
+    def to_llm_response(response):
+        # type: (gemini.types.GenerateContentResponse) -> LLMResponse
+        usage_metadata = getattr(response, "usage_metadata", None)
+        if usage_metadata is None:
+            return LLMResponse(str(response.text))
+        return LLMResponse(str(response.text), usage_metadata.prompt_token_count,
+                           usage_metadata.candidates_token_count)
+
+    def send_message(self, prompt):
+        # type: (str) -> LLMResponse
+        self.last = self.to_llm_response(self.__convo.send_message(prompt))
+        return self.last
+
+    async def send_message_async(self, prompt):
+        # type: (str) -> LLMResponse
+        self.last = self.to_llm_response(await self.__convo.send_message_async(prompt))
+        return self.last
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        response = self.__convo.send_message(prompt, stream=True)
+        for chunk in response:
+            if len(chunk.parts) > 0:
+                yield chunk.text
+
+        self.last = self.to_llm_response(response)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    This class contains attributes of the Gemini AI backend.
+    """
+
+    def __init__(self, generation_config, safety_settings, model_name=GEMINI_MODEL_NAME):
+        # type: (dict, list, str) -> None
+        LLMBackend.__init__(self, generation_config)
+        self.model_name: str = model_name
+        self.__model: gemini.GenerativeModel = gemini.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config,
+            safety_settings=safety_settings
+        )
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> GeminiChatSession
+        return GeminiChatSession(self.__model.start_chat(history=history if history is not None else []))
+
+    def generate_content(self, prompt):
+        # type: (str) -> LLMResponse
+        return GeminiChatSession.to_llm_response(self.__model.generate_content(prompt))
+
+    async def generate_content_async(self, prompt):
+        # type: (str) -> LLMResponse
+        return GeminiChatSession.to_llm_response(await self.__model.generate_content_async(prompt))
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        return self.__model.count_tokens(contents).total_tokens
+
+
+class FakeChatSession(LLMChatSession):
+    """
+    This class contains attributes of a chat session with a FakeBackend.
+    """
+
+    def __init__(self, backend, history=None):
+        # type: (FakeBackend, list or None) -> None
+        LLMChatSession.__init__(self, list(history) if history is not None else [])
+        self.backend: FakeBackend = backend
+
+    def __finish(self, prompt, response):
+        # type: (str, LLMResponse) -> LLMResponse
+        self.history.append({"role": "user", "parts": [prompt]})
+        self.history.append({"role": "model", "parts": [response.text]})
+        self.last = response
+        return response
+
+    def send_message(self, prompt):
+        # type: (str) -> LLMResponse
+        self.backend.simulate_failure()
+        response, latency = self.backend.generate(self.history, prompt)
+        time.sleep(latency)
+        return self.__finish(prompt, response)
+
+    async def send_message_async(self, prompt):
+        # type: (str) -> LLMResponse
+        self.backend.simulate_failure()
+        response, latency = self.backend.generate(self.history, prompt)
+        await asyncio.sleep(latency)
+        return self.__finish(prompt, response)
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        self.backend.simulate_failure()
+        response, latency = self.backend.generate(self.history, prompt)
+        chunks: list = split_into_chunks(response.text, self.backend.num_chunks)
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+        self.__finish(prompt, response)
+
+
+class FakeBackend(LLMBackend):
+    """
+    This class contains attributes of an in-process stand-in for Gemini AI. Responses and latencies are
+    drawn from configurable distributions, deterministically for the same seed, chat history, and prompt.
+    In JSON mode, prompts asking for a number of names are answered with a JSON array of that many names.
+    A fraction 'failure_rate' of the requests fails with a ConnectionError.
+    """
+
+    SYLLABLES: list = ["ka", "ra", "zo", "mi", "lu", "ther", "von", "el", "dra", "sy", "qu", "an", "or", "is", "gal"]
+
+    def __init__(self, generation_config=None, seed=0, min_latency=0.0, max_latency=0.0, min_words=1,
+                 max_words=12, num_chunks=4, failure_rate=0.0):
+        # type: (dict or None, int, float, float, int, int, int, float) -> None
+        LLMBackend.__init__(self, generation_config if generation_config is not None else {})
+        self.seed: int = seed
+        self.min_latency: float = min_latency  # in seconds
+        self.max_latency: float = max_latency  # in seconds
+        self.min_words: int = min_words
+        self.max_words: int = max_words
+        self.num_chunks: int = num_chunks  # number of chunks streamed responses are split into
+        self.failure_rate: float = failure_rate
+        self.__failure_rng: random.Random = random.Random(seed)
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> FakeChatSession
+        return FakeChatSession(self, history)
+
+    def generate_content(self, prompt):
+        # type: (str) -> LLMResponse
+        self.simulate_failure()
+        response, latency = self.generate([], prompt)
+        time.sleep(latency)
+        return response
+
+    async def generate_content_async(self, prompt):
+        # type: (str) -> LLMResponse
+        self.simulate_failure()
+        response, latency = self.generate([], prompt)
+        await asyncio.sleep(latency)
+        return response
+
+    def simulate_failure(self):
+        # type: () -> None
+        if self.failure_rate > 0 and self.__failure_rng.random() < self.failure_rate:
+            raise ConnectionError("Simulated LLM backend failure")
+
+    def generate_word(self, rng):
+        # type: (random.Random) -> str
+        return "".join(rng.choice(self.SYLLABLES) for i in range(rng.randint(2, 4))).capitalize()
+
+    def generate_words(self, rng, min_words, max_words):
+        # type: (random.Random, int, int) -> str
+        return " ".join(self.generate_word(rng) for i in range(rng.randint(min_words, max_words)))
+
+    def generate_text(self, history, prompt, generation_config=None):
+        # type: (list, str, dict or None) -> tuple
+        """
+        Generating the response to 'prompt' after the chat history 'history'.
+        :return: a tuple of the response text and the latency (in seconds) to simulate
+        """
+
+        generation_config = generation_config if generation_config is not None else self.generation_config
+        rng: random.Random = random.Random(json.dumps([self.seed, len(history), prompt, generation_config],
+                                                      sort_keys=True, default=str))
+        latency: float = rng.uniform(self.min_latency, self.max_latency)
+        if generation_config.get("response_mime_type") == "application/json":
+            num_names_match = re.search(r"(\d+) different", prompt)
+            num_names: int = int(num_names_match.group(1)) if num_names_match is not None else 1
+            keys_match = re.search(r"objects with the keys (.+?)\.", prompt)
+            if keys_match is not None:
+                # Structured responses: the first key gets a short value and the others get a sentence.
+                keys: list = re.findall(r"\"(\w+)\"", keys_match.group(1))
+                return json.dumps([{key: self.generate_words(rng, 1, 3) if index == 0 else
+                                    self.generate_words(rng, self.min_words, self.max_words)
+                                    for index, key in enumerate(keys)} for i in range(num_names)]), latency
+
+            return json.dumps([self.generate_word(rng) for i in range(num_names)]), latency
+
+        return self.generate_words(rng, self.min_words, self.max_words), latency
+
+    def generate(self, history, prompt):
+        # type: (list, str) -> tuple
+        text, latency = self.generate_text(history, prompt)
+        prompt_token_count: int = self.count_tokens(history + [{"role": "user", "parts": [prompt]}])
+        return LLMResponse(text, prompt_token_count, TokenBucketRateLimiter.estimate_num_tokens(text)), latency
+
+
+class HTTPChatSession(LLMChatSession):
+    """
+    This class contains attributes of a chat session with an HTTPBackend. The chat history is kept on the
+    client and sent along with every message.
+    """
+
+    def __init__(self, backend, history=None):
+        # type: (HTTPBackend, list or None) -> None
+        LLMChatSession.__init__(self, list(history) if history is not None else [])
+        self.backend: HTTPBackend = backend
+
+    def __finish(self, prompt, response):
+        # type: (str, LLMResponse) -> LLMResponse
+        self.history.append({"role": "user", "parts": [prompt]})
+        self.history.append({"role": "model", "parts": [response.text]})
+        self.last = response
+        return response
+
+    def __get_payload(self, prompt):
+        # type: (str) -> dict
+        return {"history": self.history, "prompt": prompt, "generation_config": self.backend.generation_config}
+
+    def send_message(self, prompt):
+        # type: (str) -> LLMResponse
+        data: dict = self.backend.post("/generate", self.__get_payload(prompt))
+        return self.__finish(prompt, LLMResponse(data["text"], data["prompt_token_count"],
+                                                 data["response_token_count"]))
+
+    async def send_message_async(self, prompt):
+        # type: (str) -> LLMResponse
+        return await asyncio.get_event_loop().run_in_executor(None, self.send_message, prompt)
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        texts: list = []  # initial value
+        data: dict = {}  # initial value
+        for data in self.backend.post_stream("/generate_stream", self.__get_payload(prompt)):
+            if "chunk" in data:
+                texts.append(data["chunk"])
+                yield data["chunk"]
+
+        self.__finish(prompt, LLMResponse("".join(texts), data.get("prompt_token_count", 0),
+                                          data.get("response_token_count", 0)))
+
+
+class HTTPBackend(LLMBackend):
+    """
+    This class contains attributes of a backend talking to an LLM stand-in server over HTTP. Connections are
+    kept alive and reused for later requests.
+    """
+
+    def __init__(self, base_url, generation_config, timeout=60.0, max_idle_connections=HTTP_MAX_IDLE_CONNECTIONS):
+        # type: (str, dict, float, int) -> None
+        LLMBackend.__init__(self, generation_config)
+        self.base_url: str = base_url
+        self.timeout: float = timeout  # in seconds
+        self.max_idle_connections: int = max_idle_connections
+        self.__idle_connections: list = []  # initial value
+        self.__lock: threading.Lock = threading.Lock()
+        parsed_url = urlparse(base_url)
+        self.host: str = parsed_url.hostname
+        self.port: int = parsed_url.port if parsed_url.port is not None else 80
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> HTTPChatSession
+        return HTTPChatSession(self, history)
+
+    def __acquire_connection(self):
+        # type: () -> tuple
+        with self.__lock:
+            if len(self.__idle_connections) > 0:
+                return self.__idle_connections.pop(), True
+
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def __release_connection(self, connection):
+        # type: (http.client.HTTPConnection) -> None
+        with self.__lock:
+            if len(self.__idle_connections) < self.max_idle_connections:
+                self.__idle_connections.append(connection)
+                return
+
+        connection.close()
+
+    def __send_request(self, path, payload):
+        # type: (str, dict) -> tuple
+        body: bytes = json.dumps(payload).encode("utf-8")
+        while True:
+            connection, reused = self.__acquire_connection()
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response: http.client.HTTPResponse = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if not reused:
+                    raise
+                # The server has closed the idle connection, so the request is sent again on another one.
+            except Exception:
+                connection.close()
+                raise
+
+        if response.status != 200:
+            response.read()
+            connection.close()
+            raise ConnectionError("LLM stand-in server answered " + str(response.status) + " " +
+                                  str(response.reason) + " for " + str(path))
+        return connection, response
+
+    def post(self, path, payload):
+        # type: (str, dict) -> dict
+        connection, response = self.__send_request(path, payload)
+        try:
+            body: bytes = response.read()
+        except Exception:
+            connection.close()
+            raise
+
+        self.__release_connection(connection)
+        return json.loads(body.decode("utf-8"))
+
+    def post_stream(self, path, payload):
+        # type: (str, dict) -> typing.Iterator[dict]
+        connection, response = self.__send_request(path, payload)
+        try:
+            for line in response:
+                if line.strip() != b"":
+                    yield json.loads(line.decode("utf-8"))
+        except BaseException:
+            connection.close()  # the rest of the response is never read
+            raise
+
+        self.__release_connection(connection)
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        return self.post("/count_tokens", {"contents": contents})["total_tokens"]
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            for connection in self.__idle_connections:
+                connection.close()
+
+            self.__idle_connections = []
+
+
+class LLMStandInRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class contains attributes of a handler of requests to an LLMStandInServer.
+    """
+
+    protocol_version: str = "HTTP/1.1"
+
+    def do_POST(self):
+        # type: () -> None
+        payload: dict = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+        backend: FakeBackend = self.server.fake_backend
+        if self.path == "/count_tokens":
+            self.__send_json({"total_tokens": backend.count_tokens(payload["contents"])})
+            return
+
+        if self.path not in ["/generate", "/generate_stream"]:
+            self.send_error(404)
+            return
+
+        try:
+            backend.simulate_failure()
+        except ConnectionError:
+            self.send_error(503)
+            return
+
+        history: list = payload.get("history", [])
+        text, latency = backend.generate_text(history, payload["prompt"], payload.get("generation_config"))
+        prompt_token_count: int = backend.count_tokens(history + [{"role": "user", "parts": [payload["prompt"]]}])
+        response_token_count: int = TokenBucketRateLimiter.estimate_num_tokens(text)
+        if self.path == "/generate":
+            time.sleep(latency)
+            self.__send_json({"text": text, "prompt_token_count": prompt_token_count,
+                              "response_token_count": response_token_count})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks: list = split_into_chunks(text, backend.num_chunks)
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            self.__write_chunk({"chunk": chunk})
+
+        self.__write_chunk({"prompt_token_count": prompt_token_count, "response_token_count": response_token_count})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def __send_json(self, data):
+        # type: (dict) -> None
+        body: bytes = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __write_chunk(self, data):
+        # type: (dict) -> None
+        line: bytes = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(("%x\r\n" % len(line)).encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        # type: (str, object) -> None
+        pass  # keep the terminal quiet
+
+
+class LLMStandInServer(ThreadingHTTPServer):
+    """
+    This class contains attributes of a local HTTP server standing in for Gemini AI, answering with a FakeBackend.
+    """
+
+    daemon_threads: bool = True
+
+    def __init__(self, host, port, fake_backend):
+        # type: (str, int, FakeBackend) -> None
+        ThreadingHTTPServer.__init__(self, (host, port), LLMStandInRequestHandler)
+        self.fake_backend: FakeBackend = fake_backend
+
+
+class TokenBucketRateLimiter:
+    """
+    This class contains attributes of a token bucket rate limiter shared by all calls to Gemini AI.
+    Both the number of requests and the number of tokens per minute are limited, and a semaphore
+    limits how many requests are in flight at the same time. Callers only wait as long as the quota requires.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_REQUESTS_PER_MINUTE, tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+                 max_concurrent_requests=GEMINI_MAX_CONCURRENT_REQUESTS):
+        # type: (float, float, int) -> None
+        self.requests_per_minute: float = requests_per_minute
+        self.tokens_per_minute: float = tokens_per_minute
+        self.max_concurrent_requests: int = max_concurrent_requests
+        self.__available_requests: float = requests_per_minute
+        self.__available_tokens: float = tokens_per_minute
+        self.__last_refill_time: float = time.monotonic()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__semaphore: threading.BoundedSemaphore = threading.BoundedSemaphore(max_concurrent_requests)
+
+    @staticmethod
+    def estimate_num_tokens(text):
+        # type: (str) -> int
+        return len(text) // 4 + 1  # roughly four characters per token
+
+    def __refill(self):
+        # type: () -> None
+        now: float = time.monotonic()
+        elapsed_minutes: float = (now - self.__last_refill_time) / 60
+        self.__last_refill_time = now
+        self.__available_requests = min(self.requests_per_minute,
+                                        self.__available_requests + elapsed_minutes * self.requests_per_minute)
+        self.__available_tokens = min(self.tokens_per_minute,
+                                      self.__available_tokens + elapsed_minutes * self.tokens_per_minute)
+
+    def __try_consume(self, num_tokens):
+        # type: (int) -> float
+        """
+        Consuming one request and 'num_tokens' tokens from the buckets if they are available.
+        :return: 0 if consumed, otherwise the number of seconds to wait before trying again
+        """
+
+        num_tokens = min(num_tokens, self.tokens_per_minute)
+        with self.__lock:
+            self.__refill()
+            if self.__available_requests >= 1 and self.__available_tokens >= num_tokens:
+                self.__available_requests -= 1
+                self.__available_tokens -= num_tokens
+                return 0
+
+            missing_requests: float = max(0.0, 1 - self.__available_requests)
+            missing_tokens: float = max(0.0, num_tokens - self.__available_tokens)
+            return max(60 * missing_requests / self.requests_per_minute,
+                       60 * missing_tokens / self.tokens_per_minute)
+
+    def acquire(self, num_tokens):
+        # type: (int) -> None
+        wait_time: float = self.__try_consume(num_tokens)
+        while wait_time > 0:
+            time.sleep(wait_time)
+            wait_time = self.__try_consume(num_tokens)
+
+        self.__semaphore.acquire()
+
+    async def acquire_async(self, num_tokens):
+        # type: (int) -> None
+        wait_time: float = self.__try_consume(num_tokens)
+        while wait_time > 0:
+            await asyncio.sleep(wait_time)
+            wait_time = self.__try_consume(num_tokens)
+
+        if self.__semaphore.acquire(blocking=False):
+            return
+
+        # The semaphore is shared with callers on other threads, so waiting for a slot is handed to the executor.
+        acquired: asyncio.Future = asyncio.get_running_loop().run_in_executor(None, self.__semaphore.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # Giving the slot back once the executor got it, as no one is left to release it
+            acquired.add_done_callback(lambda future: self.__semaphore.release())
+            raise
+
+    def release(self, num_tokens_estimated=0, num_tokens_used=0):
+        # type: (int, int) -> None
+        """
+        Releasing a concurrency slot. The difference between the tokens actually used and the tokens
+        estimated when acquiring is charged to (or refunded to) the token bucket.
+        :return: None
+        """
+
+        with self.__lock:
+            self.__available_tokens -= num_tokens_used - num_tokens_estimated
+
+        self.__semaphore.release()
+
+    def __str__(self):
+        # type: () -> str
+        return str(type(self).__name__) + "(requests_per_minute=" + str(self.requests_per_minute) + \
+            ", tokens_per_minute=" + str(self.tokens_per_minute) + ", max_concurrent_requests=" + \
+            str(self.max_concurrent_requests) + ")"
+
+
+class RateLimitedChatSession:
+    """
+    This class contains attributes of a chat session with a large language model whose messages go through a
+    TokenBucketRateLimiter.
+    """
+
+    def __init__(self, convo, model):
+        # type: (LLMChatSession, RateLimitedGenerativeModel) -> None
+        self.__convo: LLMChatSession = convo
+        self.__model: RateLimitedGenerativeModel = model
+        self.last: LLMResponse or None = None  # initial value
+
+    @property
+    def history(self):
+        # type: () -> list
+        return self.__convo.history
+
+    def send_message(self, prompt, timeout=None):
+        # type: (str, float or None) -> LLMResponse
+        self.last = self.__model.call(partial(self.__convo.send_message, prompt), prompt, timeout)
+        return self.last
+
+    async def send_message_async(self, prompt, timeout=None):
+        # type: (str, float or None) -> LLMResponse
+        self.last = await self.__model.call_async(partial(self.__convo.send_message_async, prompt), prompt, timeout)
+        return self.last
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        """
+        Sending a message and yielding the text of the response chunk by chunk as it is generated.
+        The concurrency slot is held until the whole response has been streamed.
+        :return: an iterator of text chunks
+        """
+
+        rate_limiter: TokenBucketRateLimiter = self.__model.rate_limiter
+        num_tokens: int = TokenBucketRateLimiter.estimate_num_tokens(prompt)
+        num_tokens_used: int = num_tokens  # initial value
+        rate_limiter.acquire(num_tokens)
+        try:
+            yield from self.__convo.send_message_stream(prompt)
+            self.last = self.__convo.last
+            num_tokens_used = RateLimitedGenerativeModel.count_tokens_used(prompt, self.last)
+        finally:
+            rate_limiter.release(num_tokens, num_tokens_used)
+
+
+class RateLimitedGenerativeModel(LLMBackend):
+    """
+    This class contains attributes of a large language model whose calls are rate limited. A call given a timeout
+    only waits that long for the request itself, once the rate limiter allowed it.
+    """
+
+    def __init__(self, model, rate_limiter):
+        # type: (LLMBackend, TokenBucketRateLimiter) -> None
+        LLMBackend.__init__(self, model.generation_config)
+        self.__model: LLMBackend = model
+        self.rate_limiter: TokenBucketRateLimiter = rate_limiter
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(rate_limiter.max_concurrent_requests,
+                                                                  thread_name_prefix="llm-request")
+
+    @staticmethod
+    def count_tokens_used(prompt, response):
+        # type: (str, LLMResponse) -> int
+        if response.prompt_token_count + response.response_token_count > 0:
+            return response.prompt_token_count + response.response_token_count
+        return TokenBucketRateLimiter.estimate_num_tokens(prompt + str(response.text))
+
+    def send_with_deadline(self, send, timeout):
+        # type: (typing.Callable[[], LLMResponse], float or None) -> LLMResponse
+        """
+        Calling 'send' on a request thread and waiting at most 'timeout' seconds (if given) for the response.
+        A request missing its deadline keeps its request thread until it ends, but its response is ignored.
+        :return: the response
+        """
+
+        if timeout is None:
+            return send()
+
+        future: Future = self.__executor.submit(send)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()  # in case all the request threads are still busy with requests which missed theirs
+            raise
+
+    def call(self, send, prompt, timeout=None):
+        # type: (typing.Callable[[], LLMResponse], str, float or None) -> LLMResponse
+        """
+        Calling 'send' (which sends 'prompt') once the rate limiter allows it, waiting at most 'timeout' seconds
+        (if given) for the response. A request missing its deadline gives its concurrency slot back at once.
+        :return: the response
+        """
+
+        num_tokens: int = TokenBucketRateLimiter.estimate_num_tokens(prompt)
+        self.rate_limiter.acquire(num_tokens)
+        try:
+            response: LLMResponse = self.send_with_deadline(send, timeout)
+        except Exception:
+            self.rate_limiter.release(num_tokens, 0)  # refunding the tokens of the failed request
+            raise
+
+        self.rate_limiter.release(num_tokens, self.count_tokens_used(prompt, response))
+        return response
+
+    async def call_async(self, send_async, prompt, timeout=None):
+        # type: (typing.Callable[[], typing.Awaitable[LLMResponse]], str, float or None) -> LLMResponse
+        num_tokens: int = TokenBucketRateLimiter.estimate_num_tokens(prompt)
+        await self.rate_limiter.acquire_async(num_tokens)
+        try:
+            response: LLMResponse = await asyncio.wait_for(send_async(), timeout)
+        except Exception:
+            self.rate_limiter.release(num_tokens, 0)  # refunding the tokens of the failed request
+            raise
+
+        self.rate_limiter.release(num_tokens, self.count_tokens_used(prompt, response))
+        return response
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> RateLimitedChatSession
+        return RateLimitedChatSession(self.__model.start_chat(history=history), self)
+
+    def generate_content(self, prompt, timeout=None):
+        # type: (str, float or None) -> LLMResponse
+        return self.call(partial(self.__model.generate_content, prompt), prompt, timeout)
+
+    async def generate_content_async(self, prompt, timeout=None):
+        # type: (str, float or None) -> LLMResponse
+        return await self.call_async(partial(self.__model.generate_content_async, prompt), prompt, timeout)
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        return self.__model.count_tokens(contents)
+
+    def close(self):
+        # type: () -> None
+        self.__executor.shutdown(wait=False)
+        self.__model.close()
+
+
+class LLMUnavailableError(Exception):
+    """
+    This class contains attributes of the error raised when Gemini AI cannot be reached and no fallback
+    response makes sense (e.g. for streamed NPC dialogue).
+    """
+
+
+class CircuitBreaker:
+    """
+    This class contains attributes of a circuit breaker shared by all calls to Gemini AI. After
+    'failure_threshold' consecutive failures the circuit opens and calls are not sent at all. After
+    'reset_timeout' seconds a single trial call is let through, which closes the circuit again if it succeeds.
+    """
+
+    CLOSED: str = "CLOSED"
+    OPEN: str = "OPEN"
+    HALF_OPEN: str = "HALF OPEN"
+
+    def __init__(self, failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_BREAKER_RESET_TIMEOUT):
+        # type: (int, float) -> None
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout  # in seconds
+        self.state: str = self.CLOSED
+        self.consecutive_failures: int = 0  # initial value
+        self.times_opened: int = 0  # initial value
+        self.__opened_at: float = 0.0  # initial value
+        self.__trial_in_progress: bool = False  # initial value
+        self.__lock: threading.Lock = threading.Lock()
+
+    def allow_request(self):
+        # type: () -> bool
+        with self.__lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.__opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.__trial_in_progress = False
+
+            if self.state == self.HALF_OPEN and not self.__trial_in_progress:
+                self.__trial_in_progress = True
+                return True
+
+            return False
+
+    def record_success(self):
+        # type: () -> None
+        with self.__lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.__trial_in_progress = False
+
+    def record_failure(self):
+        # type: () -> None
+        with self.__lock:
+            self.consecutive_failures += 1
+            self.__trial_in_progress = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and
+                                                self.consecutive_failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.__opened_at = time.monotonic()
+                self.times_opened += 1
+
+    def __str__(self):
+        # type: () -> str
+        return str(type(self).__name__) + "(state=" + str(self.state) + ", consecutive_failures=" + \
+            str(self.consecutive_failures) + ", times_opened=" + str(self.times_opened) + ")"
+
+
+class ResilientChatSession:
+    """
+    This class contains attributes of a chat session with a large language model whose messages are retried
+    by a ResilientGenerativeModel.
+    """
+
+    def __init__(self, convo, model):
+        # type: (RateLimitedChatSession, ResilientGenerativeModel) -> None
+        self.__convo: RateLimitedChatSession = convo
+        self.__model: ResilientGenerativeModel = model
+        self.last: LLMResponse or None = None  # initial value
+
+    @property
+    def history(self):
+        # type: () -> list
+        return self.__convo.history
+
+    def send_message(self, prompt):
+        # type: (str) -> LLMResponse
+        self.last = self.__model.call(partial(self.__convo.send_message, prompt))
+        return self.last
+
+    async def send_message_async(self, prompt):
+        # type: (str) -> LLMResponse
+        self.last = await self.__model.call_async(partial(self.__convo.send_message_async, prompt))
+        return self.last
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        """
+        Sending a message and yielding the text of the response as it is generated. Only failures before
+        the first chunk are retried, and LLMUnavailableError is raised if no complete response can be streamed.
+        :return: an iterator of text chunks
+        """
+
+        circuit_breaker: CircuitBreaker = self.__model.circuit_breaker
+        start_time: float = time.monotonic()
+        attempt: int = 0  # initial value
+        while circuit_breaker.allow_request():
+            chunk_yielded: bool = False  # initial value
+            try:
+                for text in self.__convo.send_message_stream(prompt):
+                    chunk_yielded = True
+                    yield text
+            except TRANSIENT_LLM_ERRORS as e:
+                circuit_breaker.record_failure()
+                attempt += 1
+                backoff_time: float = self.__model.get_backoff_time(attempt)
+                if chunk_yielded or not self.__model.should_retry(attempt, start_time, backoff_time):
+                    raise LLMUnavailableError("Gemini AI is unavailable") from e
+
+                time.sleep(backoff_time)
+                continue
+            except Exception:
+                circuit_breaker.record_success()
+                raise
+
+            circuit_breaker.record_success()
+            self.last = self.__convo.last
+            self.last.num_retries = attempt
+            return
+
+        raise LLMUnavailableError("Gemini AI is unavailable")
+
+
+class ResilientGenerativeModel(LLMBackend):
+    """
+    This class contains attributes of a large language model whose calls are retried with jittered exponential
+    backoff when they fail transiently or miss their deadline. The deadline only covers the request itself, not
+    waiting for the rate limiter. While the circuit breaker is open, or once the time budget of a call is spent, a
+    randomly generated name is returned instead.
+    """
+
+    def __init__(self, model, circuit_breaker, deadline=LLM_CALL_DEADLINE, time_budget=LLM_CALL_TIME_BUDGET,
+                 max_retries=LLM_MAX_RETRIES):
+        # type: (RateLimitedGenerativeModel, CircuitBreaker, float, float, int) -> None
+        LLMBackend.__init__(self, model.generation_config)
+        self.__model: RateLimitedGenerativeModel = model
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+        self.deadline: float = deadline  # in seconds
+        self.time_budget: float = time_budget  # in seconds
+        self.max_retries: int = max_retries
+
+    @staticmethod
+    def get_backoff_time(attempt):
+        # type: (int) -> float
+        return get_random_stream("backoff").uniform(0, min(LLM_BACKOFF_MAX_TIME,
+                                                           LLM_BACKOFF_BASE_TIME * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def fall_back(num_retries):
+        # type: (int) -> LLMResponse
+        response: LLMResponse = LLMResponse(generate_random_name(), is_fallback=True)
+        response.num_retries = num_retries
+        return response
+
+    def should_retry(self, attempt, start_time, backoff_time):
+        # type: (int, float, float) -> bool
+        return attempt <= self.max_retries and time.monotonic() - start_time + backoff_time < self.time_budget
+
+    def call(self, send):
+        # type: (typing.Callable[..., LLMResponse]) -> LLMResponse
+        """
+        Calling 'send' until it succeeds, passing the deadline of each attempt to it as 'timeout'.
+        :return: the response
+        """
+
+        start_time: float = time.monotonic()
+        attempt: int = 0  # initial value
+        while self.circuit_breaker.allow_request():
+            remaining_time: float = self.time_budget - (time.monotonic() - start_time)
+            try:
+                response: LLMResponse = send(timeout=min(self.deadline, remaining_time))
+            except TRANSIENT_LLM_ERRORS:
+                self.circuit_breaker.record_failure()
+                attempt += 1
+                backoff_time: float = self.get_backoff_time(attempt)
+                if not self.should_retry(attempt, start_time, backoff_time):
+                    break
+
+                time.sleep(backoff_time)
+                continue
+            except Exception:
+                self.circuit_breaker.record_success()  # Gemini AI answered, e.g. by blocking the prompt
+                raise
+
+            self.circuit_breaker.record_success()
+            response.num_retries = attempt
+            return response
+
+        return self.fall_back(attempt)
+
+    async def call_async(self, send_async):
+        # type: (typing.Callable[..., typing.Awaitable[LLMResponse]]) -> LLMResponse
+        start_time: float = time.monotonic()
+        attempt: int = 0  # initial value
+        while self.circuit_breaker.allow_request():
+            remaining_time: float = self.time_budget - (time.monotonic() - start_time)
+            try:
+                response: LLMResponse = await send_async(timeout=min(self.deadline, remaining_time))
+            except TRANSIENT_LLM_ERRORS:
+                self.circuit_breaker.record_failure()
+                attempt += 1
+                backoff_time: float = self.get_backoff_time(attempt)
+                if not self.should_retry(attempt, start_time, backoff_time):
+                    break
+
+                await asyncio.sleep(backoff_time)
+                continue
+            except Exception:
+                self.circuit_breaker.record_success()
+                raise
+
+            self.circuit_breaker.record_success()
+            response.num_retries = attempt
+            return response
+
+        return self.fall_back(attempt)
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> ResilientChatSession
+        return ResilientChatSession(self.__model.start_chat(history=history), self)
+
+    def generate_content(self, prompt):
+        # type: (str) -> LLMResponse
+        return self.call(partial(self.__model.generate_content, prompt))
+
+    async def generate_content_async(self, prompt):
+        # type: (str) -> LLMResponse
+        return await self.call_async(partial(self.__model.generate_content_async, prompt))
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        # Estimating the number of tokens locally if Gemini AI is unavailable
+        if self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            return LLMBackend.count_tokens(self, contents)
+
+        try:
+            return self.__model.count_tokens(contents)
+        except TRANSIENT_LLM_ERRORS:
+            return LLMBackend.count_tokens(self, contents)
+
+    def close(self):
+        # type: () -> None
+        self.__model.close()
+
+
+class CachedChatSession:
+    """
+    This class contains attributes of a chat session with a large language model whose responses go through
+    an LLMResponseCache first.
+    """
+
+    def __init__(self, convo, model):
+        # type: (ResilientChatSession, CachedGenerativeModel) -> None
+        self.__convo: ResilientChatSession = convo
+        self.__model: CachedGenerativeModel = model
+        self.last: LLMResponse or None = None  # initial value
+
+    @property
+    def history(self):
+        # type: () -> list
+        return self.__convo.history
+
+    def send_message(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        self.last = self.__model.call(partial(self.__convo.send_message, prompt), prompt, use_cache)
+        return self.last
+
+    async def send_message_async(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        self.last = await self.__model.call_async(partial(self.__convo.send_message_async, prompt), prompt,
+                                                  use_cache)
+        return self.last
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        """
+        Sending a message and yielding the text of the response as it is generated. Streamed responses
+        are never cached, so they cannot be generated offline.
+        :return: an iterator of text chunks
+        """
+
+        if self.__model.response_cache.offline:
+            raise LLMUnavailableError("Gemini AI is offline")
+
+        yield from self.__convo.send_message_stream(prompt)
+        self.last = self.__convo.last
+        self.last.cache_status = "BYPASS"
+
+
+class CachedGenerativeModel(LLMBackend):
+    """
+    This class contains attributes of a large language model whose responses are cached. While the response
+    cache is offline, prompts which are not cached never reach the model and get a fallback response instead.
+    """
+
+    def __init__(self, model, response_cache, generation_config):
+        # type: (ResilientGenerativeModel, LLMResponseCache, dict) -> None
+        LLMBackend.__init__(self, generation_config)
+        self.__model: ResilientGenerativeModel = model
+        self.response_cache: LLMResponseCache = response_cache
+
+    def __get_cached_response(self, prompt, use_cache):
+        # type: (str, bool) -> LLMResponse or None
+        cached_response: str or None = self.response_cache.get(prompt, self.generation_config) if use_cache \
+            else None
+        if cached_response is None:
+            return None
+
+        response: LLMResponse = LLMResponse(cached_response)
+        response.cache_status = "HIT"
+        return response
+
+    def __put_response(self, prompt, response, use_cache):
+        # type: (str, LLMResponse, bool) -> LLMResponse
+        response.cache_status = "MISS" if use_cache else "BYPASS"
+        if use_cache and not response.is_fallback:
+            self.response_cache.put(prompt, self.generation_config, response.text)
+
+        return response
+
+    def call(self, send, prompt, use_cache=True):
+        # type: (typing.Callable[[], LLMResponse], str, bool) -> LLMResponse
+        """
+        Looking up the response to 'prompt' in the cache, and calling 'send' (which sends 'prompt') if it is
+        not cached yet.
+        :return: the response
+        """
+
+        cached_response: LLMResponse or None = self.__get_cached_response(prompt, use_cache)
+        if cached_response is not None:
+            return cached_response
+
+        if self.response_cache.offline:
+            return self.__put_response(prompt, ResilientGenerativeModel.fall_back(0), use_cache)
+
+        return self.__put_response(prompt, send(), use_cache)
+
+    async def call_async(self, send_async, prompt, use_cache=True):
+        # type: (typing.Callable[[], typing.Awaitable[LLMResponse]], str, bool) -> LLMResponse
+        cached_response: LLMResponse or None = self.__get_cached_response(prompt, use_cache)
+        if cached_response is not None:
+            return cached_response
+
+        if self.response_cache.offline:
+            return self.__put_response(prompt, ResilientGenerativeModel.fall_back(0), use_cache)
+
+        return self.__put_response(prompt, await send_async(), use_cache)
+
+    def start_chat(self, history=None):
+        # type: (list or None) -> CachedChatSession
+        return CachedChatSession(self.__model.start_chat(history=history), self)
+
+    def generate_content(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        return self.call(partial(self.__model.generate_content, prompt), prompt, use_cache)
+
+    async def generate_content_async(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        return await self.call_async(partial(self.__model.generate_content_async, prompt), prompt, use_cache)
+
+    def count_tokens(self, contents):
+        # type: (list) -> int
+        # Estimating the number of tokens locally while offline
+        if self.response_cache.offline:
+            return LLMBackend.count_tokens(self, contents)
+
+        return self.__model.count_tokens(contents)
+
+    def close(self):
+        # type: () -> None
+        self.__model.close()
+
+
+class LLMTelemetry:
+    """
+    This class contains attributes of the telemetry of all calls to Gemini AI in a session. Every call is
+    tagged with its call site (the part of the game making it), aggregated per call site, and appended
+    to a JSONL trace file if 'trace_file_name' is given.
+    """
+
+    def __init__(self, trace_file_name=None):
+        # type: (str or None) -> None
+        self.trace_file_name: str or None = trace_file_name
+        self.__stats: dict = {}  # call site -> aggregated stats
+        self.__lock: threading.Lock = threading.Lock()
+        self.__trace_file = open(trace_file_name, "a", encoding="utf-8") if trace_file_name else None
+
+    @staticmethod
+    def estimate_cost(prompt_token_count, response_token_count):
+        # type: (int, int) -> float
+        return (prompt_token_count * GEMINI_INPUT_PRICE_PER_MILLION_TOKENS +
+                response_token_count * GEMINI_OUTPUT_PRICE_PER_MILLION_TOKENS) / 1000000
+
+    def record(self, call_site, method, latency, response=None, error=None, time_to_first_token=None):
+        # type: (str, str, float, LLMResponse or None, BaseException or None, float or None) -> None
+        """
+        Recording a call made by 'call_site' with 'method' which took 'latency' seconds and either
+        returned 'response' or raised 'error'.
+        :return: None
+        """
+
+        record: dict = {
+            "time": time.time(),
+            "call_site": call_site,
+            "method": method,
+            "latency": latency,
+            "time_to_first_token": time_to_first_token,
+            "prompt_token_count": response.prompt_token_count if response is not None else 0,
+            "response_token_count": response.response_token_count if response is not None else 0,
+            "num_retries": response.num_retries if response is not None else 0,
+            "cache_status": response.cache_status if response is not None else None,
+            "is_fallback": response.is_fallback if response is not None else False,
+            "error": type(error).__name__ if error is not None else None
+        }
+        with self.__lock:
+            stats: dict = self.__stats.setdefault(call_site, {
+                "calls": 0, "errors": 0, "fallbacks": 0, "cache_hits": 0, "retries": 0, "prompt_tokens": 0,
+                "response_tokens": 0, "total_latency": 0.0, "max_latency": 0.0
+            })
+            stats["calls"] += 1
+            stats["errors"] += 1 if error is not None else 0
+            stats["fallbacks"] += 1 if record["is_fallback"] else 0
+            stats["cache_hits"] += 1 if record["cache_status"] == "HIT" else 0
+            stats["retries"] += record["num_retries"]
+            stats["prompt_tokens"] += record["prompt_token_count"]
+            stats["response_tokens"] += record["response_token_count"]
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+            if self.__trace_file is not None:
+                self.__trace_file.write(json.dumps(record) + "\n")
+                self.__trace_file.flush()
+
+    def get_stats(self):
+        # type: () -> dict
+        """
+        Getting the stats of every call site, including the mean latency and the estimated cost in USD.
+        :return: a dictionary mapping call sites to their stats
+        """
+
+        with self.__lock:
+            all_stats: dict = copy.deepcopy(self.__stats)
+
+        for stats in all_stats.values():
+            stats["mean_latency"] = stats["total_latency"] / stats["calls"]
+            stats["cost"] = self.estimate_cost(stats["prompt_tokens"], stats["response_tokens"])
+
+        return all_stats
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            if self.__trace_file is not None:
+                self.__trace_file.close()
+                self.__trace_file = None
+
+    def __str__(self):
+        # type: () -> str
+        all_stats: dict = self.get_stats()
+        rows: list = [["Call Site", "Calls", "Cache Hits", "Retries", "Errors", "Fallbacks", "Prompt Tokens",
+                       "Response Tokens", "Mean Latency (s)", "Max Latency (s)", "Total Latency (s)",
+                       "Cost (USD)"]]
+        for call_site, stats in sorted(all_stats.items(), key=lambda item: -item[1]["total_latency"]):
+            rows.append([call_site, stats["calls"], stats["cache_hits"], stats["retries"], stats["errors"],
+                         stats["fallbacks"], stats["prompt_tokens"], stats["response_tokens"],
+                         round(stats["mean_latency"], 3), round(stats["max_latency"], 3),
+                         round(stats["total_latency"], 3), round(stats["cost"], 4)])
+
+        return "LLM calls per call site:\n" + str(tabulate(rows, headers='firstrow', tablefmt='fancy_grid'))
+
+
+class TelemetryChatSession:
+    """
+    This class contains attributes of a chat session with a large language model whose messages are recorded
+    in an LLMTelemetry under the call site 'call_site'.
+    """
+
+    def __init__(self, convo, model, call_site):
+        # type: (CachedChatSession, TelemetryGenerativeModel, str) -> None
+        self.__convo: CachedChatSession = convo
+        self.__model: TelemetryGenerativeModel = model
+        self.call_site: str = call_site
+        self.last: LLMResponse or None = None  # initial value
+
+    @property
+    def history(self):
+        # type: () -> list
+        return self.__convo.history
+
+    def send_message(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        self.last = self.__model.call(partial(self.__convo.send_message, prompt, use_cache), self.call_site,
+                                      "send_message", prompt)
+        return self.last
+
+    async def send_message_async(self, prompt, use_cache=True):
+        # type: (str, bool) -> LLMResponse
+        self.last = await self.__model.call_async(partial(self.__convo.send_message_async, prompt, use_cache),
+                                                  self.call_site, "send_message_async", prompt)
+        return self.last
+
+    def send_message_stream(self, prompt):
+        # type: (str) -> typing.Iterator[str]
+        telemetry: LLMTelemetry = self.__model.telemetry
+        start_time: float = time.perf_counter()
+        time_to_first_token: float or None = None  # initial value
+        texts: typing.Iterator[str] = self.__convo.send_message_stream(prompt) if _game_session is None else \
+            _game_session.stream_llm(partial(self.__convo.send_message_stream, prompt), [self.call_site, prompt])
+        try:
+            for text in texts:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+
+                yield text
+        except Exception as e:
+            telemetry.record(self.call_site, "send_message_stream", time.perf_counter() - start_time, error=e,
+                             time_to_first_token=time_to_first_token)
+            raise
+
+        self.last = self.__convo.last
+        telemetry.record(self.call_site, "send_message_stream", time.perf_counter() - start_time, self.last,
+                         time_to_first_token=time_to_first_token)
+
+
+class TelemetryGenerativeModel(LLMBackend):
+    """
+    This class contains attributes of a large language model whose calls are recorded in an LLMTelemetry.
+    """
+
+    def __init__(self, model, telemetry):
+        # type: (CachedGenerativeModel, LLMTelemetry) -> None
+        LLMBackend.__init__(self, model.generation_config)
+        self.__model: CachedGenerativeModel = model
+        self.telemetry: LLMTelemetry = telemetry
+
+    def call(self, send, call_site, method, prompt=None):
+        # type: (typing.Callable[[], LLMResponse], str, str, str or None) -> LLMResponse
+        """
+        Calling 'send' and recording the call. If a game session is being recorded or replayed, the response to
+        'prompt' is recorded in (or replayed from) the session instead.
+        :return: the response
+        """
+
+        start_time: float = time.perf_counter()
+        try:
+            response: LLMResponse = send() if _game_session is None or prompt is None else \
+                _game_session.call_llm(send, [call_site, prompt])
+        except Exception as e:
+            self.telemetry.record(call_site, method, time.perf_counter() - start_time, error=e)
+            raise
+
+        self.telemetry.record(call_site, method, time.perf_counter() - start_time, response)
+        return response
+
+    async def call_async(self, send_async, call_site, method, prompt=None):
+        # type: (typing.Callable[[], typing.Awaitable[LLMResponse]], str, str, str or None) -> LLMResponse
+        start_time: float = time.perf_counter()
+        try:
+            response: LLMResponse = await send_async() if _game_session is None or prompt is None else \
+                await _game_session.call_llm_async(send_async, [call_site, prompt])
+        except Exception as e:
+            self.telemetry.record(call_site, method, time.perf_counter() - start_time, error=e)
+            raise
+
+        self.telemetry.record(call_site, method, time.perf_counter() - start_time, response)
+        return response
+
+    def start_chat(self, history=None, call_site=LLM_DEFAULT_CALL_SITE):
+        # type: (list or None, str) -> TelemetryChatSession
+        return TelemetryChatSession(self.__model.start_chat(history=history), self, call_site)
+
+    def generate_content(self, prompt, use_cache=True, call_site=LLM_DEFAULT_CALL_SITE):
+        # type: (str, bool, str) -> LLMResponse
+        """
+        Generating a single response to 'prompt' without any chat history.
+        :return: the response
+        """
+
+        return self.call(partial(self.__model.generate_content, prompt, use_cache), call_site, "generate_content",
+                         prompt)
+
+    async def generate_content_async(self, prompt, use_cache=True, call_site=LLM_DEFAULT_CALL_SITE):
+        # type: (str, bool, str) -> LLMResponse
+        return await self.call_async(partial(self.__model.generate_content_async, prompt, use_cache), call_site,
+                                     "generate_content_async", prompt)
+
+    def count_tokens(self, contents, call_site=LLM_DEFAULT_CALL_SITE):
+        # type: (list, str) -> int
+        start_time: float = time.perf_counter()
+        num_tokens: int = self.__model.count_tokens(contents) if _game_session is None else \
+            _game_session.call("count_tokens", [call_site, contents], partial(self.__model.count_tokens, contents))
+        self.telemetry.record(call_site, "count_tokens", time.perf_counter() - start_time)
+        return num_tokens
+
+    def close(self):
+        # type: () -> None
+        self.__model.close()
+
+
+def create_llm_backend(generation_config, safety_settings):
+    # type: (dict, list) -> LLMBackend
+    """
+    Creating the LLM backend selected by the environment variable LLM_BACKEND: "gemini" (default),
+    "fake" (an in-process stand-in), or "http" (a stand-in server at LLM_BACKEND_URL).
+    :return: the LLM backend
+    """
+
+    backend_name: str = os.environ.get("LLM_BACKEND", "gemini")
+    if backend_name == "fake":
+        return FakeBackend(generation_config, int(os.environ.get("LLM_FAKE_SEED", "0")),
+                           float(os.environ.get("LLM_FAKE_MIN_LATENCY", "0")),
+                           float(os.environ.get("LLM_FAKE_MAX_LATENCY", "0")),
+                           failure_rate=float(os.environ.get("LLM_FAKE_FAILURE_RATE", "0")))
+    elif backend_name == "http":
+        return HTTPBackend(os.environ.get("LLM_BACKEND_URL", LLM_STAND_IN_SERVER_URL), generation_config)
+    elif backend_name == "gemini":
+        return GeminiBackend(generation_config, safety_settings)
+    else:
+        raise ValueError("Unknown LLM backend: " + str(backend_name))
+
+
+class LLMService:
+    """
+    This class contains attributes of the service handing out the large language models used in this game.
+    One long-lived model (with its backend and connections) is kept per generation config, and all the models
+    share the response cache, the rate limiter, the circuit breaker, and the telemetry.
+    """
+
+    def __init__(self, safety_settings, response_cache, rate_limiter, circuit_breaker, telemetry):
+        # type: (list, LLMResponseCache, TokenBucketRateLimiter, CircuitBreaker, LLMTelemetry) -> None
+        self.safety_settings: list = safety_settings
+        self.response_cache: LLMResponseCache = response_cache
+        self.rate_limiter: TokenBucketRateLimiter = rate_limiter
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+        self.telemetry: LLMTelemetry = telemetry
+        self.__models: dict = {}  # generation config (as JSON) -> model
+        self.__lock: threading.Lock = threading.Lock()
+
+    def get_model(self, generation_config):
+        # type: (dict) -> TelemetryGenerativeModel
+        key: str = json.dumps(generation_config, sort_keys=True, default=str)
+        with self.__lock:
+            if key not in self.__models:
+                self.__models[key] = TelemetryGenerativeModel(CachedGenerativeModel(ResilientGenerativeModel(
+                    RateLimitedGenerativeModel(create_llm_backend(generation_config, self.safety_settings),
+                                               self.rate_limiter), self.circuit_breaker), self.response_cache,
+                    generation_config), self.telemetry)
+
+            return self.__models[key]
+
+    def generate(self, prompt, generation_config, use_cache=True, call_site=LLM_DEFAULT_CALL_SITE):
+        # type: (str, dict, bool, str) -> LLMResponse
+        return self.get_model(generation_config).generate_content(prompt, use_cache, call_site)
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            for model in self.__models.values():
+                model.close()
+
+            self.__models = {}
+
+        self.telemetry.close()
+        self.response_cache.close()
+
+    def __str__(self):
+        # type: () -> str
+        return str(self.telemetry) + "\n" + str(self.response_cache)
+
+
+def run_llm_stand_in_server() -> int:
+    """
+    This function is used to run a local HTTP server standing in for Gemini AI.
+    :return: an integer
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Run a local HTTP stand-in for Gemini AI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-latency", type=float, default=0.0, help="minimum latency in seconds")
+    parser.add_argument("--max-latency", type=float, default=0.0, help="maximum latency in seconds")
+    parser.add_argument("--min-words", type=int, default=1)
+    parser.add_argument("--max-words", type=int, default=12)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args: argparse.Namespace = parser.parse_args()
+    server: LLMStandInServer = LLMStandInServer(args.host, args.port, FakeBackend(
+        seed=args.seed, min_latency=args.min_latency, max_latency=args.max_latency, min_words=args.min_words,
+        max_words=args.max_words, failure_rate=args.failure_rate))
+    print("LLM stand-in server listening on http://" + str(args.host) + ":" + str(args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def create_simulated_player(name, level, team_size):
+    # type: (str, int, int) -> AIPlayer
+    ai_player: AIPlayer = AIPlayer(name)
+    ai_player.level_to(level)
+
+    for legendary_creature in generate_creatures(team_size, LegendaryCreature.POTENTIAL_ELEMENTS, level):
+        ai_player.add_legendary_creature(legendary_creature)
+        ai_player.add_legendary_creature_to_team(legendary_creature)
+    return ai_player
+
+
+def simulate_battle(kind, seed, level, team_size, player=None):
+    # type: (str, int, int, int, Player or None) -> Battle
+    """
+    Carrying out one seeded battle of the given kind ("wild", "creature", or "pvp") between 'player' (or a random
+    AI player at 'level' if not given) and a random opponent at the level of the battle team of the player.
+    :return: the battle after it is over
+    """
+
+    seed_random_streams(seed)
+    player1: Player = player.clone() if player is not None else create_simulated_player("PLAYER", level, team_size)
+    player1.battle_team.recover_all()
+    opponent_level: int = get_average_battle_creature_level(player1) if player is not None else level
+    if kind == "wild":
+        wild_legendary_creature: LegendaryCreature = create_simulated_player(
+            "WILD", opponent_level, 1).battle_team.get_legendary_creatures()[0]
+        battle: Battle = WildBattle(player1, wild_legendary_creature)
+    elif kind == "creature":
+        battle: Battle = CreatureBattle(player1, create_simulated_player("OPPONENT", opponent_level, team_size))
+    else:
+        player1.recover()
+        battle: Battle = PVPBattle(player1, create_simulated_player("OPPONENT", player1.level, 0))
+
+    battle.simulate()
+    return battle
+
+
+def simulate_battles(kind, seeds, level, team_size, player=None):
+    # type: (str, list, int, int, Player or None) -> dict
+    """
+    Carrying out a batch of seeded battles in a simulator process.
+    :return: the outcomes of the battles, with the number of attacks dealing damage of each order of magnitude
+    """
+
+    outcomes: dict = {"wins": 0, "losses": 0, "turns": [], "damage": [{}, {}], "zero damage": [0, 0]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in seeds:
+            battle: Battle = simulate_battle(kind, seed, level, team_size, player)
+            if battle.winner is not None:
+                outcomes["wins" if battle.winner in [battle.player1, battle.player1.battle_team] else "losses"] += 1
+
+            outcomes["turns"].append(battle.num_turns)
+            for side in range(2):
+                for damage in battle.damage_dealt[side]:
+                    if damage > 0:
+                        order_of_magnitude: int = int(mp.floor(mp.log10(damage)))
+                        outcomes["damage"][side][order_of_magnitude] = \
+                            outcomes["damage"][side].get(order_of_magnitude, 0) + 1
+                    else:
+                        outcomes["zero damage"][side] += 1
+    return outcomes
+
+
+def merge_simulated_battles(outcomes, other_outcomes):
+    # type: (dict, dict) -> None
+    outcomes["wins"] += other_outcomes["wins"]
+    outcomes["losses"] += other_outcomes["losses"]
+    outcomes["turns"] += other_outcomes["turns"]
+    for side in range(2):
+        outcomes["zero damage"][side] += other_outcomes["zero damage"][side]
+        for order_of_magnitude, count in other_outcomes["damage"][side].items():
+            outcomes["damage"][side][order_of_magnitude] = outcomes["damage"][side].get(order_of_magnitude, 0) + count
+
+
+def tabulate_simulated_battles(outcomes):
+    # type: (dict) -> str
+    num_battles: int = len(outcomes["turns"])
+    win_rate: float = outcomes["wins"] / num_battles
+    margin: float = 1.96 * math.sqrt(win_rate * (1 - win_rate) / num_battles)  # 95% confidence interval
+    turns: np.ndarray = np.array(outcomes["turns"])
+    res: str = str(tabulate([
+        ["Battles", num_battles],
+        ["Win rate", str(round(100 * win_rate, 2)) + "% +/- " + str(round(100 * margin, 2)) + "%"],
+        ["Loss rate", str(round(100 * outcomes["losses"] / num_battles, 2)) + "%"],
+        ["No winner", str(round(100 * (num_battles - outcomes["wins"] - outcomes["losses"]) / num_battles, 2)) + "%"],
+        ["Turns (mean / median / 90th percentile / max)", " / ".join(
+            str(round(float(value), 1)) for value in [turns.mean(), np.median(turns), np.percentile(turns, 90),
+                                                      turns.max()])]
+    ], headers=["Statistic", "Value"], tablefmt='fancy_grid')) + "\n"
+
+    # Damage spans many orders of magnitude, so the histogram has a bin for each power of ten.
+    rows: list = [["0", outcomes["zero damage"][0], outcomes["zero damage"][1]]]
+    for order_of_magnitude in sorted(set(outcomes["damage"][0]) | set(outcomes["damage"][1])):
+        rows.append(["1e" + str(order_of_magnitude) + " - 1e" + str(order_of_magnitude + 1),
+                     outcomes["damage"][0].get(order_of_magnitude, 0),
+                     outcomes["damage"][1].get(order_of_magnitude, 0)])
+    return res + str(tabulate(rows, headers=["Damage per attack", "Player", "Opponents"], tablefmt='fancy_grid'))
+
+
+def run_battle_simulator() -> int:
+    """
+    This function is used to estimate win rates by simulating many seeded battles with AI players in parallel.
+    :return: an integer
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Simulate battles between AI players to estimate win rates.")
+    parser.add_argument("--kind", choices=["wild", "creature", "pvp"], default="creature")
+    parser.add_argument("--battles", type=int, default=1000)
+    parser.add_argument("--level", type=int, default=1, help="level of the random player and legendary creatures")
+    parser.add_argument("--team-size", type=int, default=BattleTeam.MAX_LEGENDARY_CREATURES)
+    parser.add_argument("--player", default=None, help="name of a saved game whose player and battle team are used")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args: argparse.Namespace = parser.parse_args()
+
+    player: Player or None = load_game_data(os.path.join("../saved", args.player)).player_data \
+        if args.player is not None else None
+    seeds: list = list(range(args.seed, args.seed + args.battles))
+    num_chunks: int = max(1, min(len(seeds), args.workers * BATTLE_SIMULATION_CHUNKS_PER_WORKER))
+    outcomes: dict = {"wins": 0, "losses": 0, "turns": [], "damage": [{}, {}], "zero damage": [0, 0]}
+    start_time: float = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for chunk_outcomes in executor.map(partial(simulate_battles, args.kind, level=args.level,
+                                                   team_size=args.team_size, player=player),
+                                           [seeds[i::num_chunks] for i in range(num_chunks)]):
+            merge_simulated_battles(outcomes, chunk_outcomes)
+
+    elapsed_time: float = time.perf_counter() - start_time
+    print(tabulate_simulated_battles(outcomes))
+    print(str(args.battles) + " battles in " + str(round(elapsed_time, 2)) + " seconds with " + str(args.workers) +
+          " workers (" + str(round(args.battles / elapsed_time, 1)) + " battles per second)")
+    return 0
+
+
+def run_coroutine(coroutine):
+    # type: (typing.Coroutine) -> object
+    """
+    Running a coroutine on the event loop shared by the whole game. The loop is kept alive between calls
+    because the asynchronous Gemini client stays bound to the loop it was first used on.
+    :return: the result of the coroutine
+    """
+
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
 
-    def remove_item_from_inventory(self, item):
-        # type: (Item) -> bool
-        if isinstance(item, Rune):
-            for legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-                if item in legendary_creature.get_runes().values():
-                    return False
+    return _event_loop.run_until_complete(coroutine)
 
-        return self.item_inventory.remove_item(item)
 
-    def add_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> None
-        self.legendary_creature_inventory.add_legendary_creature(legendary_creature)
+def get_name_generation_prompt(kind, num_names, names_to_avoid):
+    # type: (str, int, list) -> str
+    prompt: str = "Please enter " + str(num_names) + " different good names of " + str(NAME_KINDS[kind]) + \
+                  " (safe one word names only please)! Respond with a JSON array of " + str(num_names) + " strings."
+    if len(names_to_avoid) > 0:
+        prompt += " Do not use any of these names: " + ", ".join(names_to_avoid) + "."
 
-    def remove_legendary_creature(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.battle_team.get_legendary_creatures():
-            return False
-        return self.legendary_creature_inventory.remove_legendary_creature(legendary_creature)
+    return prompt
 
-    def add_legendary_creature_to_team(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            if self.battle_team.add_legendary_creature(legendary_creature):
-                legendary_creature.corresponding_team = self.battle_team
-                return True
-            return False
-        return False
 
-    def remove_legendary_creature_from_team(self, legendary_creature):
-        # type: (LegendaryCreature) -> bool
-        if legendary_creature in self.legendary_creature_inventory.get_legendary_creatures():
-            legendary_creature.corresponding_team = None
-            return self.battle_team.remove_legendary_creature(legendary_creature)
-        return False
+def add_generated_names(names, response_text, num_names):
+    # type: (list, str, int) -> None
+    """
+    Validating the names in a JSON response of Gemini AI and adding the new ones to 'names' until it
+    contains 'num_names' names. Duplicates (ignoring case) and invalid entries are skipped.
+    :return: None
+    """
 
-    def level_up_gym(self, gym):
-        # type: (ExerciseGym) -> bool
-        if self.dollars >= gym.level_up_dollars_cost:
-            self.dollars -= gym.level_up_dollars_cost
-            gym.level_up()
-            return True
-        return False
+    try:
+        generated_names = json.loads(response_text)
+    except ValueError:
+        return
 
-    def train_in_gym(self, gym, option):
-        # type: (ExerciseGym, TrainingOption) -> bool
-        if option not in gym.get_training_options():
-            return False
+    if isinstance(generated_names, dict):
+        # Accepting responses like {"names": [...]}
+        generated_names = next((value for value in generated_names.values() if isinstance(value, list)), [])
 
-        if self.stamina < option.stamina_cost:
-            return False
+    if not isinstance(generated_names, list):
+        return
 
-        self.stamina -= option.stamina_cost
-        self.attack_power += option.player_attack_power_gain
-        self.defense += option.player_defense_gain
-        self.speed += option.player_speed_gain
-        self.dexterity += option.player_dexterity_gain
-        return True
+    names_seen: set = {name.lower() for name in names}
+    for generated_name in generated_names:
+        if len(names) >= num_names:
+            return
 
-    def take_mission(self, mission):
-        # type: (Mission) -> bool
-        if self.stamina < mission.stamina_cost:
-            print(str(self.name) + " has insufficient stamina!")
-            return False
-        self.stamina -= mission.stamina_cost
-        print(str(self.name) + " takes on mission " + str(mission.name) + "!")
-        print("Mission description: " + str(mission.description))
-        self.missions_completed += 1
-        self.claim_reward(mission.clear_reward)
-        return True
+        if not isinstance(generated_name, str):
+            continue
 
+        name: str = generated_name.strip()
+        if name == "" or len(name) > NAME_MAX_LENGTH or len(name.split()) != 1 or name.lower() in names_seen:
+            continue
 
-class AIPlayer(Player):
+        names_seen.add(name.lower())
+        names.append(name)
+
+
+def generate_names(model, kind, num_names, call_site=None, rng=None):
+    # type: (TelemetryGenerativeModel, str, int, str or None, random.Random or None) -> list
     """
-    This class contains attributes of an AI controlled player in this game.
+    Generating 'num_names' different names of kind 'kind' (a key of NAME_KINDS) with a single request to
+    Gemini AI in JSON mode. Missing names are topped up with further requests, and randomly generated names
+    are used if Gemini AI still has not given enough valid names after NAME_GENERATION_MAX_ATTEMPTS requests,
+    or straight away if Gemini AI is unavailable (drawn from 'rng', by default the "names" random stream). The
+    requests are recorded under 'call_site' (by default the kind of names).
+    :return: a list of names
     """
 
-    def __init__(self, name):
-        # type: (str) -> None
-        Player.__init__(self, name)
+    call_site = call_site if call_site is not None else str(kind).lower() + " names"
 
+    names: list = []  # initial value
+    attempts: int = 0  # initial value
+    while len(names) < num_names and attempts < NAME_GENERATION_MAX_ATTEMPTS:
+        response: LLMResponse = model.generate_content(get_name_generation_prompt(kind, num_names - len(names), names),
+                                                       call_site=call_site)
+        if response.is_fallback:
+            break
 
-class Mission:
+        add_generated_names(names, str(response.text), num_names)
+        attempts += 1
+
+    while len(names) < num_names:
+        names.append(generate_random_name(rng))
+
+    return names
+
+
+async def generate_names_async(model, kind, num_names, call_site=None, rng=None):
+    # type: (TelemetryGenerativeModel, str, int, str or None, random.Random or None) -> list
+    call_site = call_site if call_site is not None else str(kind).lower() + " names"
+    names: list = []  # initial value
+    attempts: int = 0  # initial value
+    while len(names) < num_names and attempts < NAME_GENERATION_MAX_ATTEMPTS:
+        response: LLMResponse = await model.generate_content_async(
+            get_name_generation_prompt(kind, num_names - len(names), names), call_site=call_site)
+        if response.is_fallback:
+            break
+
+        add_generated_names(names, str(response.text), num_names)
+        attempts += 1
+
+    while len(names) < num_names:
+        names.append(generate_random_name(rng))
+
+    return names
+
+
+def generate_city(json_model, average_player_battle_creature_level, rng=None):
+    # type: (TelemetryGenerativeModel, int, random.Random or None) -> City
     """
-    This class contains attributes of a mission in this game.
+    Generating a new city together with 5 to 10 AI players whose legendary creatures are at
+    'average_player_battle_creature_level'. All the random choices are drawn from 'rng' (by default the "city"
+    random stream). The player is not spawned in the city yet.
+    :return: the generated city
     """
 
-    def __init__(self, name, description, stamina_cost, clear_reward):
-        # type: (str, str, mpf, Reward) -> None
-        self.name: str = name
-        self.description: str = description
-        self.stamina_cost: mpf = stamina_cost
-        self.clear_reward: Reward = clear_reward
+    rng = rng if rng is not None else get_random_stream("city")
+    city_tiles: list = generate_city_tiles(rng)
+    city_name: str = generate_names(json_model, "CITY", 1, "city name", rng)[0]
+    city: City = City(city_name, city_tiles)
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+    # Spawn 5 to 10 random AI players.
+    num_ai_players: int = rng.randint(5, 10)
+    ai_player_names: list = generate_names(json_model, "CHARACTER", num_ai_players, "AI player names", rng)
+    for i in range(num_ai_players):
+        tile_x: int = rng.randint(0, len(city.get_tiles()[0]) - 1)
+        tile_y: int = rng.randint(0, len(city.get_tiles()) - 1)
+        while tile_x == 0 and tile_y == 0:
+            tile_x = rng.randint(0, len(city.get_tiles()[0]) - 1)
+            tile_y = rng.randint(0, len(city.get_tiles()) - 1)
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+        ai_player: AIPlayer = AIPlayer(ai_player_names[i], rng)
+        for new_legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS,
+                                                         average_player_battle_creature_level,
+                                                         rng.getrandbits(64)):
+            ai_player.add_legendary_creature(new_legendary_creature)
+            ai_player.add_legendary_creature_to_team(new_legendary_creature)
 
-            index += 1
+        ai_player.location = AdventureModeLocation(tile_x, tile_y)
+        city.get_tile_at(tile_x, tile_y).add_game_character(ai_player)
 
-        return res + ")"
+    return city
 
-    def clone(self):
-        # type: () -> Mission
-        return copy.deepcopy(self)
 
+async def assemble_named_items(json_model, semaphore, kind, item_factories, rng=None):
+    # type: (TelemetryGenerativeModel, asyncio.Semaphore, str, list, random.Random or None) -> list
+    """
+    Asking Gemini AI for the names of a batch of items in one request and building the items once the
+    names arrive.
+    :return: a list of the assembled items
+    """
 
-class ItemShop:
+    async with semaphore:
+        names: list = await generate_names_async(json_model, kind, len(item_factories), "item shop", rng)
+
+    return [item_factory(name) for item_factory, name in zip(item_factories, names)]
+
+
+async def generate_item_shop_items(json_model, num_items, concurrency_limit=ITEM_SHOP_CONCURRENCY_LIMIT, rng=None):
+    # type: (TelemetryGenerativeModel, int, int, random.Random or None) -> typing.AsyncIterator[Item]
     """
-    This class contains attributes of an item shop selling items.
+    Generating the items sold in an item shop with the random choices drawn from 'rng' (by default the "shop"
+    random stream). The names of balls and runes are requested in batches of at most NAME_BATCH_MAX_SIZE names,
+    and the batches are sent concurrently (at most 'concurrency_limit' requests at a time). The items of each batch
+    are yielded once it is assembled, in the order the batches were requested so that the same random stream gives
+    the same item shop however fast Gemini AI answers.
+    :return: an asynchronous generator of items
     """
 
-    def __init__(self, items_sold):
-        # type: (list) -> None
-        self.name: str = "ITEM SHOP"
-        self.__items_sold: list = items_sold
+    rng = rng if rng is not None else get_random_stream("shop")
+    item_factories: dict = {"BALL": [], "RUNE": []}
+    for i in range(num_items):
+        item_type: str = rng.choice(ITEM_SHOP_ITEM_TYPES)
+        if item_type == "BALL":
+            gold_cost: Magnitude = Magnitude(rng.randint(1, 9), rng.randint(5, 10))
+            item_factories[item_type].append(partial(Ball, description="A ball to catch a legendary creature.",
+                                                     dollars_cost=gold_cost,
+                                                     catch_success_rate=number(rng.randint(50, 100) / 100)))
+        elif item_type == "RUNE":
+            gold_cost: Magnitude = Magnitude(rng.randint(1, 9), rng.randint(5, 10))
+            rating: int = rng.randint(Rune.MIN_RATING, Rune.MAX_RATING)
+            slot_number: int = rng.randint(Rune.MIN_SLOT_NUMBER, Rune.MAX_SLOT_NUMBER)
+            item_factories[item_type].append(partial(Rune, description="A rune to strengthen legendary creatures.",
+                                                     dollars_cost=gold_cost, rating=rating, slot_number=slot_number,
+                                                     max_magic_points_percentage_up=rating,
+                                                     max_hp_percentage_up=rating, attack_power_percentage_up=rating,
+                                                     defense_percentage_up=rating, attack_speed_up=rating * 2,
+                                                     crit_rate_up=rating * number("0.01"),
+                                                     crit_damage_up=rating * number("0.05")))
+        elif item_type == "AWAKEN SHARD":
+            yield AwakenShard("Awaken Shard", "A shard to immediately awaken a legendary creature.", number("5e7"),
+                              rng.choice(LegendaryCreature.POTENTIAL_ELEMENTS))
+        elif item_type == "EXP SHARD":
+            gold_cost: Magnitude = Magnitude(rng.randint(1, 9), rng.randint(6, 11))
+            exp_granted: Magnitude = Magnitude(rng.randint(1, 9), rng.randint(5, 10))
+            yield EXPShard("EXP Shard", "An EXP shard used to immediately increase the EXP of a legendary creature.",
+                           gold_cost, exp_granted)
+        elif item_type == "LEVEL UP SHARD":
+            yield LevelUpShard("Level Up Shard", "A shard to immediately level up a legendary creature.", number("5e7"))
+        elif item_type == "SKILL LEVEL UP SHARD":
+            yield SkillLevelUpShard("Skill Level Up Shard", "A shard to immediately level up a skill a legendary "
+                                                            "creature has.", number("5e7"))
+        else:
+            pass
 
-    def get_items_sold(self):
-        # type: () -> list
-        return self.__items_sold
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency_limit)
+    pending_batches: list = []  # initial value
+    for kind, factories in item_factories.items():
+        for i in range(0, len(factories), NAME_BATCH_MAX_SIZE):
+            pending_batches.append(asyncio.ensure_future(
+                assemble_named_items(json_model, semaphore, kind, factories[i:i + NAME_BATCH_MAX_SIZE],
+                                     random.Random(rng.getrandbits(64)))))
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+    for next_batch in pending_batches:
+        for item in await next_batch:
+            yield item
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
 
-            index += 1
+async def build_item_shop_async(json_model, concurrency_limit=ITEM_SHOP_CONCURRENCY_LIMIT):
+    # type: (TelemetryGenerativeModel, int) -> ItemShop
+    rng: random.Random = get_random_stream("shop")
+    num_items: int = rng.randint(30, 50)
+    items_sold: list = [item async for item in generate_item_shop_items(json_model, num_items, concurrency_limit,
+                                                                        rng)]
+    return ItemShop(items_sold)
 
-        return res + ")"
 
-    def clone(self):
-        # type: () -> ItemShop
-        return copy.deepcopy(self)
+def build_item_shop(json_model, concurrency_limit=ITEM_SHOP_CONCURRENCY_LIMIT):
+    # type: (TelemetryGenerativeModel, int) -> ItemShop
+    return run_coroutine(build_item_shop_async(json_model, concurrency_limit))
 
 
-class Reward:
+###########################################
+# SESSION RECORDING AND REPLAY
+###########################################
+
+
+class SessionReplayFinished(Exception):
     """
-    This class contains attributes of a reward gained for accomplishing something in this game.
+    This class contains attributes of the error raised when a replayed session asks for an input which was not
+    recorded, i.e., the recorded session ended at this point.
     """
 
-    def __init__(self, player_reward_exp=mpf("0"), player_reward_dollars=mpf("0"),
-                 legendary_creature_reward_exp=mpf("0")):
-        # type: (mpf, mpf, mpf) -> None
-        self.player_reward_exp: mpf = player_reward_exp
-        self.player_reward_dollars: mpf = player_reward_dollars
-        self.legendary_creature_reward_exp: mpf = legendary_creature_reward_exp
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
+class GameSession:
+    """
+    This class contains attributes of a session of this game recorded to (or replayed from) a JSONL log. The first
+    line of the log holds the seed of the random streams of the session, and every other line holds something which
+    cannot be reproduced from the seed: an input of the player, a response of Gemini AI, a value depending on timing
+    (e.g. whether a mission was ready), or a saved game file which was loaded. Replaying the log feeds all of them
+    back, so the session is played again without the player or Gemini AI.
+    """
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+    VERSION: int = 1
+
+    def __init__(self, file_name, replaying=False, seed=None):
+        # type: (str, bool, int or None) -> None
+        self.file_name: str = file_name
+        self.replaying: bool = replaying
+        self.num_inputs: int = 0  # initial value
+        self.__entries: dict = {}  # (kind, key as JSON) -> deque of the values recorded in that order
+        self.__lock: threading.Lock = threading.Lock()
+        self.__log_file = None  # initial value
+        if replaying:
+            with open(file_name, "r", encoding="utf-8") as log_file:
+                header: dict = json.loads(log_file.readline())
+                if header.get("version") != self.VERSION:
+                    raise ValueError("Unsupported session log version: " + str(header.get("version")))
+
+                for line in log_file:
+                    entry: dict = json.loads(line)
+                    self.__entries.setdefault((entry["kind"], json.dumps(entry["key"])), deque()).append(
+                        entry["value"])
+
+            self.seed: int = header["seed"]
+            self.number_backend: str = header["number_backend"]
+        else:
+            self.seed: int = seed if seed is not None else random.getrandbits(64)
+            self.number_backend: str = NUMBER_BACKEND
+            self.__log_file = open(file_name, "w", encoding="utf-8")
+            self.__write({"version": self.VERSION, "seed": self.seed, "number_backend": self.number_backend})
+
+    def __write(self, entry):
+        # type: (dict) -> None
+        with self.__lock:
+            if self.__log_file is not None:
+                self.__log_file.write(json.dumps(entry) + "\n")
+                self.__log_file.flush()
+
+    def record(self, kind, key, value):
+        # type: (str, object, object) -> None
+        self.__write({"kind": kind, "key": key, "value": value})
+
+    def replay(self, kind, key=None):
+        # type: (str, object) -> object
+        """
+        Taking the next value recorded under 'kind' and 'key'.
+        :return: the value
+        """
 
-            index += 1
+        with self.__lock:
+            values: deque or None = self.__entries.get((kind, json.dumps(key)))
+            if not values:
+                raise SessionReplayFinished("No more values of kind " + str(kind) + " were recorded.")
 
-        return res + ")"
+            return values.popleft()
 
-    def clone(self):
-        # type: () -> Reward
-        return copy.deepcopy(self)
+    def call(self, kind, key, compute):
+        # type: (str, object, typing.Callable[[], object]) -> object
+        """
+        Computing a JSON serializable value and recording it, or taking the value recorded instead when
+        replaying. Values which were not recorded are computed again.
+        :return: the value
+        """
+
+        if self.replaying:
+            try:
+                return self.replay(kind, key)
+            except SessionReplayFinished:
+                return compute()
+
+        value = compute()
+        self.record(kind, key, value)
+        return value
+
+    def read_input(self, prompt):
+        # type: (str) -> str
+        if self.replaying:
+            text: str = str(self.replay("input"))
+            print(str(prompt) + text)
+        else:
+            text: str = input(prompt)
+            self.record("input", None, text)
+
+        self.num_inputs += 1
+        return text
+
+    @staticmethod
+    def encode_llm_response(response):
+        # type: (LLMResponse) -> dict
+        return {"text": response.text, "prompt_token_count": response.prompt_token_count,
+                "response_token_count": response.response_token_count, "is_fallback": response.is_fallback}
+
+    @staticmethod
+    def encode_llm_error(error):
+        # type: (BaseException) -> dict
+        return {"error": type(error).__name__}
+
+    @staticmethod
+    def decode_llm_response(value):
+        # type: (dict) -> LLMResponse
+        """
+        Making the response recorded in 'value', raising the error recorded instead if the call failed.
+        :return: the response
+        """
+
+        if "error" in value:
+            errors: dict = {error.__name__: error for error in [
+                gemini.types.generation_types.BlockedPromptException,
+                gemini.types.generation_types.StopCandidateException]}
+            raise errors.get(value["error"], LLMUnavailableError)("Replayed " + str(value["error"]) + ".")
+
+        return LLMResponse(value["text"], value["prompt_token_count"], value["response_token_count"],
+                           value["is_fallback"])
+
+    def call_llm(self, send, key):
+        # type: (typing.Callable[[], LLMResponse], list) -> LLMResponse
+        if self.replaying:
+            try:
+                return self.decode_llm_response(self.replay("llm", key))
+            except SessionReplayFinished:
+                return send()  # e.g. a request made in the background after the recorded session ended
+
+        try:
+            response: LLMResponse = send()
+        except Exception as e:
+            self.record("llm", key, self.encode_llm_error(e))
+            raise
+
+        self.record("llm", key, self.encode_llm_response(response))
+        return response
+
+    async def call_llm_async(self, send_async, key):
+        # type: (typing.Callable[[], typing.Awaitable[LLMResponse]], list) -> LLMResponse
+        if self.replaying:
+            try:
+                return self.decode_llm_response(self.replay("llm", key))
+            except SessionReplayFinished:
+                return await send_async()
+
+        try:
+            response: LLMResponse = await send_async()
+        except Exception as e:
+            self.record("llm", key, self.encode_llm_error(e))
+            raise
+
+        self.record("llm", key, self.encode_llm_response(response))
+        return response
+
+    def stream_llm(self, stream, key):
+        # type: (typing.Callable[[], typing.Iterator[str]], list) -> typing.Iterator[str]
+        """
+        Yielding the text chunks of a streamed response, which is recorded as a whole once it is complete.
+        :return: an iterator of text chunks
+        """
 
+        if self.replaying:
+            try:
+                value: dict = self.replay("llm", key)
+            except SessionReplayFinished:
+                yield from stream()
+                return
 
-class AdventureModeLocation:
+            yield self.decode_llm_response(value).text
+            return
+
+        texts: list = []  # initial value
+        try:
+            for text in stream():
+                texts.append(text)
+                yield text
+        except Exception as e:
+            self.record("llm", key, self.encode_llm_error(e))
+            raise
+
+        self.record("llm", key, self.encode_llm_response(LLMResponse("".join(texts))))
+
+    def record_saved_game(self, file_name):
+        # type: (str) -> None
+        if self.replaying:
+            return
+
+        with open(file_name, "rb") as saved_game_file:
+            self.record("saved game", os.path.basename(file_name),
+                        base64.b64encode(saved_game_file.read()).decode("ascii"))
+
+    def restore_saved_games(self, directory):
+        # type: (str) -> None
+        """
+        Writing the saved game files loaded in the recorded session into 'directory', as they were when loaded.
+        :return: None
+        """
+
+        for (kind, key), values in self.__entries.items():
+            if kind == "saved game":
+                with open(os.path.join(directory, json.loads(key)), "wb") as saved_game_file:
+                    saved_game_file.write(base64.b64decode(values[0]))
+
+    def close(self):
+        # type: () -> None
+        with self.__lock:
+            if self.__log_file is not None:
+                self.__log_file.close()
+                self.__log_file = None
+
+
+_game_session: GameSession or None = None  # initial value
+
+
+def start_game_session(file_name, replaying=False, seed=None):
+    # type: (str, bool, int or None) -> GameSession
     """
-    This class contains attributes of the location of a player in adventure mode of this game.
+    Starting to record the session of this game to 'file_name' (or to replay the session recorded in it), with
+    the random streams seeded from the seed of the session.
+    :return: the session
     """
 
-    def __init__(self, tile_x, tile_y):
-        # type: (int, int) -> None
-        self.tile_x: int = tile_x
-        self.tile_y: int = tile_y
+    global _game_session
+    _game_session = GameSession(file_name, replaying, seed)
+    seed_random_streams(_game_session.seed)
+    return _game_session
 
-    def __str__(self):
-        # type: () -> str
-        res: str = str(type(self).__name__) + "("  # initial value
-        index: int = 0  # initial value
-        for item in vars(self).items():
-            res += str(item[0]) + "=" + str(item[1])
 
-            if index < len(vars(self).items()) - 1:
-                res += ", "
+def end_game_session():
+    # type: () -> None
+    global _game_session
+    if _game_session is not None:
+        _game_session.close()
+        _game_session = None
 
-            index += 1
 
-        return res + ")"
+def read_input(prompt):
+    # type: (str) -> str
+    # Inputs are read from the recorded session while it is being replayed.
+    return input(prompt) if _game_session is None else _game_session.read_input(prompt)
 
-    def clone(self):
-        # type: () -> AdventureModeLocation
-        return copy.deepcopy(self)
 
+def list_saved_game_files(directory):
+    # type: (str) -> list
+    file_names: list = os.listdir(directory) if _game_session is None else \
+        _game_session.call("saved game files", None, partial(os.listdir, directory))
 
-class SavedGameData:
+    # Games which were only autosaved (the game stopped before the player exited it) can be loaded as well.
+    saved_game_files: list = []  # initial value
+    for file_name in file_names:
+        if file_name.endswith(AUTOSAVE_SNAPSHOT_SUFFIX):
+            file_name = file_name[:-len(AUTOSAVE_SNAPSHOT_SUFFIX)]
+        elif file_name.endswith(AUTOSAVE_JOURNAL_SUFFIX) or file_name.endswith(TEMPORARY_FILE_SUFFIX):
+            continue
+
+        if file_name not in saved_game_files:
+            saved_game_files.append(file_name)
+    return saved_game_files
+
+
+def replay_game_session(file_name, show_output=False):
+    # type: (str, bool) -> tuple
     """
-    This class contains attributes of the saved game data in this game.
+    Replaying the session recorded in 'file_name' headlessly in a temporary directory. Requests to Gemini AI
+    which were not recorded go to the in-process stand-in.
+    :return: a tuple of the session, the exit code of the game (None if the recorded session ended before the
+    player exited), and the number of seconds taken
     """
 
-    def __init__(self, player_name, temperature, top_p, top_k, max_output_tokens, player_data, gym):
-        # type: (str, float, float, float, int, Player, ExerciseGym) -> None
-        self.player_name: str = player_name
-        self.temperature: float = temperature
-        self.top_p: float = top_p
-        self.top_k: float = top_k
-        self.max_output_tokens: int = max_output_tokens
-        self.player_data: Player = player_data
-        self.gym: ExerciseGym = gym
+    file_name = os.path.abspath(file_name)
+    old_directory: str = os.getcwd()
+    old_environ: dict = dict(os.environ)
+    with tempfile.TemporaryDirectory() as directory:
+        # The game keeps its saved game files, response cache, and trace next to the directory it runs in.
+        os.mkdir(os.path.join(directory, "saved"))
+        os.mkdir(os.path.join(directory, "work"))
+        session: GameSession = start_game_session(file_name, replaying=True)
+        session.restore_saved_games(os.path.join(directory, "saved"))
+        os.environ.update({"LLM_BACKEND": "fake", "GEMINI_OFFLINE": "0", "LLM_TRACE_FILE": "",
+                           "LLM_FAKE_MIN_LATENCY": "0", "LLM_FAKE_MAX_LATENCY": "0", "LLM_FAKE_FAILURE_RATE": "0",
+                           "SESSION_LOG_FILE": ""})
+        os.chdir(os.path.join(directory, "work"))
+        exit_code: int or None = None  # initial value
+        start_time: float = time.perf_counter()
+        try:
+            with open(os.devnull, "w") as devnull, \
+                    contextlib.redirect_stdout(sys.stdout if show_output else devnull):
+                exit_code = main()
+        except SessionReplayFinished:
+            pass
+        finally:
+            elapsed_time: float = time.perf_counter() - start_time
+            end_game_session()
+            os.chdir(old_directory)
+            os.environ.clear()
+            os.environ.update(old_environ)
+
+    return session, exit_code, elapsed_time
+
+
+def run_session_replay() -> int:
+    """
+    This function is used to replay a recorded session of the game headlessly at full speed.
+    :return: an integer
+    """
 
-    def __str__(self):
-        # type: () -> str
-        res: str = ""  # initial value
-        res += str(self.player_name).upper() + "\n"
-        res += "Temperature: " + str(self.temperature) + "\n"
-        res += "Top P: " + str(self.top_p) + "\n"
-        res += "Top K: " + str(self.top_k) + "\n"
-        res += "Max output tokens: " + str(self.max_output_tokens) + "\n"
-        return res
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Replay a session of the game recorded with SESSION_LOG_FILE.")
+    parser.add_argument("session_log_file")
+    parser.add_argument("--repeats", type=int, default=1, help="number of times the session is replayed")
+    parser.add_argument("--show-output", action="store_true", help="print the output of the game")
+    args: argparse.Namespace = parser.parse_args()
 
-    def clone(self):
-        # type: () -> SavedGameData
-        return copy.deepcopy(self)
+    # The numeric backend is chosen at startup, so it cannot be switched to the one of the session here.
+    number_backend: str = GameSession(args.session_log_file, replaying=True).number_backend
+    if number_backend != NUMBER_BACKEND:
+        print("The session was recorded with NUMBER_BACKEND=" + str(number_backend) + ". Please replay it with "
+              "the same numeric backend.")
+        return 1
+
+    table: list = []  # initial value
+    for i in range(args.repeats):
+        session, exit_code, elapsed_time = replay_game_session(args.session_log_file, args.show_output)
+        table.append([i + 1, session.num_inputs, "exited" if exit_code is not None else "log ended",
+                      round(elapsed_time, 3), round(session.num_inputs / elapsed_time, 1)])
+
+    print(tabulate(table, headers=["Replay", "Inputs", "End", "Time (s)", "Inputs per Second"],
+                   tablefmt='fancy_grid'))
+    return 0
 
 
 ###########################################
-# GENERAL
+# GEMINI AI
 ###########################################
 
 
@@ -1782,7 +6448,32 @@ def main() -> int:
     """
 
     load_dotenv()
-    gemini.configure(api_key=os.environ['GEMINI_API_KEY'])
+
+    # Every input and response of Gemini AI is recorded to SESSION_LOG_FILE (if set), so that the session can be
+    # replayed with gemini_cli_planet_adventure_replay.
+    session_log_file: str = os.environ.get("SESSION_LOG_FILE", "")
+    if _game_session is None and session_log_file != "":
+        session_seed: str = os.environ.get("SESSION_SEED", "")
+        start_game_session(session_log_file, seed=int(session_seed) if session_seed != "" else None)
+
+    # Running offline means that Gemini responses are only served from the local response cache.
+    offline: bool = os.environ.get("GEMINI_OFFLINE", "0") == "1"
+    if not offline and os.environ.get("LLM_BACKEND", "gemini") == "gemini":
+        gemini.configure(api_key=os.environ['GEMINI_API_KEY'])
+
+    response_cache: LLMResponseCache = LLMResponseCache(LLM_CACHE_FILE_NAME, offline=offline)
+
+    # All calls to Gemini share one rate limiter, so they run as fast as the quota allows.
+    rate_limiter: TokenBucketRateLimiter = TokenBucketRateLimiter(
+        float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", GEMINI_REQUESTS_PER_MINUTE)),
+        float(os.environ.get("GEMINI_TOKENS_PER_MINUTE", GEMINI_TOKENS_PER_MINUTE)),
+        int(os.environ.get("GEMINI_MAX_CONCURRENT_REQUESTS", GEMINI_MAX_CONCURRENT_REQUESTS)))
+
+    # After repeated failures, Gemini is given a rest and names are generated locally instead.
+    circuit_breaker: CircuitBreaker = CircuitBreaker()
+
+    # Every call to Gemini is recorded per call site, and traced to a JSONL file unless LLM_TRACE_FILE is empty.
+    telemetry: LLMTelemetry = LLMTelemetry(os.environ.get("LLM_TRACE_FILE", LLM_TRACE_FILE_NAME))
 
     # Gemini safety settings
     safety_settings = [
@@ -1806,10 +6497,10 @@ def main() -> int:
 
     # Saved game data
     gym: ExerciseGym = ExerciseGym("GYM", [
-        TrainingOption("ATTACK POWER", mpf("5"), player_attack_power_gain=mpf("5")),
-        TrainingOption("DEFENSE", mpf("5"), player_defense_gain=mpf("5")),
-        TrainingOption("DEXTERITY", mpf("5"), player_dexterity_gain=mpf("5")),
-        TrainingOption("SPEED", mpf("5"), player_speed_gain=mpf("5"))
+        TrainingOption("ATTACK POWER", number("5"), player_attack_power_gain=number("5")),
+        TrainingOption("DEFENSE", number("5"), player_defense_gain=number("5")),
+        TrainingOption("DEXTERITY", number("5"), player_dexterity_gain=number("5")),
+        TrainingOption("SPEED", number("5"), player_speed_gain=number("5"))
     ])
     saved_game_data: SavedGameData = SavedGameData("", 0, 0, 0,
                                                     0, Player("NONE"), gym) # initial value
@@ -1825,138 +6516,54 @@ def main() -> int:
         "max_output_tokens": 8192,
     }
 
-    model = gemini.GenerativeModel(
-        model_name="gemini-1.5-pro",
-        generation_config=generation_config,
-        safety_settings=safety_settings
-    )
+    # One long-lived model is kept per generation config, so loading a game reuses the models already set up.
+    llm_service: LLMService = LLMService(safety_settings, response_cache, rate_limiter, circuit_breaker, telemetry)
+    model: TelemetryGenerativeModel = llm_service.get_model(generation_config)
+
+    # Gemini Generative Model answering in JSON mode (used for generating batches of names)
+    json_model: TelemetryGenerativeModel = llm_service.get_model(dict(generation_config,
+                                                                      response_mime_type="application/json"))
 
     print("Enter \"NEW GAME\" to create new saved game data.")
     print("Enter \"LOAD GAME\" to load existing saved game data.")
-    action: str = input("What do you want to do? ")
+    action: str = read_input("What do you want to do? ")
     while action not in ["NEW GAME", "LOAD GAME"]:
         clear()
         print("Enter \"NEW GAME\" to create new saved game data.")
         print("Enter \"LOAD GAME\" to load existing saved game data.")
-        action = input("Sorry, invalid input! What do you want to do? ")
+        action = read_input("Sorry, invalid input! What do you want to do? ")
 
     game_started: bool = False
     while not game_started:
         if action == "NEW GAME":
             clear()
 
-            player_name = input("Please enter player name: ")
-            saved_game_files: list = [f for f in os.listdir("../saved")]
+            player_name = read_input("Please enter player name: ")
+            saved_game_files: list = list_saved_game_files("../saved")
             while player_name in saved_game_files:
                 print("Below is a list of existing saved game files:\n")
                 for i in range(len(saved_game_files)):
                     print(str(i + 1) + ". " + str(saved_game_files[i]))
 
-                player_name = input("Sorry, player name " + str(player_name) + " already exists! "
+                player_name = read_input("Sorry, player name " + str(player_name) + " already exists! "
                                                                                "Enter another player name: ")
 
             saved_game_data = SavedGameData(player_name, 1, 0.95, 64, 8192,
                                             Player(player_name), gym)
 
             # Generate 5 random legendary creatures to be placed in player's battle team.
-            for i in range(5):
-                new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                             (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
+            for new_legendary_creature in generate_creatures(5, LegendaryCreature.POTENTIAL_ELEMENTS):
                 saved_game_data.player_data.add_legendary_creature(new_legendary_creature)
                 saved_game_data.player_data.add_legendary_creature_to_team(new_legendary_creature)
 
-            # Generating the map of the city where the player is at.
-            city_width: int = random.randint(6, 10)
-            city_height: int = random.randint(6, 10)
-            city_tiles: list = []  # initial value
-            portals: int = 0  # initial value
-            for y in range(city_height):
-                curr_row: list = []
-                for x in range(city_width):
-                    if x == 0 and y == 0:
-                        curr_tile: str = random.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                        if curr_tile == "DOWNTOWN":
-                            curr_row.append(DowntownTile())
-                        elif curr_tile == "SUBURB":
-                            curr_row.append(SuburbTile())
-                        elif curr_tile == "PARK":
-                            curr_row.append(ParkTile())
-                        elif curr_tile == "BEACH":
-                            curr_row.append(BeachTile())
-                    elif portals == 0:
-                        if x == city_width - 1 and y == city_height - 1:
-                            portals += 1
-                            curr_row.append(PortalTile())
-                        else:
-                            curr_tile: str = random.choice(["PORTAL", "DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                            if curr_tile == "PORTAL":
-                                curr_row.append(PortalTile())
-                            elif curr_tile == "DOWNTOWN":
-                                curr_row.append(DowntownTile())
-                            elif curr_tile == "SUBURB":
-                                curr_row.append(SuburbTile())
-                            elif curr_tile == "PARK":
-                                curr_row.append(ParkTile())
-                            elif curr_tile == "BEACH":
-                                curr_row.append(BeachTile())
-                    else:
-                        curr_tile: str = random.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                        if curr_tile == "DOWNTOWN":
-                            curr_row.append(DowntownTile())
-                        elif curr_tile == "SUBURB":
-                            curr_row.append(SuburbTile())
-                        elif curr_tile == "PARK":
-                            curr_row.append(ParkTile())
-                        elif curr_tile == "BEACH":
-                            curr_row.append(BeachTile())
-                city_tiles.append(curr_row)
-            convo = model.start_chat(history=[
-            ])
-            convo.send_message("Please enter a good name of a fictional city (safe one word response only please)!")
-            city_name: str = str(convo.last.text)
-            city: City = City(city_name, city_tiles)
-
-            # Spawn player
-            saved_game_data.player_data.city = city
-            saved_game_data.player_data.location = AdventureModeLocation(0, 0)
-            city.get_tile_at(0, 0).add_game_character(saved_game_data.player_data)
-
-            # Spawn 5 to 10 random AI players.
-            num_ai_players: int = random.randint(5, 10)
-            for i in range(num_ai_players):
-                tile_x: int = random.randint(0, len(city.get_tiles()[0]) - 1)
-                tile_y: int = random.randint(0, len(city.get_tiles()) - 1)
-                while tile_x == 0 and tile_y == 0:
-                    tile_x = random.randint(0, len(city.get_tiles()[0]) - 1)
-                    tile_y = random.randint(0, len(city.get_tiles()) - 1)
-
-                time.sleep(20)
-                convo.send_message("Please enter a good male/female game character name "
-                                   "(safe one word response only please)! ")
-                ai_player_name: str = str(convo.last.text)
-                ai_player: AIPlayer = AIPlayer(ai_player_name)
-                average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                                 saved_game_data.player_data.battle_team.get_legendary_creatures())
-                                                             // len(
-                            saved_game_data.player_data.battle_team.get_legendary_creatures()))
-                for j in range(5):
-                    new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                 (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
-                    while new_legendary_creature.level < average_player_battle_creature_level:
-                        new_legendary_creature.exp = new_legendary_creature.required_exp
-                        new_legendary_creature.level_up()
-
-                    ai_player.add_legendary_creature(new_legendary_creature)
-                    ai_player.add_legendary_creature_to_team(new_legendary_creature)
-
-                ai_player.location = AdventureModeLocation(tile_x, tile_y)
-                city.get_tile_at(tile_x, tile_y).add_game_character(ai_player)
-
+            # Generating the city where the player is at.
+            city: City = generate_city(json_model, get_average_battle_creature_level(saved_game_data.player_data))
+            saved_game_data.player_data.spawn_in_city(city)
             game_started = True
         else:
             clear()
 
-            saved_game_files: list = [f for f in os.listdir("../saved")]
+            saved_game_files: list = list_saved_game_files("../saved")
             if len(saved_game_files) == 0:
                 action = "NEW GAME"
 
@@ -1964,41 +6571,59 @@ def main() -> int:
             for i in range(len(saved_game_files)):
                 print(str(i + 1) + ". " + str(saved_game_files[i]))
 
-            player_name = input("Please enter player name associated with saved game data you want to load: ")
+            player_name = read_input("Please enter player name associated with saved game data you want to load: ")
             while player_name not in saved_game_files:
                 clear()
                 print("Below is a list of existing saved game files:\n")
                 for i in range(len(saved_game_files)):
                     print(str(i + 1) + ". " + str(saved_game_files[i]))
 
-                player_name = input("Sorry, invalid input! Please enter player name associated with "
+                player_name = read_input("Sorry, invalid input! Please enter player name associated with "
                                             "saved game data you want to load: ")
 
             saved_game_data = load_game_data(os.path.join("../saved", player_name))
 
             # Set up the model
-            generation_config = {
-                "temperature": saved_game_data.temperature,
-                "top_p": saved_game_data.top_p,
-                "top_k": saved_game_data.top_k,
-                "max_output_tokens": saved_game_data.max_output_tokens,
-            }
-
-            model = gemini.GenerativeModel(
-                model_name="gemini-1.5-pro",
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
+            generation_config = saved_game_data.get_generation_config()
+            model = llm_service.get_model(generation_config)
+            json_model = llm_service.get_model(dict(generation_config, response_mime_type="application/json"))
             game_started = True
 
+    # Prefetcher building the next city while the player walks towards a portal
+    city_prefetcher: CityPrefetcher = CityPrefetcher(json_model)
+    city_prefetcher.update(saved_game_data.player_data)
+
+    # Mission board keeping missions ready for each kind of city tile
+    mission_board: MissionBoard = MissionBoard(json_model)
+
+    # Random streams of the encounters, battles, AI players, and items in the game
+    encounter_rng: random.Random = get_random_stream("encounters")
+    battle_rng: random.Random = get_random_stream("battle")
+    ai_rng: random.Random = get_random_stream("ai")
+    item_rng: random.Random = get_random_stream("items")
+
+    # Autosave writing the game objects changed by every action to a journal in the background (while the player
+    # chooses the next action)
+    autosave: AutosaveService = AutosaveService(os.path.join("../saved", player_name))
+
     # Start playing the game.
     while True:
+        autosave.record(saved_game_data)
         clear()
         print("Enter \"Y\" for yes.")
         print("Enter anything else for no.")
-        continue_playing: str = input("Do you want to continue playing? ")
+        continue_playing: str = read_input("Do you want to continue playing? ")
+        autosave.wait()
         if continue_playing != "Y":
             save_game_data(saved_game_data, os.path.join("../saved", player_name))
+            autosave.close(discard=True)
+            if autosave.error is not None:
+                print("Autosave failed: " + str(autosave.error))
+            city_prefetcher.discard()
+            mission_board.discard()
+            print(llm_service)
+            llm_service.close()
+            end_game_session()
             return 0  # successfully saved the game
 
         clear()
@@ -2029,18 +6654,18 @@ def main() -> int:
         for i, option in enumerate(options, 1):
             print(f"{i}. {option}")
 
-        choice: str = input("Please enter the number of the action you want to do: ")
+        choice: str = read_input("Please enter the number of the action you want to do: ")
         while choice not in [str(i) for i in range(1, len(options) + 1)]:
             print("Options:")
             for i, option in enumerate(options, 1):
                 print(f"{i}. {option}")
 
-            choice = input("Sorry, invalid input! Please enter the number of the action you want to do: ")
+            choice = read_input("Sorry, invalid input! Please enter the number of the action you want to do: ")
 
         if choice == "1":
-            direction: str = input("Please enter \"UP\", \"DOWN\", \"LEFT\", or \"RIGHT\"! ")
+            direction: str = read_input("Please enter \"UP\", \"DOWN\", \"LEFT\", or \"RIGHT\"! ")
             while direction not in ["UP", "DOWN", "LEFT", "RIGHT"]:
-                direction = input("Sorry, invalid input! Please enter \"UP\", \"DOWN\", \"LEFT\", or \"RIGHT\"! ")
+                direction = read_input("Sorry, invalid input! Please enter \"UP\", \"DOWN\", \"LEFT\", or \"RIGHT\"! ")
 
             if direction == "UP":
                 saved_game_data.player_data.move_up()
@@ -2054,114 +6679,29 @@ def main() -> int:
             # Clearing the command line window.
             clear()
 
+            # Starting to build the next city in the background once the player gets close to a portal.
+            city_prefetcher.update(saved_game_data.player_data)
+
             # Checking the type of tile the player lands on.
             curr_tile: CityTile = saved_game_data.player_data.get_city_tile()
             if isinstance(curr_tile, PortalTile):
-                # Generate the city where the player is at.
-                city_width: int = random.randint(6, 10)
-                city_height: int = random.randint(6, 10)
-                city_tiles: list = []  # initial value
-                portals: int = 0  # initial value
-                for y in range(city_height):
-                    curr_row: list = []
-                    for x in range(city_width):
-                        if x == 0 and y == 0:
-                            curr_tile: str = random.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                            if curr_tile == "DOWNTOWN":
-                                curr_row.append(DowntownTile())
-                            elif curr_tile == "SUBURB":
-                                curr_row.append(SuburbTile())
-                            elif curr_tile == "PARK":
-                                curr_row.append(ParkTile())
-                            elif curr_tile == "BEACH":
-                                curr_row.append(BeachTile())
-                        elif portals == 0:
-                            if x == city_width - 1 and y == city_height - 1:
-                                portals += 1
-                                curr_row.append(PortalTile())
-                            else:
-                                curr_tile: str = random.choice(["PORTAL", "DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                                if curr_tile == "PORTAL":
-                                    curr_row.append(PortalTile())
-                                elif curr_tile == "DOWNTOWN":
-                                    curr_row.append(DowntownTile())
-                                elif curr_tile == "SUBURB":
-                                    curr_row.append(SuburbTile())
-                                elif curr_tile == "PARK":
-                                    curr_row.append(ParkTile())
-                                elif curr_tile == "BEACH":
-                                    curr_row.append(BeachTile())
-                        else:
-                            curr_tile: str = random.choice(["DOWNTOWN", "SUBURB", "PARK", "BEACH"])
-                            if curr_tile == "DOWNTOWN":
-                                curr_row.append(DowntownTile())
-                            elif curr_tile == "SUBURB":
-                                curr_row.append(SuburbTile())
-                            elif curr_tile == "PARK":
-                                curr_row.append(ParkTile())
-                            elif curr_tile == "BEACH":
-                                curr_row.append(BeachTile())
-                    city_tiles.append(curr_row)
-                convo = model.start_chat(history=[
-                ])
-                convo.send_message("Please enter a good name of a fictional city (safe one word response only please)!")
-                city_name: str = str(convo.last.text)
-                city: City = City(city_name, city_tiles)
-
-                # Spawn player
-                saved_game_data.player_data.city = city
-                saved_game_data.player_data.location = AdventureModeLocation(0, 0)
-                city.get_tile_at(0, 0).add_game_character(saved_game_data.player_data)
-
-                # Spawn 5 to 10 random AI players.
-                num_ai_players: int = random.randint(5, 10)
-                for i in range(num_ai_players):
-                    tile_x: int = random.randint(0, len(city.get_tiles()[0]) - 1)
-                    tile_y: int = random.randint(0, len(city.get_tiles()) - 1)
-                    while tile_x == 0 and tile_y == 0:
-                        tile_x = random.randint(0, len(city.get_tiles()[0]) - 1)
-                        tile_y = random.randint(0, len(city.get_tiles()) - 1)
-
-                    time.sleep(20)
-                    convo.send_message("Please enter a good male/female game character name "
-                                       "(safe one word response only please)! ")
-                    ai_player_name: str = str(convo.last.text)
-                    ai_player: AIPlayer = AIPlayer(ai_player_name)
-                    average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                                     saved_game_data.player_data.battle_team.get_legendary_creatures())
-                                                                 // len(
-                                saved_game_data.player_data.battle_team.get_legendary_creatures()))
-                    for j in range(5):
-                        new_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                     (random.choice(
-                                                                         LegendaryCreature.POTENTIAL_ELEMENTS)))
-                        while new_legendary_creature.level < average_player_battle_creature_level:
-                            new_legendary_creature.exp = new_legendary_creature.required_exp
-                            new_legendary_creature.level_up()
-
-                        ai_player.add_legendary_creature(new_legendary_creature)
-                        ai_player.add_legendary_creature_to_team(new_legendary_creature)
-
-                    ai_player.location = AdventureModeLocation(tile_x, tile_y)
-                    city.get_tile_at(tile_x, tile_y).add_game_character(ai_player)
-
+                # Travel to the next city (which has usually been prefetched already).
+                saved_game_data.player_data.spawn_in_city(city_prefetcher.take(saved_game_data.player_data))
+                city_prefetcher.update(saved_game_data.player_data)
             else:
                 # Determine if a wild, creature, or PvP battle occurs or not.
-                wild_battle_occurs: bool = random.random() < 0.5
+                wild_battle_occurs: bool = encounter_rng.random() < 0.5
                 if wild_battle_occurs:
-                    wild_legendary_creature: LegendaryCreature = (generate_random_legendary_creature
-                                                                  (random.choice(LegendaryCreature.POTENTIAL_ELEMENTS)))
-                    average_player_battle_creature_level: int = (sum(legendary_creature.level for legendary_creature in
-                                                                     saved_game_data.player_data.battle_team.get_legendary_creatures())
-                                                                 // len(
-                                saved_game_data.player_data.battle_team.get_legendary_creatures()))
-                    while wild_legendary_creature.level < average_player_battle_creature_level:
-                        wild_legendary_creature.exp = wild_legendary_creature.required_exp
-                        wild_legendary_creature.level_up()
+                    average_player_battle_creature_level: int = get_average_battle_creature_level(
+                        saved_game_data.player_data)
+                    wild_legendary_creature: LegendaryCreature = generate_creatures(
+                        1, LegendaryCreature.POTENTIAL_ELEMENTS, average_player_battle_creature_level,
+                        encounter_rng.getrandbits(64))[0]
 
                     wild_battle: WildBattle = WildBattle(saved_game_data.player_data, wild_legendary_creature)
                     while not wild_battle.wild_legendary_creature_caught and not wild_battle.player_fled \
                             and wild_battle.winner is None:
+                        wild_battle.sync()
                         print("Below are the current stats of your legendary creatures.\n")
                         creature_number: int = 1
                         for legendary_creature in saved_game_data.player_data.battle_team.get_legendary_creatures():
@@ -2175,21 +6715,21 @@ def main() -> int:
 
                         wild_battle.get_someone_to_move()
                         if wild_battle.whose_turn == wild_legendary_creature:
-                            chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
+                            chosen_action: str = ai_rng.choice(Action.POSSIBLE_NAMES)
                             if chosen_action == "NORMAL HEAL":
                                 wild_legendary_creature.have_turn(wild_legendary_creature, None, chosen_action)
                             elif chosen_action == "NORMAL ATTACK":
                                 target: LegendaryCreature = (
-                                    random.choice(saved_game_data.player_data.battle_team.get_legendary_creatures()))
+                                    ai_rng.choice(saved_game_data.player_data.battle_team.get_legendary_creatures()))
                                 wild_legendary_creature.have_turn(target, None, chosen_action)
                             elif chosen_action == "USE SKILL":
-                                skill_to_use: Skill = random.choice(wild_legendary_creature.get_skills())
+                                skill_to_use: Skill = ai_rng.choice(wild_legendary_creature.get_skills())
                                 if skill_to_use.skill_type == "HEAL":
                                     wild_legendary_creature.have_turn(wild_legendary_creature, skill_to_use,
                                                                       chosen_action)
                                 elif skill_to_use.skill_type == "ATTACK":
                                     target: LegendaryCreature = (
-                                        random.choice(
+                                        ai_rng.choice(
                                             saved_game_data.player_data.battle_team.get_legendary_creatures()))
                                     wild_legendary_creature.have_turn(target, skill_to_use, chosen_action)
                                 else:
@@ -2202,14 +6742,14 @@ def main() -> int:
                             print("Enter \"USE SKILL\" to use a skill!")
                             print("Enter \"FLEE\" to flee from the wild battle!")
                             print("Enter \"CATCH\" to catch wild legendary creature!")
-                            battle_action: str = input("What do you want to do? ")
+                            battle_action: str = read_input("What do you want to do? ")
                             while battle_action not in ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL", "FLEE", "CATCH"]:
                                 print("Enter \"NORMAL ATTACK\" for normal attack!")
                                 print("Enter \"NORMAL HEAL\" for normal heal!")
                                 print("Enter \"USE SKILL\" to use a skill!")
                                 print("Enter \"FLEE\" to flee from the wild battle!")
                                 print("Enter \"CATCH\" to catch wild legendary creature!")
-                                battle_action = input("Sorry, invalid input! What do you want to do? ")
+                                battle_action = read_input("Sorry, invalid input! What do you want to do? ")
 
                             if battle_action == "NORMAL ATTACK":
                                 wild_battle.whose_turn.have_turn(wild_legendary_creature, None, battle_action)
@@ -2222,14 +6762,15 @@ def main() -> int:
                                     print(str(skill_number) + ". " + str(skill))
                                     skill_number += 1
 
-                                skill_index: int = int(input("Please enter the index of the skill you want to "
-                                                             "use (1 - " +
-                                                             str(len(wild_battle.whose_turn.get_skills())) + "): "))
+                                skill_index: int = int(read_input("Please enter the index of the skill you want to "
+                                                                  "use (1 - " +
+                                                                  str(len(wild_battle.whose_turn.get_skills())) +
+                                                                  "): "))
                                 while skill_index < 1 or skill_index > len(wild_battle.whose_turn.get_skills()):
                                     skill_index = int(
-                                        input("Sorry, invalid input! Please enter the index of the skill you want to "
-                                              "use (1 - " +
-                                              str(len(wild_battle.whose_turn.get_skills())) + "): "))
+                                        read_input("Sorry, invalid input! Please enter the index of the skill you "
+                                                   "want to use (1 - " +
+                                                   str(len(wild_battle.whose_turn.get_skills())) + "): "))
 
                                 skill_to_use: Skill = wild_battle.whose_turn.get_skills()[skill_index - 1]
                                 if skill_to_use.skill_type == "HEAL":
@@ -2241,7 +6782,7 @@ def main() -> int:
                                 else:
                                     pass
                             elif battle_action == "FLEE":
-                                flee_success: bool = random.random() < 0.75
+                                flee_success: bool = battle_rng.random() < 0.75
                                 if flee_success:
                                     print("You successfully fled!")
                                     wild_battle.player_fled = True
@@ -2257,14 +6798,15 @@ def main() -> int:
                                     print(str(ball_number) + ". " + str(ball))
                                     ball_number += 1
 
-                                ball_index: int = int(input("Please enter the index of the ball you want to use "
-                                                            "(1 - " + str(len(ball_objects)) + "): "))
+                                ball_index: int = int(read_input("Please enter the index of the ball you want to use "
+                                                                 "(1 - " + str(len(ball_objects)) + "): "))
                                 while ball_index < 1 or ball_index > len(ball_objects):
-                                    ball_index = int(input("Sorry, invalid input! Please enter the index of the ball "
-                                                           "you want to use (1 - " + str(len(ball_objects)) + "): "))
+                                    ball_index = int(read_input("Sorry, invalid input! Please enter the index of the "
+                                                                "ball you want to use (1 - " + str(len(ball_objects)) +
+                                                                "): "))
 
                                 ball_to_use: Ball = ball_objects[ball_index - 1]
-                                catch_success: bool = random.random() < ball_to_use.catch_success_rate
+                                catch_success: bool = battle_rng.random() < ball_to_use.catch_success_rate
                                 if catch_success:
                                     print("You successfully caught " + str(wild_legendary_creature.name) + "!")
                                     saved_game_data.player_data.add_legendary_creature(wild_legendary_creature)
@@ -2288,14 +6830,15 @@ def main() -> int:
                             break
                 else:
                     if len(curr_tile.get_game_characters()) > 1:
-                        creature_battle_occurs: bool = random.random() < 0.5
+                        creature_battle_occurs: bool = encounter_rng.random() < 0.5
                         if creature_battle_occurs:
-                            other_player: Player = random.choice(curr_tile.get_game_characters())
+                            other_player: Player = encounter_rng.choice(curr_tile.get_game_characters())
                             while other_player == saved_game_data.player_data:
-                                other_player = random.choice(curr_tile.get_game_characters())
+                                other_player = encounter_rng.choice(curr_tile.get_game_characters())
 
                             creature_battle: CreatureBattle = CreatureBattle(saved_game_data.player_data, other_player)
                             while creature_battle.winner is None:
+                                creature_battle.sync()
                                 print("Below are the current stats of your legendary creatures.\n")
                                 creature_number: int = 1
                                 for legendary_creature in saved_game_data.player_data.battle_team.get_legendary_creatures():
@@ -2310,23 +6853,23 @@ def main() -> int:
 
                                 creature_battle.get_someone_to_move()
                                 if creature_battle.whose_turn in other_player.battle_team.get_legendary_creatures():
-                                    chosen_action: str = random.choice(Action.POSSIBLE_NAMES)
+                                    chosen_action: str = ai_rng.choice(Action.POSSIBLE_NAMES)
                                     if chosen_action == "NORMAL HEAL":
                                         creature_battle.whose_turn.have_turn(creature_battle.whose_turn, None,
                                                                             chosen_action)
                                     elif chosen_action == "NORMAL ATTACK":
                                         target: LegendaryCreature = (
-                                            random.choice(
+                                            ai_rng.choice(
                                                 saved_game_data.player_data.battle_team.get_legendary_creatures()))
                                         creature_battle.whose_turn.have_turn(target, None, chosen_action)
                                     elif chosen_action == "USE SKILL":
-                                        skill_to_use: Skill = random.choice(creature_battle.whose_turn.get_skills())
+                                        skill_to_use: Skill = ai_rng.choice(creature_battle.whose_turn.get_skills())
                                         if skill_to_use.skill_type == "HEAL":
                                             creature_battle.whose_turn.have_turn(creature_battle.whose_turn, skill_to_use,
                                                                                 chosen_action)
                                         elif skill_to_use.skill_type == "ATTACK":
                                             target: LegendaryCreature = (
-                                                random.choice(
+                                                ai_rng.choice(
                                                     saved_game_data.player_data.battle_team.get_legendary_creatures()))
                                             creature_battle.whose_turn.have_turn(target, skill_to_use, chosen_action)
                                         else:
@@ -2337,12 +6880,12 @@ def main() -> int:
                                     print("Enter \"NORMAL ATTACK\" for normal attack!")
                                     print("Enter \"NORMAL HEAL\" for normal heal!")
                                     print("Enter \"USE SKILL\" to use a skill!")
-                                    battle_action: str = input("What do you want to do? ")
+                                    battle_action: str = read_input("What do you want to do? ")
                                     while battle_action not in ["NORMAL ATTACK", "NORMAL HEAL", "USE SKILL"]:
                                         print("Enter \"NORMAL ATTACK\" for normal attack!")
                                         print("Enter \"NORMAL HEAL\" for normal heal!")
                                         print("Enter \"USE SKILL\" to use a skill!")
-                                        battle_action = input("Sorry, invalid input! What do you want to do? ")
+                                        battle_action = read_input("Sorry, invalid input! What do you want to do? ")
 
                                     if battle_action == "NORMAL ATTACK":
                                         print("Below is a list of legendary creatures you can attack:\n")
@@ -2352,14 +6895,14 @@ def main() -> int:
                                             creature_index += 1
 
                                         target_index: int = int(
-                                            input("Please enter the index of the legendary creature "
-                                                  "you want to attack (1 - " +
-                                                  str(len(other_player.battle_team.get_legendary_creatures())) +
-                                                  "): "))
+                                            read_input("Please enter the index of the legendary creature "
+                                                       "you want to attack (1 - " +
+                                                       str(len(other_player.battle_team.get_legendary_creatures()))
+                                                       + "): "))
                                         while target_index < 1 or target_index > len(
                                                 other_player.battle_team.get_legendary_creatures()):
                                             target_index = int(
-                                                input(
+                                                read_input(
                                                     "Sorry, invalid input! Please enter the index of the legendary creature "
                                                     "you want to attack (1 - " +
                                                     str(len(other_player.battle_team.get_legendary_creatures())) +
@@ -2378,13 +6921,14 @@ def main() -> int:
                                             print(str(skill_number) + ". " + str(skill))
                                             skill_number += 1
 
-                                        skill_index: int = int(input("Please enter the index of the skill you want to "
-                                                                     "use (1 - " +
-                                                                     str(len(
-                                                                         creature_battle.whose_turn.get_skills())) + "): "))
+                                        skill_index: int = int(read_input("Please enter the index of the skill you "
+                                                                          "want to use (1 - " +
+                                                                          str(len(
+                                                                              creature_battle.whose_turn.get_skills()))
+                                                                          + "): "))
                                         while skill_index < 1 or skill_index > len(
                                                 creature_battle.whose_turn.get_skills()):
-                                            skill_index = int(input(
+                                            skill_index = int(read_input(
                                                 "Sorry, invalid input! Please enter the index of the skill you want to "
                                                 "use (1 - " +
                                                 str(len(creature_battle.whose_turn.get_skills())) + "): "))
@@ -2401,14 +6945,14 @@ def main() -> int:
                                                 creature_index += 1
 
                                             target_index: int = int(
-                                                input("Please enter the index of the legendary creature "
-                                                      "you want to attack (1 - " +
-                                                      str(len(other_player.battle_team.get_legendary_creatures())) +
-                                                      "): "))
+                                                read_input("Please enter the index of the legendary creature "
+                                                           "you want to attack (1 - " +
+                                                           str(len(other_player.battle_team.get_legendary_creatures()))
+                                                           + "): "))
                                             while target_index < 1 or target_index > len(
                                                     other_player.battle_team.get_legendary_creatures()):
                                                 target_index = int(
-                                                    input(
+                                                    read_input(
                                                         "Sorry, invalid input! Please enter the index of the legendary creature "
                                                         "you want to attack (1 - " +
                                                         str(len(other_player.battle_team.get_legendary_creatures())) +
@@ -2440,20 +6984,21 @@ def main() -> int:
                                         break
                         else:
                             # Checking whether a PvP battle occurs or not.
-                            pvp_battle_occurs: bool = random.random() < 0.5
+                            pvp_battle_occurs: bool = encounter_rng.random() < 0.5
                             if pvp_battle_occurs:
-                                other_player: Player = random.choice(curr_tile.get_game_characters())
+                                other_player: Player = encounter_rng.choice(curr_tile.get_game_characters())
                                 while other_player == saved_game_data.player_data:
-                                    other_player = random.choice(curr_tile.get_game_characters())
+                                    other_player = encounter_rng.choice(curr_tile.get_game_characters())
 
                                 pvp_battle: PVPBattle = PVPBattle(saved_game_data.player_data, other_player)
                                 while pvp_battle.winner is None:
+                                    pvp_battle.sync()
                                     print("Below are your current stats:\n" + str(saved_game_data.player_data))
                                     print("Below are your opponent's current stats:\n" + str(other_player))
                                     pvp_battle.get_someone_to_move()
                                     if pvp_battle.whose_turn == saved_game_data.player_data:
                                         print("It is your turn to attack!")
-                                        to_attack: str = input("Please enter anything to attack: ")
+                                        to_attack: str = read_input("Please enter anything to attack: ")
                                         saved_game_data.player_data.attack(other_player)
                                     else:
                                         print("It is your opponent's turn to attack!")
@@ -2475,7 +7020,7 @@ def main() -> int:
                                         other_player.recover()
                                         break
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "2":
             clear()
             runes: list = [item for item in saved_game_data.player_data.item_inventory.get_items() if
@@ -2489,11 +7034,11 @@ def main() -> int:
                     print(str(rune_number) + ". " + str(rune))
                     rune_number += 1
 
-                rune_index: int = int(input("Please enter the index of the rune you want to place (1 - " +
-                                            str(len(runes)) + "): "))
+                rune_index: int = int(read_input("Please enter the index of the rune you want to place (1 - " +
+                                                 str(len(runes)) + "): "))
                 while rune_index < 1 or rune_index > len(runes):
-                    rune_index = int(input("Sorry, invalid input! Please enter the index of the rune you "
-                                           "want to place (1 - " + str(len(runes)) + "): "))
+                    rune_index = int(read_input("Sorry, invalid input! Please enter the index of the rune you "
+                                                "want to place (1 - " + str(len(runes)) + "): "))
 
                 rune_to_place: Rune = runes[rune_index - 1]
                 print("Below is a list of legendary creatures you can place a rune to.\n")
@@ -2503,15 +7048,15 @@ def main() -> int:
                     creature_number += 1
 
                 creature_index: int = int(
-                    input("Please enter the index of the legendary creature you want to place the "
-                          "rune to (1 - " +
-                          str(len(
-                              saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures())) +
-                          "): "))
+                    read_input("Please enter the index of the legendary creature you want to place the "
+                               "rune to (1 - " +
+                               str(len(
+                                   saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures())) +
+                               "): "))
                 while creature_index < 1 or creature_index > len(
                         saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures()):
                     creature_index = int(
-                        input(
+                        read_input(
                             "Sorry, invalid input! Please enter the index of the legendary creature you want to place the "
                             "rune to (1 - " +
                             str(len(
@@ -2522,7 +7067,7 @@ def main() -> int:
                 saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures()[creature_index - 1]
                 saved_game_data.player_data.place_rune_on_legendary_creature(chosen_creature, rune_to_place)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "3":
             clear()
             runes: list = [item for item in saved_game_data.player_data.item_inventory.get_items() if
@@ -2536,16 +7081,16 @@ def main() -> int:
                     print(str(rune_number) + ". " + str(rune))
                     rune_number += 1
 
-                rune_index: int = int(input("Please enter the index of the rune you want to level up (1 - " +
-                                            str(len(runes)) + "): "))
+                rune_index: int = int(read_input("Please enter the index of the rune you want to level up (1 - " +
+                                                 str(len(runes)) + "): "))
                 while rune_index < 1 or rune_index > len(runes):
-                    rune_index = int(input("Sorry, invalid input! Please enter the index of the rune you "
-                                           "want to level up (1 - " + str(len(runes)) + "): "))
+                    rune_index = int(read_input("Sorry, invalid input! Please enter the index of the rune you "
+                                                "want to level up (1 - " + str(len(runes)) + "): "))
 
                 rune_to_level_up: Rune = runes[rune_index - 1]
                 saved_game_data.player_data.level_up_rune(rune_to_level_up)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "4":
             clear()
             runes: list = [item for item in saved_game_data.player_data.item_inventory.get_items() if
@@ -2559,11 +7104,11 @@ def main() -> int:
                     print(str(rune_number) + ". " + str(rune))
                     rune_number += 1
 
-                rune_index: int = int(input("Please enter the index of the rune you want to remove (1 - " +
-                                            str(len(runes)) + "): "))
+                rune_index: int = int(read_input("Please enter the index of the rune you want to remove (1 - " +
+                                                 str(len(runes)) + "): "))
                 while rune_index < 1 or rune_index > len(runes):
-                    rune_index = int(input("Sorry, invalid input! Please enter the index of the rune you "
-                                           "want to remove (1 - " + str(len(runes)) + "): "))
+                    rune_index = int(read_input("Sorry, invalid input! Please enter the index of the rune you "
+                                                "want to remove (1 - " + str(len(runes)) + "): "))
 
                 rune_to_remove: Rune = runes[rune_index - 1]
                 corresponding_legendary_creature: LegendaryCreature = [legendary_creature for legendary_creature in
@@ -2574,83 +7119,28 @@ def main() -> int:
                 saved_game_data.player_data.remove_rune_from_legendary_creature(corresponding_legendary_creature,
                                                                                  rune_to_remove.slot_number)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "5":
             clear()
-            items_sold: list = []  # initial value
-            num_items: int = random.randint(30, 50)
 
             # Populating the items in the item shop
-            for i in range(num_items):
-                item_type: str = random.choice(["BALL", "RUNE", "AWAKEN SHARD", "EXP SHARD", "LEVEL UP SHARD",
-                                                "SKILL LEVEL UP SHARD"])
-                if item_type == "BALL":
-                    convo = model.start_chat(history=[
-                    ])
-                    convo.send_message("Please enter a good name of a ball to catch a monster like in Pokemon games "
-                                       "(safe one word response only please)!")
-                    ball_name: str = str(convo.last.text)
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    new_ball: Ball = Ball(ball_name, "A ball to catch a legendary creature.", gold_cost,
-                                          mpf(random.randint(50, 100) / 100))
-                    items_sold.append(new_ball)
-                elif item_type == "RUNE":
-                    convo = model.start_chat(history=[
-                    ])
-                    convo.send_message("Please enter a good name of a rune to strengthen legendary creatures "
-                                       "(safe one word response only please)!")
-                    rune_name: str = str(convo.last.text)
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    rating: int = random.randint(Rune.MIN_RATING, Rune.MAX_RATING)
-                    slot_number: int = random.randint(Rune.MIN_SLOT_NUMBER, Rune.MAX_SLOT_NUMBER)
-                    new_rune: Rune = Rune(rune_name, "A rune to strengthen legendary creatures.", gold_cost,
-                                          rating, slot_number, rating, rating, rating, rating, rating * 2,
-                                          rating * mpf("0.01"), rating * mpf("0.05"))
-                    items_sold.append(new_rune)
-                elif item_type == "AWAKEN SHARD":
-                    new_awaken_shard: AwakenShard = AwakenShard("Awaken Shard", "A shard to immediately "
-                                                                                "awaken a legendary creature.",
-                                                                mpf("5e7"),
-                                                                random.choice(LegendaryCreature.POTENTIAL_ELEMENTS))
-                    items_sold.append(new_awaken_shard)
-                elif item_type == "EXP SHARD":
-                    gold_cost: mpf = random.randint(1, 9) * mpf("10") ** random.randint(6, 11)
-                    exp_granted: mpf = random.randint(1, 9) * mpf("10") ** random.randint(5, 10)
-                    new_exp_shard: EXPShard = EXPShard("EXP Shard",
-                                                       "An EXP shard used to immediately increase the EXP of a legendary creature.",
-                                                       gold_cost, exp_granted)
-                    items_sold.append(new_exp_shard)
-                elif item_type == "LEVEL UP SHARD":
-                    new_level_up_shard: LevelUpShard = LevelUpShard("Level Up Shard", "A shard to immediately "
-                                                                                      "level up a legendary creature.",
-                                                                    mpf("5e7"))
-                    items_sold.append(new_level_up_shard)
-                elif item_type == "SKILL LEVEL UP SHARD":
-                    new_skill_level_up_shard: SkillLevelUpShard = SkillLevelUpShard("Skill Level Up Shard",
-                                                                                    "A shard to immediately "
-                                                                                    "level up a skill a legendary creature has.",
-                                                                                    mpf("5e7"))
-                    items_sold.append(new_skill_level_up_shard)
-                else:
-                    pass
-
-            item_shop: ItemShop = ItemShop(items_sold)
+            item_shop: ItemShop = build_item_shop(json_model)
             print("Below is a list of items in the item shop.\n")
             item_number: int = 1
             for item in item_shop.get_items_sold():
                 print(str(item_number) + ". " + str(item))
                 item_number += 1
 
-            item_index: int = int(input("Please enter the index of the item you want to buy (1 - " +
-                                        str(len(item_shop.get_items_sold())) + "): "))
+            item_index: int = int(read_input("Please enter the index of the item you want to buy (1 - " +
+                                             str(len(item_shop.get_items_sold())) + "): "))
             while item_index < 1 or item_index > len(item_shop.get_items_sold()):
                 item_index = int(
-                    input("Sorry, invalid input! Please enter the index of the item you want to buy (1 - " +
-                          str(len(item_shop.get_items_sold())) + "): "))
+                    read_input("Sorry, invalid input! Please enter the index of the item you want to buy (1 - " +
+                               str(len(item_shop.get_items_sold())) + "): "))
 
             item_to_buy: Item = item_shop.get_items_sold()[item_index - 1]
             saved_game_data.player_data.purchase_item(item_to_buy)
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "6":
             clear()
             placed_runes: list = [item for item in saved_game_data.player_data.item_inventory.get_items()
@@ -2666,17 +7156,17 @@ def main() -> int:
                     print(str(item_number) + ". " + str(item))
                     item_number += 1
 
-                item_index: int = int(input("Please enter the index of the item you want to sell (1 - "
-                                            + str(len(can_be_sold)) + "): "))
+                item_index: int = int(read_input("Please enter the index of the item you want to sell (1 - "
+                                                 + str(len(can_be_sold)) + "): "))
                 while item_index < 1 or item_index > len(can_be_sold):
                     item_index = int(
-                        input("Sorry, invalid input! Please enter the index of the item you want to sell (1 - "
-                              + str(len(can_be_sold)) + "): "))
+                        read_input("Sorry, invalid input! Please enter the index of the item you want to sell (1 - "
+                                   + str(len(can_be_sold)) + "): "))
 
                 item_to_sell: Item = can_be_sold[item_index - 1]
                 saved_game_data.player_data.sell_item(item_to_sell)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "7":
             clear()
             usable_items: list = [item for item in saved_game_data.player_data.item_inventory.get_items()
@@ -2690,12 +7180,12 @@ def main() -> int:
                     print(str(item_number) + ". " + str(item))
                     item_number += 1
 
-                item_index: int = int(input("Please enter the index of the item you want to use (1 - "
-                                            + str(len(usable_items)) + "): "))
+                item_index: int = int(read_input("Please enter the index of the item you want to use (1 - "
+                                                 + str(len(usable_items)) + "): "))
                 while item_index < 1 or item_index > len(usable_items):
                     item_index = int(
-                        input("Sorry, invalid input! Please enter the index of the item you want to use (1 - "
-                              + str(len(usable_items)) + "): "))
+                        read_input("Sorry, invalid input! Please enter the index of the item you want to use (1 - "
+                                   + str(len(usable_items)) + "): "))
 
                 item_to_use: Item = usable_items[item_index - 1]
                 print("Below is a list of legendary creatures you can use the item on.\n")
@@ -2704,16 +7194,16 @@ def main() -> int:
                     print(str(creature_number) + ". " + str(legendary_creature))
                     creature_number += 1
 
-                creature_index: int = int(input("Please enter the index of the legendary creature you want "
-                                                "to use the item on (1 - "
-                                                + str(
+                creature_index: int = int(read_input("Please enter the index of the legendary creature you want "
+                                                     "to use the item on (1 - "
+                                                     + str(
                     len(saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures())) + "): "))
                 while creature_index < 1 or creature_index > len(
                         saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures()):
                     creature_index = int(
-                        input("Sorry, invalid input! Please enter the index of the legendary creature you want "
-                              "to use the item on (1 - "
-                              + str(
+                        read_input("Sorry, invalid input! Please enter the index of the legendary creature you want "
+                                   "to use the item on (1 - "
+                                   + str(
                             len(saved_game_data.player_data.legendary_creature_inventory.get_legendary_creatures())) + "): "))
 
                 chosen_creature: LegendaryCreature = \
@@ -2724,27 +7214,25 @@ def main() -> int:
                     else:
                         print(str(chosen_creature.name) + " has been awakened!")
                 elif isinstance(item_to_use, LevelUpShard):
-                    chosen_creature.exp = chosen_creature.required_exp
-                    chosen_creature.level_up()
+                    chosen_creature.level_to(chosen_creature.level + 1)
                 elif isinstance(item_to_use, EXPShard):
-                    chosen_creature.exp += item_to_use.exp_granted
-                    chosen_creature.level_up()
+                    chosen_creature.grant_exp(item_to_use.exp_granted)
                 elif isinstance(item_to_use, SkillLevelUpShard):
-                    chosen_skill: Skill = random.choice(chosen_creature.get_skills())
+                    chosen_skill: Skill = item_rng.choice(chosen_creature.get_skills())
                     chosen_skill.level_up()
                 else:
                     pass
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "8":
             clear()
             print("Enter \"ADD LEGENDARY CREATURE\" to add legendary creature to your battle team.")
             print("Enter \"REMOVE LEGENDARY CREATURE\" to remove legendary creature from your battle team.")
-            chosen_action: str = input("What do you want to do? ")
+            chosen_action: str = read_input("What do you want to do? ")
             while chosen_action not in ["ADD LEGENDARY CREATURE", "REMOVE LEGENDARY CREATURE"]:
                 print("Enter \"ADD LEGENDARY CREATURE\" to add legendary creature to your battle team.")
                 print("Enter \"REMOVE LEGENDARY CREATURE\" to remove legendary creature from your battle team.")
-                chosen_action = input("Sorry, invalid input! What do you want to do? ")
+                chosen_action = read_input("Sorry, invalid input! What do you want to do? ")
 
             if chosen_action == "ADD LEGENDARY CREATURE":
                 if len(saved_game_data.player_data.battle_team.get_legendary_creatures()) \
@@ -2759,11 +7247,11 @@ def main() -> int:
                         creature_number += 1
 
                     creature_index: int = int(
-                        input("Please enter the index of the legendary creature you want to add (1 - " +
-                              str(len(available_creatures)) + "): "))
+                        read_input("Please enter the index of the legendary creature you want to add (1 - " +
+                                   str(len(available_creatures)) + "): "))
                     while creature_index < 1 or creature_index >= len(available_creatures):
                         creature_index = int(
-                            input(
+                            read_input(
                                 "Sorry, invalid input! Please enter the index of the legendary creature you want to add (1 - " +
                                 str(len(available_creatures)) + "): "))
 
@@ -2782,12 +7270,12 @@ def main() -> int:
                         creature_number += 1
 
                     creature_index: int = int(
-                        input("Please enter the index of the legendary creature you want to remove (1 - " +
-                              str(len(saved_game_data.player_data.battle_team.get_legendary_creatures())) + "): "))
+                        read_input("Please enter the index of the legendary creature you want to remove (1 - " +
+                                   str(len(saved_game_data.player_data.battle_team.get_legendary_creatures())) + "): "))
                     while creature_index < 1 or creature_index >= len(
                             saved_game_data.player_data.battle_team.get_legendary_creatures()):
                         creature_index = int(
-                            input(
+                            read_input(
                                 "Sorry, invalid input! Please enter the index of the legendary creature you want to remove (1 - " +
                                 str(len(saved_game_data.player_data.battle_team.get_legendary_creatures())) + "): "))
 
@@ -2797,7 +7285,7 @@ def main() -> int:
             else:
                 pass
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "9":
             clear()
             if saved_game_data.player_data.stamina < min(option.stamina_cost for option in saved_game_data.gym.get_training_options()):
@@ -2809,60 +7297,39 @@ def main() -> int:
                     print(str(training_option_number) + ". " + str(training_option))
                     training_option_number += 1
 
-                training_option_index: int = int(input("Please enter the index of the training option you want to choose (1 - " +
-                                                       str(len(saved_game_data.gym.get_training_options())) + "): "))
+                training_option_index: int = int(read_input("Please enter the index of the training option you want to choose (1 - " +
+                                                            str(len(saved_game_data.gym.get_training_options())) + "): "))
                 while training_option_index < 1 or training_option_index >= len(saved_game_data.gym.get_training_options()):
                     training_option_index = int(
-                        input("Sorry, invalid input! Please enter the index of the training option you want to choose (1 - " +
-                              str(len(saved_game_data.gym.get_training_options())) + "): "))
+                        read_input("Sorry, invalid input! Please enter the index of the training option you want to choose (1 - " +
+                                   str(len(saved_game_data.gym.get_training_options())) + "): "))
 
                 chosen_training_option: TrainingOption = saved_game_data.gym.get_training_options()[training_option_index - 1]
                 saved_game_data.player_data.train_in_gym(saved_game_data.gym, chosen_training_option)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "10":
             clear()
-            convo = model.start_chat(history=[
-            ])
-            convo.send_message("Please enter a good male/female game character name "
-                               "(safe one word response only please)! ")
-            npc_player_name: str = str(convo.last.text)
+            npc: NPC = NPC(generate_names(json_model, "CHARACTER", 1, "NPC name")[0])
+            npc_conversation: NPCConversation = NPCConversation(npc, model)
             while True:
-                message: str = input("Player: ")
+                message: str = read_input("Player: ")
                 if message == "":
                     break
-                try:
-                    convo.send_message(message)
-                    print(str(npc_player_name) + ": " + str(convo.last.text))
-                except gemini.types.generation_types.BlockedPromptException:
-                    print(str(npc_player_name) + ": Sorry! Cannot generate response.")
+                npc_conversation.reply(message)
 
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
 
         elif choice == "11":
             clear()
-            convo = model.start_chat(history=[
-            ])
-            tile_type: str = "downtown" if isinstance(saved_game_data.player_data.get_city_tile(), DowntownTile) else \
-                "beach" if isinstance(saved_game_data.player_data.get_city_tile(), BeachTile) else \
-                "suburb" if isinstance(saved_game_data.player_data.get_city_tile(), SuburbTile) else \
-                "park"
-            convo.send_message("Please enter a good mission name in " + str(tile_type) + " area in an RPG (one safe mission name only please): ")
-            mission_name: str = str(convo.last.text)
-            convo.send_message("Please enter a good mission description for " + str(mission_name) + " (safe description only please): ")
-            mission_description: str = str(convo.last.text)
-            stamina_cost: mpf = mpf(random.randint(5, 25))
-            mission_reward: Reward = Reward(mpf("10") ** (5 * saved_game_data.player_data.level),
-                             mpf("10") ** (5 * saved_game_data.player_data.level - 2),
-                             mpf("10") ** (5 * saved_game_data.player_data.level))
-            mission: Mission = Mission(mission_name, mission_description, stamina_cost, mission_reward)
+            mission: Mission = mission_board.take(saved_game_data.player_data)
             saved_game_data.player_data.take_mission(mission)
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         elif choice == "12":
             clear()
             print("Below are your current stats.\n")
             print(saved_game_data.player_data)
-            input("Please enter anything to continue: ")
+            read_input("Please enter anything to continue: ")
         else:
             pass  # do nothing
 
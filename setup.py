@@ -27,6 +27,12 @@ setup(
     entry_points={
         "console_scripts": [
             "gemini_cli_planet_adventure=gemini_cli_planet_adventure.gemini_cli_planet_adventure:main",
+            "gemini_cli_planet_adventure_llm_server=gemini_cli_planet_adventure.gemini_cli_planet_adventure:"
+            "run_llm_stand_in_server",
+            "gemini_cli_planet_adventure_simulate=gemini_cli_planet_adventure.gemini_cli_planet_adventure:"
+            "run_battle_simulator",
+            "gemini_cli_planet_adventure_replay=gemini_cli_planet_adventure.gemini_cli_planet_adventure:"
+            "run_session_replay",
         ]
     }
 )
\ No newline at end of file